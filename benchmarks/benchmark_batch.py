@@ -0,0 +1,54 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+# Computing time of the batch assessment of several synthetic plants (see synthetic_plant.py) with different numbers of
+# worker processes. The CVSS data is only read from the local files (NVD_OFFLINE), so that the rate limit of the NIST NVD
+# does not hide the scaling of the workers. The speedup is limited by the number of CPUs of the computer
+# Usage: python benchmarks/benchmark_batch.py [--machines 8] [--components 500] [--workers 1 2 4] [--src <src directory>]
+
+parser = argparse.ArgumentParser(description="Benchmark of the batch assessment with several worker processes")
+parser.add_argument("--machines", type=int, default=8, help="Number of assessed plants")
+parser.add_argument("--components", type=int, default=500, help="Number of components of each plant")
+parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Numbers of worker processes")
+parser.add_argument("--src", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"), help="src directory of the measured revision")
+arguments = parser.parse_args()
+sys.path.insert(0, os.path.abspath(arguments.src))
+
+from swimlanes.assessment_pipeline import AssessmentPipeline
+from swimlanes.batch_assessment import assess_machines
+from synthetic_plant import generate_plant
+import setup
+
+setup.initialize()
+setup.PRINT_RESULTS = False
+setup.NVD_OFFLINE = True
+
+print("CPUs:", os.cpu_count())
+print("{:>8} {:>10} {:>10} {:>8} {:>11}".format("Workers", "Machines", "Time [s]", "Speedup", "Efficiency"))
+with tempfile.TemporaryDirectory() as directory:
+    paths = []
+    for number in range(arguments.machines):
+        paths.append(os.path.join(directory, "plant_" + str(number) + ".json"))
+        generate_plant(arguments.components, paths[-1])
+    pipeline = AssessmentPipeline()
+    # The knowledge is read before the measurement, as by assess_machines.py
+    with contextlib.redirect_stdout(io.StringIO()):
+        pipeline.warm_up()
+    # Speedup and efficiency are relative to the first number of workers, usually 1
+    reference:tuple[int, float] = None
+    for max_workers in arguments.workers:
+        start = time.perf_counter()
+        summaries = assess_machines(paths, pipeline, os.path.join(directory, "output_" + str(max_workers)), min(max_workers, len(paths)))
+        end = time.perf_counter()
+        failed = [summary for summary in summaries if summary.status != "OK"]
+        if failed:
+            raise RuntimeError(failed[0].output_name + ": " + failed[0].status)
+        if reference is None:
+            reference = (max_workers, end - start)
+        speedup = reference[1] / (end - start)
+        print("{:>8} {:>10} {:>10.2f} {:>8.2f} {:>11.2f}".format(max_workers, len(paths), end - start, speedup, speedup * reference[0] / max_workers))
@@ -0,0 +1,48 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+# Computing time of the creation of the conduits for synthetic plants, see synthetic_plant.py. With --src, another
+# revision is measured, e.g. a worktree of an older commit: git worktree add /tmp/before <commit>
+# Usage: python benchmarks/benchmark_conduits.py [--components 1000 10000] [--src <src directory>]
+
+parser = argparse.ArgumentParser(description="Benchmark of the creation of the conduits for synthetic plants")
+parser.add_argument("--components", type=int, nargs="+", default=[1000, 10000], help="Number of components of the plants")
+parser.add_argument("--src", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"), help="src directory of the measured revision")
+arguments = parser.parse_args()
+sys.path.insert(0, os.path.abspath(arguments.src))
+
+from domain_model.asset_classes import Machine
+from swimlanes.aas_reader import load_aas_environment
+from swimlanes.network_segmentation import create_conduits, create_zones
+from synthetic_plant import generate_plant
+import setup
+
+setup.initialize()
+setup.PRINT_RESULTS = False
+
+print("{:>10} {:>10} {:>10} {:>12} {:>14}".format("Components", "Zones", "Conduits", "References", "Conduits [ms]"))
+for number_of_components in arguments.components:
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, "plant.json")
+        generate_plant(number_of_components, file_name)
+        # The steps print their headers also without PRINT_RESULTS
+        with contextlib.redirect_stdout(io.StringIO()):
+            aas_environment = load_aas_environment(file_name)
+            aas = [aas for aas in aas_environment.shells if aas["idShort"] == setup.MACHINE_ID_SHORT][0]
+            machine = Machine(aas_environment=aas_environment, aas=aas, id=aas["identification"]["id"])
+            machine = create_zones(machine)
+            start = time.perf_counter()
+            machine = create_conduits(machine)
+            end = time.perf_counter()
+    # The number of distinct conduits has to be the same for all revisions. Older revisions add a conduit to a zone once
+    # per port, which shows in the number of references if components are connected by several ports
+    zones = [zone for module in machine.hierarchy for zone in module.zones]
+    conduits = set(conduit.id for zone in zones for conduit in zone.conduits)
+    references = sum([len(zone.conduits) for zone in zones])
+    number_of_components = sum([len(module.hierarchy) for module in machine.hierarchy])
+    print("{:>10} {:>10} {:>10} {:>12} {:>14.1f}".format(number_of_components, len(zones), len(conduits), references, 1000 * (end - start)))
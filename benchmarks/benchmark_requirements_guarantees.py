@@ -0,0 +1,54 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+# Computing time of the evaluation of the SL-Vectors (Phase (2)) for synthetic plants, see synthetic_plant.py. With
+# --src, another revision is measured, e.g. a worktree of an older commit: git worktree add /tmp/before <commit>
+# Usage: python benchmarks/benchmark_requirements_guarantees.py [--components 1000 10000] [--src <src directory>]
+
+parser = argparse.ArgumentParser(description="Benchmark of the requirements guarantees for synthetic plants")
+parser.add_argument("--components", type=int, nargs="+", default=[1000, 10000], help="Number of components of the plants")
+parser.add_argument("--src", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"), help="src directory of the measured revision")
+arguments = parser.parse_args()
+sys.path.insert(0, os.path.abspath(arguments.src))
+
+from domain_model.asset_classes import Machine
+from swimlanes.aas_reader import load_aas_environment
+from swimlanes.autos2_information_base_reader import assign_mitigations_to_technique, get_mitigations_from_information_base, get_techniques_from_information_base, load_knowledge_base
+from swimlanes.network_segmentation import create_conduits, create_zones
+from swimlanes.requirements_guarantees import evaluation_on_component_level, evaluation_on_system_level, generate_mitre_sl_t_vector, get_sl_t_for_system, initialize_sl_status_vector, initialize_sl_t_with_mitre_sl_t
+from synthetic_plant import generate_plant
+import setup
+
+setup.initialize()
+setup.PRINT_RESULTS = False
+
+print("{:>10} {:>16} {:>16} {:>16} {:>10}".format("Components", "Components [ms]", "System SL-T [ms]", "System [ms]", "Total [ms]"))
+for number_of_components in arguments.components:
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, "plant.json")
+        generate_plant(number_of_components, file_name)
+        # The steps print their headers also without PRINT_RESULTS
+        with contextlib.redirect_stdout(io.StringIO()):
+            aas_environment = load_aas_environment(file_name)
+            aas = [aas for aas in aas_environment.shells if aas["idShort"] == setup.MACHINE_ID_SHORT][0]
+            machine = Machine(aas_environment=aas_environment, aas=aas, id=aas["identification"]["id"])
+            machine = create_conduits(create_zones(machine))
+            knowledge_base = load_knowledge_base(setup.EXCEL_AUTOS2_INFORMATION_BASE_PATH, setup.EXCEL_ICS_ATTACK_MITIGATIONS_PATH)
+            techniques = assign_mitigations_to_technique(knowledge_base, get_techniques_from_information_base(knowledge_base), get_mitigations_from_information_base(knowledge_base))
+            machine = initialize_sl_status_vector(machine)
+            machine = initialize_sl_t_with_mitre_sl_t(machine, generate_mitre_sl_t_vector(techniques))
+            start = time.perf_counter()
+            machine = evaluation_on_component_level(machine)
+            component_level = time.perf_counter()
+            machine = get_sl_t_for_system(machine)
+            system_sl_t = time.perf_counter()
+            machine = evaluation_on_system_level(machine)
+            system_level = time.perf_counter()
+    number_of_components = sum([len(module.hierarchy) for module in machine.hierarchy])
+    print("{:>10} {:>16.1f} {:>16.1f} {:>16.1f} {:>10.1f}".format(number_of_components, 1000 * (component_level - start), 1000 * (system_sl_t - component_level),
+                                                                 1000 * (system_level - system_sl_t), 1000 * (system_level - start)))
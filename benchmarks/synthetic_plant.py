@@ -0,0 +1,75 @@
+import json
+import math
+import os
+import re
+
+# Synthetic plants for the benchmarks: the modules and components of CPS_Example_1 are copied until the plant has the
+# requested number of components. The AAS-IDs and idShorts of each copy get the suffix _<copy>, so that the copies are
+# connected only among themselves, like independent production cells
+
+EXAMPLE_FILE_NAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "aas_examples", "CPS_Example_1.json")
+MACHINE_ID_SHORT = "CPS"
+NODE_SEMANTIC_ID_SUFFIX = "Node/1/0"
+
+
+def generate_plant(number_of_components:int, file_name:str, example_file_name:str = EXAMPLE_FILE_NAME) -> int:
+    # Writes the plant as AAS-JSON and returns the number of copies of the example
+    with open(example_file_name, encoding="utf-8") as file:
+        environment = json.load(file)
+    shells = environment["assetAdministrationShells"]
+    machine = [shell for shell in shells if shell["idShort"] == MACHINE_ID_SHORT][0]
+    machine_submodel_ids = set(key["value"] for reference in machine["submodels"] for key in reference["keys"])
+    copied_shells = [shell for shell in shells if shell["idShort"] != MACHINE_ID_SHORT]
+    copied_submodels = [submodel for submodel in environment["submodels"] if submodel["identification"]["id"] not in machine_submodel_ids]
+    machine_submodels = [submodel for submodel in environment["submodels"] if submodel["identification"]["id"] in machine_submodel_ids]
+
+    # Each copy of the example contains all its modules and their components
+    names = [shell["idShort"] for shell in copied_shells]
+    names_pattern = "|".join(sorted([re.escape(name) for name in names], key=len, reverse=True))
+    id_pattern = re.compile(r'(https://init-owl\.de/aas/)(' + names_pattern + r')(?=["/])')
+    id_short_pattern = re.compile(r'"idShort": "(' + names_pattern + r')"')
+    module_ids = set(statement["asset"]["keys"][0]["value"] for statement in get_machine_entry(machine_submodels)["statements"]
+                     if statement["semanticId"]["keys"][0]["value"].endswith(NODE_SEMANTIC_ID_SUFFIX))
+    number_of_components_per_copy = len([shell for shell in copied_shells if shell["identification"]["id"] not in module_ids])
+    number_of_copies = max(1, math.ceil(number_of_components / max(1, number_of_components_per_copy)))
+
+    def rename(text:str, copy:int) -> str:
+        text = id_pattern.sub(lambda match: match.group(1) + match.group(2) + "_" + str(copy), text)
+        return id_short_pattern.sub(lambda match: '"idShort": "' + match.group(1) + "_" + str(copy) + '"', text)
+
+    # The copies are written as text one after the other, as a plant with 10000 components does not fit into memory
+    shells_text = json.dumps(copied_shells)[1:-1]
+    submodels_text = json.dumps(copied_submodels)[1:-1]
+
+    # The HierarchicalStructures of the machine contain the modules of all copies
+    entry = get_machine_entry(machine_submodels)
+    nodes = [statement for statement in entry["statements"] if statement["semanticId"]["keys"][0]["value"].endswith(NODE_SEMANTIC_ID_SUFFIX)]
+    relationships = [statement for statement in entry["statements"] if not statement["semanticId"]["keys"][0]["value"].endswith(NODE_SEMANTIC_ID_SUFFIX)]
+    new_nodes = []
+    new_relationships = []
+    for copy in range(number_of_copies):
+        for statements, new_statements in ((nodes, new_nodes), (relationships, new_relationships)):
+            for statement in statements:
+                new_statement = json.loads(id_pattern.sub(lambda match: match.group(1) + match.group(2) + "_" + str(copy), json.dumps(statement)))
+                new_statement["idShort"] += "_" + str(copy)
+                new_statements.append(new_statement)
+    entry["statements"] = new_nodes + new_relationships
+
+    with open(file_name, "w", encoding="utf-8") as file:
+        file.write('{"assetAdministrationShells": [' + json.dumps(machine))
+        for copy in range(number_of_copies):
+            file.write(", " + rename(shells_text, copy))
+        file.write('], "submodels": [' + json.dumps(machine_submodels)[1:-1])
+        for copy in range(number_of_copies):
+            file.write(", " + rename(submodels_text, copy))
+        file.write("]")
+        for key, value in environment.items():
+            if key not in ("assetAdministrationShells", "submodels"):
+                file.write(", " + json.dumps(key) + ": " + json.dumps(value))
+        file.write("}")
+    return number_of_copies
+
+
+def get_machine_entry(machine_submodels:list[dict]) -> dict:
+    hierarchical_structures = [submodel for submodel in machine_submodels if submodel["idShort"] == "HierarchicalStructures"][0]
+    return [element for element in hierarchical_structures["submodelElements"] if element["idShort"] == MACHINE_ID_SHORT][0]
@@ -0,0 +1,39 @@
+from swimlanes.assessment_pipeline import AssessmentPipeline
+from swimlanes.batch_assessment import assess_machines, get_machine_paths, print_summary, write_summary
+import argparse
+import os
+import time
+import setup
+
+# Assesses many machines without interaction. The knowledge is read once and shared by all worker processes, each
+# machine is assessed in one worker. Per machine, the attestation (<name>_Attest.pdf) and the printed results
+# (<name>.log) are written to the output directory, together with a summary of all machines (summary.csv)
+# Usage: python assess_machines.py <AAS-JSON files, AASX files, directories, or glob patterns> [--output <directory>] [--workers <number>]
+
+setup.initialize()
+
+parser = argparse.ArgumentParser(description="Non-interactive assessment of many machines")
+parser.add_argument("paths", nargs="+", help="AAS-JSON files, AASX files, directories with AASX files, or directories/glob patterns with several machines")
+parser.add_argument("--output", default=setup.BATCH_OUTPUT_PATH, help="Directory for the attestations, logs, and the summary")
+parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of machines assessed in parallel processes")
+arguments = parser.parse_args()
+
+machine_paths = get_machine_paths(arguments.paths)
+if not machine_paths:
+    print("No machines found")
+    parser.exit(1)
+
+start = time.time()
+pipeline = AssessmentPipeline()
+pipeline.warm_up()
+print("Knowledge read in", round(time.time()-start, 2), "Seconds")
+print("Assess", len(machine_paths), "machines with", min(arguments.workers, len(machine_paths)), "processes")
+print()
+
+summaries = assess_machines(machine_paths, pipeline, arguments.output, min(arguments.workers, len(machine_paths)))
+print_summary(summaries)
+summary_file_name = os.path.join(arguments.output, "summary.csv")
+write_summary(summaries, summary_file_name)
+print()
+print(len([summary for summary in summaries if summary.status == "OK"]), "of", len(summaries), "machines assessed in", round(time.time()-start, 2), "Seconds")
+print("Summary:", summary_file_name)
@@ -1,7 +1,16 @@
+from event_log import get_logger
 from typing import List
 from domain_model.requirements_guarantees_classes import Security_Level_Enum, Security_Level_IEC_62443, Mitre_Technique
 from domain_model.risk_assessment_classes import CVE, Risk
-from domain_model.network_segmentation_classes import Zone
+from domain_model.network_segmentation_classes import TopologyGraph, Zone
+
+log = get_logger(__name__)
+
+SEMANTIC_ID_HIERARCHICAL_STRUCTURES = "https://admin-shell.io/idta/HierarchicalStructures/1/0/Submodel"
+SEMANTIC_ID_MISCELLANEOUS = "https://init-owl.de/submodel/Miscellaneous"
+SEMANTIC_ID_SECURITY_LEVEL_IEC_62443 = "https://init-owl.de/submodel/SecurityLevelIEC62443"
+# Only these Submodels are used by the assessment
+ASSESSMENT_SUBMODEL_SEMANTIC_IDS = (SEMANTIC_ID_HIERARCHICAL_STRUCTURES, SEMANTIC_ID_MISCELLANEOUS, SEMANTIC_ID_SECURITY_LEVEL_IEC_62443)
 
 
 class Port():
@@ -10,31 +19,59 @@ class Port():
         self.port_endpoint_id:str = port_endpoint_id
 
 
+class AasEnvironmentIndex():
+    # Hash index over all AASs and Submodels of an AAS environment, so that AASs and Submodels are found without scanning the whole environment
+
+    def __init__(self, shells:List[dict], submodels:List[dict]):
+        self.shells:List[dict] = []
+        self.shell_by_id:dict[str, dict] = {}
+        self.submodel_by_id:dict[str, dict] = {}
+        # AAS-ID -> Semantic-ID -> Submodel
+        self.submodel_by_semantic_id:dict[str, dict[str, dict]] = {}
+        for submodel in submodels:
+            self.submodel_by_id.setdefault(submodel["identification"]["id"], submodel)
+        for shell in shells:
+            self.shells.append(shell)
+            self.shell_by_id.setdefault(shell["identification"]["id"], shell)
+        for shell_id, shell in self.shell_by_id.items():
+            submodels_by_semantic_id:dict[str, dict] = {}
+            for submodel in self.get_submodels_of_aas(shell):
+                semantic_id = get_semantic_id(submodel)
+                if semantic_id is not None:
+                    submodels_by_semantic_id.setdefault(semantic_id, submodel)
+            self.submodel_by_semantic_id[shell_id] = submodels_by_semantic_id
+
+    @classmethod
+    def from_json(cls, aass_json:dict):
+        return cls(aass_json["assetAdministrationShells"], aass_json["submodels"])
+
+    def get_submodels_of_aas(self, aas:dict) -> List[dict]:
+        submodel_list:List[dict] = []
+        for submodel in aas.get("submodels", []):
+            for keys in submodel["keys"]:
+                submodel_json = self.submodel_by_id.get(keys["value"])
+                if submodel_json is not None:
+                    submodel_list.append(submodel_json)
+        return submodel_list
+
+    def get_submodel_by_semantic_id(self, aas_id:str, semantic_id:str):
+        return self.submodel_by_semantic_id.get(aas_id, {}).get(semantic_id)
+
+
 class Asset():
-    def __init__(self, aass_json, aas:dict, id:str):
+    def __init__(self, aas_environment:AasEnvironmentIndex, aas:dict, id:str):
         self.aas:dict = aas
         self.id:str = id
         self.id_short:str = aas["idShort"]
-        self.submodels:List[dict] = self.get_submodels_from_submodel_list(aas, aass_json["submodels"])
+        self.submodels:List[dict] = aas_environment.get_submodels_of_aas(aas)
+        self.submodel_by_semantic_id:dict[str, dict] = aas_environment.submodel_by_semantic_id.get(id, {})
 
-    def get_submodels_from_submodel_list(self, aas:dict, all_submodels:List) -> List[dict]:
-        submodel_list:List[dict] = []
-        for submodel in aas["submodels"]:
-            for keys in submodel["keys"]:
-                submodel_id = keys["value"]
-                for submodels in all_submodels:
-                    if submodels["identification"]["id"] == submodel_id:
-                        submodel_list.append(submodels)
-        return submodel_list
-    
     def get_submodel_by_semantic_id(self, semantic_id:str):
-        for submodel in self.submodels:
-            if submodel["semanticId"]["keys"][0]["value"] == semantic_id:
-                return submodel
+        return self.submodel_by_semantic_id.get(semantic_id)
 
-    def get_hierarchical_structure(self, aass_json:dict, type:str):
+    def get_hierarchical_structure(self, aas_environment:AasEnvironmentIndex, type:str):
         # hierarchy = self.get_submodel_by_id_short("HierarchicalStructures")
-        hierarchy = self.get_submodel_by_semantic_id("https://admin-shell.io/idta/HierarchicalStructures/1/0/Submodel")
+        hierarchy = self.get_submodel_by_semantic_id(SEMANTIC_ID_HIERARCHICAL_STRUCTURES)
         submodel_elements = hierarchy.get("submodelElements")
         if hierarchy is None or submodel_elements is None:
             return []
@@ -59,23 +96,23 @@ class Asset():
                     # Additional check:
                     elif entity_statement_json["semanticId"]["keys"][0]["value"] == "https://admin-shell.io/idta/HierarchicalStructures/HasPart/1/0":
                         if entity_statement_json["first"]["keys"][0]["value"] != current_aas_id:
-                            print("  ! Error in HierarchicalStructures:")
-                            print("    First element of 'HasPart' Relationships does not equal EntryNodeID")
-                            print("    Is", entity_statement_json["first"]["keys"][0]["value"], "... should be", current_aas_id)
+                            log.warning("  ! Error in HierarchicalStructures:")
+                            log.warning("    First element of 'HasPart' Relationships does not equal EntryNodeID")
+                            log.warning("    Is", entity_statement_json["first"]["keys"][0]["value"], "... should be", current_aas_id)
                         if entity_statement_json["second"]["keys"][0]["value"] not in aas_id_list:
-                            print("  ! Error in HierarchicalStructures:")
-                            print("    Second element of 'HasPart' Relationships is not a Node in HierarchicalStructures: ", entity_statement_json["second"]["keys"][0]["value"])
-                            print("    Check if all 'Nodes' are before Relationships in AAS?")
+                            log.warning("  ! Error in HierarchicalStructures:")
+                            log.warning("    Second element of 'HasPart' Relationships is not a Node in HierarchicalStructures: ", entity_statement_json["second"]["keys"][0]["value"])
+                            log.warning("    Check if all 'Nodes' are before Relationships in AAS?")
 
         for aas_id in aas_id_list:
-            for aas in aass_json["assetAdministrationShells"]:
-                if aas["identification"]["id"] == aas_id:
-                    if type=="Machine":
-                        asset_list.append(Module(aass_json, aas, aas_id))
-                    elif type=="Module":
-                        asset_list.append(Component(aass_json, aas, aas_id))
-                    else:
-                        raise ValueError("Unknown type:", type)
+            aas = aas_environment.shell_by_id.get(aas_id)
+            if aas is not None:
+                if type=="Machine":
+                    asset_list.append(Module(aas_environment, aas, aas_id))
+                elif type=="Module":
+                    asset_list.append(Component(aas_environment, aas, aas_id))
+                else:
+                    raise ValueError("Unknown type:", type)
         return asset_list
 
     def get_aas_by_id(self, id:str) -> dict:
@@ -88,7 +125,7 @@ class Asset():
             print(aas.id)
 
     def get_suitable_for_safety_functions_property(self) -> bool:
-        misc_component_submodel = self.get_submodel_by_semantic_id("https://init-owl.de/submodel/Miscellaneous")
+        misc_component_submodel = self.get_submodel_by_semantic_id(SEMANTIC_ID_MISCELLANEOUS)
         if misc_component_submodel is None:
             return False
         misc_component_submodel_elements = get_submodel_elements_from_submodel(misc_component_submodel)
@@ -100,7 +137,7 @@ class Asset():
 
     def get_physical_port_endpoint_ids(self) -> list[(str, str)]:
         physical_port_id_list:list[(str, str)] = ([])
-        misc_component_submodel = self.get_submodel_by_semantic_id("https://init-owl.de/submodel/Miscellaneous")
+        misc_component_submodel = self.get_submodel_by_semantic_id(SEMANTIC_ID_MISCELLANEOUS)
         if misc_component_submodel is None:
             return []
         misc_component_submodel_elements = get_submodel_elements_from_submodel(misc_component_submodel)
@@ -111,7 +148,7 @@ class Asset():
 
     def get_cve_ids(self) -> list[str]:
         cve_id_list:list[str] = []
-        misc_component_submodel = self.get_submodel_by_semantic_id("https://init-owl.de/submodel/Miscellaneous")
+        misc_component_submodel = self.get_submodel_by_semantic_id(SEMANTIC_ID_MISCELLANEOUS)
         if misc_component_submodel is None:
             return []
         misc_component_submodel_elements = get_submodel_elements_from_submodel(misc_component_submodel)
@@ -121,7 +158,7 @@ class Asset():
         return cve_id_list
 
     def get_sl_from_aas(self, seachred_type:Security_Level_Enum) -> Security_Level_IEC_62443:
-        submodel = self.get_submodel_by_semantic_id("https://init-owl.de/submodel/SecurityLevelIEC62443")
+        submodel = self.get_submodel_by_semantic_id(SEMANTIC_ID_SECURITY_LEVEL_IEC_62443)
         for sl_vector in submodel["submodelElements"]:
             security_level_type:str = sl_vector["idShort"]
             security_level_type = security_level_type.replace("_", "-")
@@ -155,23 +192,29 @@ class Asset():
 
 
 class Machine(Asset):
-    def __init__(self, aass_json, aas:dict, id:str):
-        super().__init__(aass_json, aas, id)
-        self.hierarchy:List[Module] = self.get_hierarchical_structure(aass_json, type="Machine")
+    def __init__(self, aas_environment:AasEnvironmentIndex, aas:dict, id:str):
+        super().__init__(aas_environment, aas, id)
+        self.hierarchy:List[Module] = self.get_hierarchical_structure(aas_environment, type="Machine")
         self.level:str = "System"
+        # Physical network of all components, used by the network segmentation and the risk assessment
+        self.topology:TopologyGraph = TopologyGraph([module.hierarchy for module in self.hierarchy])
+        # Risks of the targets for all Intel TAL attacker profiles (AttackerProfileSweep), if ATTACKER_PROFILE_SWEEP is enabled
+        self.attacker_profile_sweep = None
+        # Risk distribution of the targets for random SL values (MonteCarloSensitivity), if MONTE_CARLO_SAMPLES > 0
+        self.sl_sensitivity = None
 
 
 class Module(Asset):
-    def __init__(self, aass_json, aas:dict, id:str):
-        super().__init__(aass_json, aas, id)
-        self.hierarchy:List[Component] = self.get_hierarchical_structure(aass_json, type="Module")
+    def __init__(self, aas_environment:AasEnvironmentIndex, aas:dict, id:str):
+        super().__init__(aas_environment, aas, id)
+        self.hierarchy:List[Component] = self.get_hierarchical_structure(aas_environment, type="Module")
         self.zones:List[Zone] = []
         self.level:str = "System"
 
 
 class Component(Asset):
-    def __init__(self, aass_json, aas:dict, id:str):
-        super().__init__(aass_json, aas, id)
+    def __init__(self, aas_environment:AasEnvironmentIndex, aas:dict, id:str):
+        super().__init__(aas_environment, aas, id)
         self.level:str = "Component"
         self.is_suitable_for_safety_functions:bool = self.get_suitable_for_safety_functions_property()
         self.physical_port_endpoint_ids:List[Port] = self.get_physical_port_endpoint_ids()
@@ -191,6 +234,13 @@ class Component(Asset):
         self.risk:Risk = Risk("DefaultRisk")
 
 
+def get_semantic_id(json_element:dict):
+    keys = json_element.get("semanticId", {}).get("keys", [])
+    if not keys:
+        return None
+    return keys[0]["value"]
+
+
 def get_submodel_elements_from_submodel(submodel) -> list[dict]:
     return submodel["submodelElements"]
 
@@ -1,6 +1,13 @@
 from typing import List
+from array import array
+from collections import deque
 from domain_model.requirements_guarantees_classes import Security_Level_Enum, Security_Level_IEC_62443
+from domain_model.risk_assessment_classes import COMPLEXITY_RANK, Complexity_Enum
 import domain_model.asset_classes
+import heapq
+
+# Endpoint of a PhysicalPort that is not a component of the machine, probably a public network
+PUBLIC_NETWORK = -1
 
 
 class Zone():
@@ -16,7 +23,11 @@ class Zone():
         self.sl_c:Security_Level_IEC_62443 = Security_Level_IEC_62443(Security_Level_Enum.SL_C)
         self.sl_a:Security_Level_IEC_62443 = Security_Level_IEC_62443(Security_Level_Enum.SL_A)
         self.sl_status:Security_Level_IEC_62443 = Security_Level_IEC_62443(Security_Level_Enum.SL_STATUS)
+        # Bitmask of the unmitigated SRs (bit i stands for CR_SR_KEYS[i]), set by the evaluation on system level
+        self.unmitigated_mask:int = 0
         self.access_points_secure:bool = False
+        self.attack_paths:AttackPathDag = None
+        self.best_attack_paths:BestAttackPaths = None
 
 
 class Conduit():
@@ -37,3 +48,194 @@ class Employee():
         self.company:str = company
         self.email:str = email
         self.telephone:str = telephone
+
+
+class TopologyGraph():
+    # Physical network of the machine, built once from the PhysicalPorts of all components. The components of the modules
+    # are numbered as nodes in the order of the hierarchy. The endpoints of the ports of node n are stored in compressed sparse rows:
+    # port_endpoints[port_offsets[n]:port_offsets[n+1]] in the order of the ports. A port to an AAS-ID used by several
+    # components has one endpoint per component, a port to an unknown AAS-ID has the endpoint PUBLIC_NETWORK
+
+    def __init__(self, module_components:List[list]):
+        self.components:List[domain_model.asset_classes.Component] = []
+        self.node_by_component:dict[domain_model.asset_classes.Component, int] = {}
+        self.nodes_by_id:dict[str, List[int]] = {}
+        self.module_of_node = array("i")
+        for module_index, components in enumerate(module_components):
+            for component in components:
+                node = len(self.components)
+                self.components.append(component)
+                self.node_by_component[component] = node
+                self.nodes_by_id.setdefault(component.id, []).append(node)
+                self.module_of_node.append(module_index)
+        self.port_offsets = array("i", [0])
+        self.port_endpoints = array("i")
+        for component in self.components:
+            for port in component.physical_port_endpoint_ids:
+                self.port_endpoints.extend(self.nodes_by_id.get(port.port_endpoint_id, (PUBLIC_NETWORK,)))
+            self.port_offsets.append(len(self.port_endpoints))
+        # Reverse edges for queries independent of the direction of the ports (counting sort of the endpoints)
+        self.reverse_offsets = array("i", [0]) * (len(self.components) + 1)
+        for endpoint in self.port_endpoints:
+            if endpoint != PUBLIC_NETWORK:
+                self.reverse_offsets[endpoint + 1] += 1
+        for node in range(len(self.components)):
+            self.reverse_offsets[node + 1] += self.reverse_offsets[node]
+        self.reverse_endpoints = array("i", [0]) * self.reverse_offsets[-1]
+        next_position = self.reverse_offsets[:-1]
+        for node in range(len(self.components)):
+            for endpoint in self.port_endpoints[self.port_offsets[node]:self.port_offsets[node + 1]]:
+                if endpoint != PUBLIC_NETWORK:
+                    self.reverse_endpoints[next_position[endpoint]] = node
+                    next_position[endpoint] += 1
+        # Zone membership is added by the network segmentation
+        self.zones:List[Zone] = []
+        self.zone_of_node = array("i", [-1]) * len(self.components)
+
+    def add_zone(self, zone:Zone) -> int:
+        zone_index = len(self.zones)
+        self.zones.append(zone)
+        for component in zone.components:
+            self.zone_of_node[self.node_by_component[component]] = zone_index
+        return zone_index
+
+    def get_node(self, component) -> int:
+        return self.node_by_component[component]
+
+    def get_zone(self, node:int) -> Zone:
+        zone_index = self.zone_of_node[node]
+        if zone_index < 0:
+            return None
+        return self.zones[zone_index]
+
+    def get_port_endpoints(self, node:int) -> array:
+        return self.port_endpoints[self.port_offsets[node]:self.port_offsets[node + 1]]
+
+    def get_neighbours(self, node:int) -> List[int]:
+        return [endpoint for endpoint in self.get_port_endpoints(node) if endpoint != PUBLIC_NETWORK]
+
+    def get_neighbours_in_zone(self, node:int) -> List[int]:
+        zone_index = self.zone_of_node[node]
+        return [endpoint for endpoint in self.get_port_endpoints(node) if endpoint != PUBLIC_NETWORK and self.zone_of_node[endpoint] == zone_index]
+
+    def get_undirected_neighbours(self, node:int) -> List[int]:
+        return self.get_neighbours(node) + list(self.reverse_endpoints[self.reverse_offsets[node]:self.reverse_offsets[node + 1]])
+
+    def breadth_first_search(self, start_node:int, within_zone:bool = False) -> List[int]:
+        # Returns the nodes reachable via the ports of the start node in the order of their distance
+        visited = bytearray(len(self.components))
+        visited[start_node] = 1
+        order:List[int] = [start_node]
+        queue = deque(order)
+        while queue:
+            node = queue.popleft()
+            for neighbour in (self.get_neighbours_in_zone(node) if within_zone else self.get_neighbours(node)):
+                if not visited[neighbour]:
+                    visited[neighbour] = 1
+                    order.append(neighbour)
+                    queue.append(neighbour)
+        return order
+
+    def get_connected_components(self) -> List[List[int]]:
+        # Groups of nodes that are physically connected, independent of the direction of the ports
+        visited = bytearray(len(self.components))
+        connected_components:List[List[int]] = []
+        for start_node in range(len(self.components)):
+            if visited[start_node]:
+                continue
+            visited[start_node] = 1
+            group:List[int] = [start_node]
+            queue = deque(group)
+            while queue:
+                for neighbour in self.get_undirected_neighbours(queue.popleft()):
+                    if not visited[neighbour]:
+                        visited[neighbour] = 1
+                        group.append(neighbour)
+                        queue.append(neighbour)
+            connected_components.append(group)
+        return connected_components
+
+
+class AttackPathDag():
+    # All paths from the access points of a zone to its targets. The zone is searched breadth-first from all access
+    # points at once, and a path is extended only to targets of the zone. An edge is kept if it leads to the next level,
+    # so that links within a level or back to a previous level (cycles of rings and redundant links) are dropped and
+    # the remaining edges form a directed acyclic graph. The nodes are in breadth-first order, so that the predecessors
+    # of a node are always before the node
+
+    def __init__(self, topology:TopologyGraph, zone:Zone):
+        self.topology:TopologyGraph = topology
+        self.access_points:List[int] = [topology.get_node(component) for component in zone.components if component.is_access_point]
+        self.nodes:List[int] = []
+        self.level:dict[int, int] = {node: 0 for node in self.access_points}
+        self.successors:dict[int, List[int]] = {node: [] for node in self.access_points}
+        self.predecessors:dict[int, List[int]] = {}
+        queue = deque(self.access_points)
+        while queue:
+            node = queue.popleft()
+            for node_next in topology.get_neighbours_in_zone(node):
+                if not topology.components[node_next].is_target:
+                    continue
+                if node_next not in self.level:
+                    self.level[node_next] = self.level[node] + 1
+                    self.nodes.append(node_next)
+                    self.successors[node_next] = []
+                    self.predecessors[node_next] = []
+                    queue.append(node_next)
+                elif self.level[node_next] != self.level[node] + 1 or node in self.predecessors[node_next]:
+                    continue
+                self.predecessors[node_next].append(node)
+                self.successors[node].append(node_next)
+
+    def get_paths(self, node:int) -> List[List[int]]:
+        # Returns all paths from an access point to the node, each starting with the access point
+        paths:List[List[int]] = []
+        stack:List[List[int]] = [[node]]
+        while stack:
+            path = stack.pop()
+            predecessors = self.predecessors.get(path[-1], [])
+            if not predecessors:
+                paths.append(path[::-1])
+            for predecessor in reversed(predecessors):
+                stack.append(path + [predecessor])
+        return paths
+
+
+class BestAttackPaths():
+    # Attacker-optimal paths to all targets of a zone. The complexity of a path is the highest complexity of its components
+    # and the attacker takes the path with the lowest complexity. All access points are the sources of one Dijkstra search,
+    # so that each target is settled once with its best path, independent of the order of the access points and branches
+
+    def __init__(self, attack_paths:AttackPathDag, component_complexities:dict[int, Complexity_Enum]):
+        self.attack_paths:AttackPathDag = attack_paths
+        self.path_complexity:dict[int, Complexity_Enum] = {}
+        self.best_predecessor:dict[int, int] = {}
+        heap:list[tuple[int, int]] = []
+        for node in attack_paths.access_points:
+            self.path_complexity[node] = Complexity_Enum.get_max(Complexity_Enum.LOW, component_complexities.get(node, Complexity_Enum.LOW))
+            heapq.heappush(heap, (COMPLEXITY_RANK[self.path_complexity[node]], node))
+        settled:set[int] = set()
+        while heap:
+            (_, node) = heapq.heappop(heap)
+            if node in settled:
+                continue
+            settled.add(node)
+            # All links to targets of the zone are followed, not only the shortest paths of the attack path DAG
+            for node_next in attack_paths.topology.get_neighbours_in_zone(node):
+                if node_next in settled or node_next not in attack_paths.predecessors:
+                    continue
+                complexity = Complexity_Enum.get_max(self.path_complexity[node], component_complexities.get(node_next, Complexity_Enum.LOW))
+                if node_next not in self.path_complexity or COMPLEXITY_RANK[complexity] < COMPLEXITY_RANK[self.path_complexity[node_next]]:
+                    self.path_complexity[node_next] = complexity
+                    self.best_predecessor[node_next] = node
+                    heapq.heappush(heap, (COMPLEXITY_RANK[complexity], node_next))
+
+    def get_path_complexity(self, node:int) -> Complexity_Enum:
+        return self.path_complexity[node]
+
+    def get_best_path(self, node:int) -> list[int]:
+        # Returns the path with the lowest complexity from an access point to the node
+        path:list[int] = [node]
+        while path[-1] in self.best_predecessor:
+            path.append(self.best_predecessor[path[-1]])
+        return path[::-1]
@@ -1,4 +1,6 @@
+from collections.abc import MutableMapping
 from enum import Enum
+from functools import lru_cache
 
 
 class SL_Status_Enum(Enum):
@@ -24,19 +26,146 @@ class Security_Level_Enum(Enum):
     SL_STATUS = "SL-Status"
 
 
+# Intel Threat Agent Library (TAL) attributes of an attacker in ascending order
+TAL_SKILLS = ("None", "Minimal", "Operational", "Adept")
+TAL_RESOURCES = ("Individual", "Club", "Contest", "Team", "Organization", "Government")
+
+# Shared CR/SR key table of all SL-Vectors (number of CRs/SRs per FR 1 to 7 of the IEC 62443)
+CR_SR_LIST_OF_LENGTHS = (14, 13, 14, 3, 4, 2, 8)
+CR_SR_KEYS:tuple[str, ...] = tuple(f"{i+1}.{j+1}" for i in range(len(CR_SR_LIST_OF_LENGTHS)) for j in range(CR_SR_LIST_OF_LENGTHS[i]))
+CR_SR_INDEX:dict[str, int] = {key: index for index, key in enumerate(CR_SR_KEYS)}
+CR_SR_COUNT = len(CR_SR_KEYS)
+
+# The SL-Status is stored as small int. NODEFINITION is encoded as 0, so that new vectors are initialized with it
+SL_STATUS_BY_CODE:tuple[SL_Status_Enum, ...] = tuple(SL_Status_Enum)
+SL_STATUS_CODES:dict[SL_Status_Enum, int] = {status: code for code, status in enumerate(SL_STATUS_BY_CODE)}
+
+
+# Byte lanes: The bytes of one or more stacked SL-Vectors (rows) are read as one integer, so that all CRs/SRs are
+# compared with a few integer operations. A lane mask has the bit 0x80 set in each lane where the condition is true
+LANE_HIGH_BIT = 0x80
+
+
+@lru_cache(maxsize=None)
+def get_lanes(value:int, rows:int = 1) -> int:
+    return int.from_bytes(bytes((value,)) * (rows * CR_SR_COUNT), "big")
+
+
+def stack_vectors(security_levels) -> int:
+    return int.from_bytes(b"".join([security_level.vector for security_level in security_levels]), "big")
+
+
+def unstack_vectors(lanes:int, security_levels:list):
+    data = lanes.to_bytes(len(security_levels) * CR_SR_COUNT, "big")
+    for row, security_level in enumerate(security_levels):
+        security_level.vector[:] = data[row * CR_SR_COUNT:(row + 1) * CR_SR_COUNT]
+
+
+def lanes_less_than(a:int, b:int, rows:int = 1) -> int:
+    # Each lane is computed as 0x80 + b - a - 1. All values are below 0x80, so that no borrow crosses a lane
+    return ((b | get_lanes(LANE_HIGH_BIT, rows)) - a - get_lanes(1, rows)) & get_lanes(LANE_HIGH_BIT, rows)
+
+
+def lanes_equal(a:int, value:int, rows:int = 1) -> int:
+    difference = a ^ get_lanes(value, rows)
+    return ~((difference | get_lanes(LANE_HIGH_BIT, rows)) - get_lanes(1, rows)) & get_lanes(LANE_HIGH_BIT, rows)
+
+
+def lanes_with_value(mask:int, value:int) -> int:
+    # Converts a lane mask into lanes containing the value, e.g. a SL-Status code or 0xFF to select whole lanes
+    return (mask >> 7) * value
+
+
+def count_lanes(mask:int) -> int:
+    return bin(mask).count("1")
+
+
+# Digits of the lanes of a lane mask, see get_lane_bits()
+LANE_DIGITS = bytes.maketrans(bytes((0, LANE_HIGH_BIT)), b"01")
+
+
+def get_lane_bits(mask:int) -> int:
+    # Converts the lane mask of one row into a bitmask with bit i for lane i, i.e. for CR_SR_KEYS[i]. The lanes are
+    # translated to binary digits with lane 0 as last digit, so that no lane is handled in Python
+    return int(mask.to_bytes(CR_SR_COUNT, "big").translate(LANE_DIGITS)[::-1], 2)
+
+
+def split_rows(lanes:int, rows:int) -> list[int]:
+    data = lanes.to_bytes(rows * CR_SR_COUNT, "big")
+    return [int.from_bytes(data[row * CR_SR_COUNT:(row + 1) * CR_SR_COUNT], "big") for row in range(rows)]
+
+
+def or_rows(rows:list[int]) -> int:
+    # Reduces rows to one row, e.g. "any component of the zone"
+    result = 0
+    for row in rows:
+        result |= row
+    return result
+
+
+def lanes_maximum(a:int, b:int, rows:int = 1) -> int:
+    b_is_greater = lanes_with_value(lanes_less_than(a, b, rows), 0xFF)
+    return (a & ~b_is_greater) | (b & b_is_greater)
+
+
+def maximum_of_rows(rows:list[int]) -> int:
+    result = 0
+    for row in rows:
+        result = lanes_maximum(result, row)
+    return result
+
+
+class CR_SR_Vector(MutableMapping):
+    # Dict-style view on the values of a Security_Level_IEC_62443, e.g. sl.cr_sr["3.3"]
+
+    def __init__(self, security_level):
+        self.security_level:Security_Level_IEC_62443 = security_level
+
+    def __getitem__(self, key:str):
+        return self.security_level.get_value(CR_SR_INDEX[key])
+
+    def __setitem__(self, key:str, value):
+        self.security_level.set_value(CR_SR_INDEX[key], value)
+
+    def __delitem__(self, key:str):
+        raise TypeError("CRs/SRs can not be removed from a SL-Vector")
+
+    def __iter__(self):
+        return iter(CR_SR_KEYS)
+
+    def __len__(self) -> int:
+        return CR_SR_COUNT
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+
 class Security_Level_IEC_62443():
 
     def __init__(self, security_level_type:str):
         self.security_level_type:Security_Level_Enum = Security_Level_Enum(security_level_type)
-        if security_level_type is Security_Level_Enum.SL_STATUS:
-            default_value = SL_Status_Enum.NODEFINITION
+        self.is_status:bool = self.security_level_type is Security_Level_Enum.SL_STATUS
+        # One byte per CR/SR in the order of CR_SR_KEYS. SL values are stored directly, SL-Status values as SL_STATUS_CODES
+        self.vector:bytearray = bytearray(CR_SR_COUNT)
+
+    @property
+    def cr_sr(self) -> CR_SR_Vector:
+        return CR_SR_Vector(self)
+
+    def get_value(self, index:int):
+        if self.is_status:
+            return SL_STATUS_BY_CODE[self.vector[index]]
+        return self.vector[index]
+
+    def set_value(self, index:int, value):
+        if self.is_status:
+            self.vector[index] = SL_STATUS_CODES[value]
         else:
-            default_value = 0
-        list_of_lengths = [14, 13, 14, 3, 4, 2, 8]
-        self.cr_sr:dict = {  }
-        for i in range(len(list_of_lengths)):
-            temp = {f"{i+1}.{j+1}" : default_value for j in range(list_of_lengths[i])}
-            self.cr_sr.update(temp)
+            self.vector[index] = int(value)
+
+    def get_status_mask(self, status:SL_Status_Enum) -> int:
+        # Bitmask of all CRs/SRs with the given SL-Status. Bit i stands for CR_SR_KEYS[i]
+        return get_lane_bits(lanes_equal(stack_vectors([self]), SL_STATUS_CODES[status]))
 
     def print_vector(self):
         print(self.security_level_type.value)
@@ -44,8 +173,9 @@ class Security_Level_IEC_62443():
             print("CR/SR", key, "--", self.security_level_type.value, value)
   
     def overwrite_cr_sr_with_value(self, value):
-        for x in self.cr_sr:
-            self.cr_sr[x] = value
+        if self.is_status:
+            value = SL_STATUS_CODES[value]
+        self.vector[:] = bytes((int(value),)) * CR_SR_COUNT
 
 
 class Mitre_Technique():
@@ -58,6 +188,10 @@ class Mitre_Technique():
         self.sl_t = self.determine_sl_t(minimum_tal_skill, minimum_tal_resources)
         self.technique_level:list[Mitre_Technique_Level_Enum] = []
 
+    def is_usable_by(self, tal_skill:str, tal_resources:str) -> bool:
+        # The attacker needs at least the minimum skill and the minimum resources of the Technique
+        return TAL_SKILLS.index(self.minimum_tal_skill) <= TAL_SKILLS.index(tal_skill) and TAL_RESOURCES.index(self.minimum_tal_resources) <= TAL_RESOURCES.index(tal_resources)
+
     def determine_sl_t(self, minimum_tal_skill, minimum_tal_resources) -> int:
         if minimum_tal_resources == "Individual":
             if minimum_tal_skill == "None":
@@ -115,3 +249,86 @@ class Mitre_Mitigation():
         self.name:str = name
         self.id:str = id
         self.cr_sr:str = cr_sr
+
+
+class KnowledgeBase():
+
+    def __init__(self, information_base_file_name:str, mitigations_file_name:str):
+        self.information_base_file_name:str = information_base_file_name
+        self.mitigations_file_name:str = mitigations_file_name
+        self.techniques:list[Mitre_Technique] = []
+        self.mitigations:list[Mitre_Mitigation] = []
+        # Hash indexes, so that the readers do not have to scan the lists per technique or CVE
+        self.technique_by_name:dict[str, Mitre_Technique] = {}
+        self.mitigations_by_name:dict[str, list[Mitre_Mitigation]] = {}
+        self.mitigations_for_technique:dict[str, list[Mitre_Mitigation]] = {}
+        self.technique_names_for_cves:dict[str, list[tuple[str, Mitre_Technique_Level_Enum]]] = {}
+
+    def add_technique(self, technique:Mitre_Technique):
+        self.techniques.append(technique)
+        self.technique_by_name[technique.name] = technique
+
+    def add_mitigation(self, mitigation:Mitre_Mitigation):
+        self.mitigations.append(mitigation)
+        self.mitigations_by_name.setdefault(mitigation.name, []).append(mitigation)
+
+    def add_mitigation_for_technique(self, technique_name:str, mitigation_name:str):
+        mitigations = self.mitigations_for_technique.setdefault(technique_name, [])
+        mitigations.extend(self.mitigations_by_name.get(mitigation_name, []))
+
+    def set_technique_names_for_cve(self, cve_id:str, technique_name_and_levels:list[tuple[str, Mitre_Technique_Level_Enum]]):
+        self.technique_names_for_cves[cve_id] = technique_name_and_levels
+
+
+def get_cr_sr_mask(cr_srs) -> int:
+    # CRs/SRs that are not part of the SL-Vectors are ignored
+    mask = 0
+    for cr_sr in cr_srs:
+        if cr_sr in CR_SR_INDEX:
+            mask |= 1 << CR_SR_INDEX[cr_sr]
+    return mask
+
+
+class TechniqueCrSrIndex():
+    # Index between the MITRE Techniques and the CRs/SRs of their Mitigations. Each Technique gets a bitmask over
+    # CR_SR_KEYS, so that a Technique is unmitigated in a zone if its bitmask and the UNMITIGATED bitmask of the zone overlap
+
+    def __init__(self, techniques:list[Mitre_Technique]):
+        self.techniques:list[Mitre_Technique] = list(techniques)
+        self.mask_by_technique:dict[Mitre_Technique, int] = {}
+        self.techniques_by_cr_sr:dict[str, list[Mitre_Technique]] = {key: [] for key in CR_SR_KEYS}
+        for technique in self.techniques:
+            mask = self.get_mask(technique)
+            for index, key in enumerate(CR_SR_KEYS):
+                if mask >> index & 1:
+                    self.techniques_by_cr_sr[key].append(technique)
+
+    def get_mask(self, technique:Mitre_Technique) -> int:
+        mask = self.mask_by_technique.get(technique)
+        if mask is None:
+            mask = get_cr_sr_mask([mitigation.cr_sr for mitigation in technique.mitigations])
+            self.mask_by_technique[technique] = mask
+        return mask
+
+    def is_unmitigated(self, technique:Mitre_Technique, unmitigated_mask:int) -> bool:
+        return self.get_mask(technique) & unmitigated_mask != 0
+
+    def get_unmitigated_techniques(self, unmitigated_mask:int) -> list[Mitre_Technique]:
+        return [technique for technique in self.techniques if self.get_mask(technique) & unmitigated_mask]
+
+    def get_techniques_for_cr_srs(self, cr_srs:list[str]) -> list[Mitre_Technique]:
+        # Reverse lookup, e.g. which Techniques become unmitigated if SR 5.1 becomes unmitigated
+        return self.get_unmitigated_techniques(get_cr_sr_mask(cr_srs))
+
+
+class AttackerTechniqueCrSrIndex(TechniqueCrSrIndex):
+    # Index for one attacker. Techniques the attacker is not able to use are never unmitigated
+
+    def __init__(self, techniques:list[Mitre_Technique], usable_techniques:list[Mitre_Technique]):
+        self.usable_techniques:set[Mitre_Technique] = set(usable_techniques)
+        super().__init__(techniques)
+
+    def get_mask(self, technique:Mitre_Technique) -> int:
+        if technique not in self.usable_techniques:
+            return 0
+        return super().get_mask(technique)
@@ -1,8 +1,13 @@
+from collections import OrderedDict
 from enum import Enum
-import requests
-import time
+from event_log import get_logger
+from run_context import RunContext, count, measured
+from swimlanes.nvd_reader import NvdDatabase, NvdPrefetch, get_nvd_fetcher
 import json
-import setup
+import os
+import threading
+
+log = get_logger(__name__)
 
 
 class Complexity_Enum(Enum):
@@ -93,10 +98,148 @@ class Risk():
         self.risk = Risk_Enum.NORISK
 
 
+# Order of the complexities for the attacker, who prefers the path with the lowest complexity
+COMPLEXITY_RANK = {Complexity_Enum.LOW: 0, Complexity_Enum.HIGH: 1}
+
+
+class CvssStore():
+    # Process-wide store for CVSS data. The local file with the example CVEs is read only once. CVE objects and CVSS data
+    # requested from the NIST NVD are kept in a LRU cache, so that a CVE is only created once for all assessment steps.
+    # The store is shared by assessments running in several threads. Requests to the NIST NVD are done without the lock
+
+    def __init__(self, example_cves_path:str, max_size:int, nvd_database_path:str = None, offline:bool = False):
+        self.example_cves_path:str = example_cves_path
+        self.nvd_database_path:str = nvd_database_path
+        # Without internet access, CVEs are only read from the local files
+        self.offline:bool = offline
+        self.nvd_database:NvdDatabase = None
+        self.max_size:int = max_size
+        self.known_cves:dict = None
+        self.cves:OrderedDict[str, CVE] = OrderedDict()
+        self.cvss_data:OrderedDict[str, dict] = OrderedDict()
+        self.hits:int = 0
+        self.misses:int = 0
+        self.lock = threading.RLock()
+
+    def get_cve(self, cve_id:str, techniques_for_cve:dict):
+        with self.lock:
+            cve = self.cves.get(cve_id)
+            if cve is not None and cve.techniques is techniques_for_cve:
+                self.hits += 1
+                self.cves.move_to_end(cve_id)
+                count("cvss_store_hits")
+                return cve
+            self.misses += 1
+        count("cvss_store_misses")
+        cve = CVE(cve_id, techniques_for_cve, self.get_cvss_data(cve_id))
+        with self.lock:
+            self.put(self.cves, cve_id, cve)
+        return cve
+
+    def get_known_cves(self) -> dict:
+        with self.lock:
+            if self.known_cves is None:
+                with open(self.example_cves_path) as file:
+                    self.known_cves = json.load(file)
+            return self.known_cves
+
+    def get_nvd_database(self) -> NvdDatabase:
+        # The database is optional and only opened if it was created by the importer before
+        with self.lock:
+            if self.nvd_database is None and self.nvd_database_path is not None and os.path.exists(self.nvd_database_path):
+                self.nvd_database = NvdDatabase(self.nvd_database_path)
+            return self.nvd_database
+
+    def get_cvss_data(self, cve_id:str):
+        with self.lock:
+            if cve_id in self.get_known_cves():
+                # For Test only in order to reduce the number of requtests to the NIST NVD, as this is limited
+                count("cvss_data_from_example_cves")
+                return self.known_cves[cve_id]
+            if cve_id in self.cvss_data:
+                self.cvss_data.move_to_end(cve_id)
+                count("cvss_data_from_cache")
+                return self.cvss_data[cve_id]
+            nvd_database = self.get_nvd_database()
+            if nvd_database is not None:
+                cvss_json = nvd_database.get_cvss_data(cve_id)
+                if cvss_json is not None:
+                    count("cvss_data_from_database")
+                    return cvss_json
+        count("cvss_data_from_nvd")
+        if self.offline:
+            log.warning("Could not get information for", cve_id, "from the local files. NIST NVD is not requested in offline mode")
+            cvss_json = False
+        else:
+            cvss_json = get_nvd_fetcher().request_cvss_data(cve_id)
+        # Also failed requests are stored, so that the NIST NVD is not requested again for the same CVE
+        with self.lock:
+            self.put(self.cvss_data, cve_id, cvss_json)
+        return cvss_json
+
+    def start_prefetch(self, cve_ids:list[str]) -> NvdPrefetch:
+        # Requests all CVEs that are neither stored locally nor cached from the NIST NVD in the background
+        with self.lock:
+            known_cves = self.get_known_cves()
+            nvd_database = self.get_nvd_database()
+            missing_cve_ids = [cve_id for cve_id in dict.fromkeys(cve_ids) if cve_id not in known_cves and cve_id not in self.cvss_data and (nvd_database is None or not nvd_database.contains(cve_id))]
+        if self.offline:
+            missing_cve_ids = []
+        count("cvss_data_prefetched", len(missing_cve_ids))
+        return NvdPrefetch(get_nvd_fetcher(), missing_cve_ids)
+
+    @measured
+    def complete_prefetch(self, prefetch:NvdPrefetch):
+        cvss_data = prefetch.wait()
+        with self.lock:
+            for cve_id, cvss_json in cvss_data.items():
+                self.put(self.cvss_data, cve_id, cvss_json)
+
+    def put(self, cache:OrderedDict, key:str, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.max_size:
+            cache.popitem(last=False)
+
+    def reset_after_fork(self):
+        # The connection to the local NVD database of the parent process must not be used after the fork, and the lock
+        # could have been held by another thread of the parent process
+        self.nvd_database = None
+        self.lock = threading.RLock()
+
+    def get_statistics(self) -> dict:
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "cves": len(self.cves), "requested_cvss_data": len(self.cvss_data)}
+
+
+cvss_stores:dict[tuple, CvssStore] = {}
+cvss_stores_lock = threading.Lock()
+
+
+def get_cvss_store(run_context:RunContext = None) -> CvssStore:
+    # One store per process and settings, which is shared by all runs with the same settings. Without a run, the
+    # settings in setup.py are used
+    if run_context is None:
+        run_context = RunContext()
+    key = (run_context.get_option("EXAMPLE_CVES_PATH"), run_context.get_option("CVSS_CACHE_SIZE"), run_context.get_option("NVD_DATABASE_PATH"), run_context.get_option("NVD_OFFLINE"))
+    with cvss_stores_lock:
+        cvss_store = cvss_stores.get(key)
+        if cvss_store is None:
+            cvss_store = CvssStore(*key)
+            cvss_stores[key] = cvss_store
+        return cvss_store
+
+
+def reset_cvss_stores_after_fork():
+    global cvss_stores_lock
+    cvss_stores_lock = threading.Lock()
+    for cvss_store in cvss_stores.values():
+        cvss_store.reset_after_fork()
+
+
 class CVE():
     
-    def __init__(self, cve_id:str, techniques_for_cve:dict):
-        cvss_json = self.get_cvss_data(cve_id)
+    def __init__(self, cve_id:str, techniques_for_cve:dict, cvss_json):
         self.cve_id:str = cve_id
         self.techniques:dict = techniques_for_cve
         if cvss_json is False:
@@ -110,44 +253,6 @@ class CVE():
             self.complexity:Complexity_Enum = self.determine_complexity(cvss_json, cve_id)
             self.impact:Impact_Enum = self.determine_impact(cvss_json, cve_id)
 
-
-    def get_cvss_data(self, cve_id:str):
-        known_cves = json.load(open(setup.EXAMPLE_CVES_PATH))
-        if cve_id in known_cves:
-            # For Test only in order to reduce the number of requtests to the NIST NVD, as this is limited
-            return known_cves[cve_id]
-        api_url = setup.CVE_API_URL + cve_id
-        retry = 3
-        response = requests.Request()
-        while retry:
-            response = requests.get(api_url)
-            if response.status_code == 200:
-                break
-            elif response.status_code  == 403:
-                print("HTTP REST Error: 403. Probably too many requests. URL:", api_url)
-            else:
-                print("HTTP REST Error: ", response.status_code, api_url)
-            print("Please wait 30 Seconds for next request...", retry, "request attemp(s) left")
-            time.sleep(30)
-            retry-=1
-            if retry == 0:
-                print("Could not get information for", cve_id)
-                return False
-        response_json = response.json()
-        metrics:dict = response_json["vulnerabilities"][0]["cve"]["metrics"]
-        versions = ["cvssMetricV31", "cvssMetricV30", "cvssMetricV20"]
-        version = str()
-        for version in versions:
-            version_exist = metrics.get(version)
-            if version_exist:
-                break
-            elif version == versions[-1]:
-                print("Error: Unknown CVSS Metric Version for", cve_id)
-                print("Checked for the following versions:", versions)
-                return False
-        cvss_json = metrics[version][0]["cvssData"]
-        return cvss_json
-
     def determine_complexity(self, cvss_json, cve_id) -> Complexity_Enum:
         if cvss_json["attackComplexity"] in Complexity_Enum.LOW.value:
             return Complexity_Enum.LOW
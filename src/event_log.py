@@ -0,0 +1,219 @@
+from run_context import RunContext
+import atexit
+import contextlib
+import contextvars
+import json
+import sys
+import threading
+import time
+
+# Events of the assessment, e.g. the steps of each phase and their results. The swimlanes emit events with a level
+# instead of printing them, and the sink of the run decides where they are written: to the console in the layout of
+# the former prints, to a JSON-lines file, or nowhere. Events below the level of the sink are neither formatted nor
+# written, so that checking the level is all an event costs if it is not needed
+
+DEBUG = 10      # Detailed results of each step, e.g. all Techniques or the CVEs of each component (former PRINT_RESULTS)
+INFO = 20       # Steps of the assessment and their overall results
+WARNING = 30    # Errors in the AAS or in the knowledge, which are also listed in the attestation
+ERROR = 40
+LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR}
+LEVEL_NAMES = {level: name for name, level in LEVELS.items()}
+
+
+class Event():
+
+    def __init__(self, level:int, source:str, parts:tuple, fields:dict, message:str = None):
+        self.time:float = time.time()
+        self.level:int = level
+        self.source:str = source
+        # Parts are only joined to the message by the sink, as print() does
+        self.parts:tuple = parts
+        self.fields:dict = fields
+        self.message:str = message
+
+    def get_message(self) -> str:
+        if self.message is None:
+            self.message = " ".join([str(part) for part in self.parts])
+        return self.message
+
+
+class NullSink():
+    # No event is enabled, so that no event is created
+
+    def __init__(self):
+        self.level:int = ERROR + 1
+
+    def write(self, event:Event):
+        pass
+
+    def close(self):
+        pass
+
+
+class ConsoleSink():
+    # Layout of the former console prints. The events are written to sys.stdout at the time of the event, so that the
+    # output of a run can be redirected, see run_context.redirect_output()
+
+    def __init__(self, level:int):
+        self.level:int = level
+
+    def write(self, event:Event):
+        sys.stdout.write(event.get_message() + "\n")
+
+    def close(self):
+        pass
+
+
+class JsonLinesSink():
+    # One JSON object per event. The lines are written in blocks of at least buffer_size bytes and not per event. Each
+    # block is appended with one write, so that runs in other threads or processes can write to the same file without
+    # splitting lines. Empty events, which are only blank lines of the console layout, are skipped
+
+    def __init__(self, file_name:str, level:int, buffer_size:int):
+        self.level:int = level
+        self.file = open(file_name, "ab", buffering=0)
+        self.buffer_size:int = buffer_size
+        self.lines:list[str] = []
+        self.size:int = 0
+        self.lock = threading.Lock()
+
+    def write(self, event:Event):
+        if not event.parts and not event.fields and not event.message:
+            return
+        content = {"time": round(event.time, 6), "level": LEVEL_NAMES[event.level], "source": event.source, "message": event.get_message().strip()}
+        content.update(event.fields)
+        line = json.dumps(content, default=str) + "\n"
+        with self.lock:
+            self.lines.append(line)
+            self.size += len(line)
+            if self.size >= self.buffer_size:
+                self.flush()
+
+    def flush(self):
+        if self.lines:
+            self.file.write("".join(self.lines).encode("utf-8"))
+            self.lines = []
+            self.size = 0
+
+    def close(self):
+        with self.lock:
+            self.flush()
+            self.file.close()
+
+
+class CollectingSink():
+    # Keeps the formatted events, e.g. of a zone assessed in a worker process, so that they can be written to the sink
+    # of the run later and in the order of the zones
+
+    def __init__(self, level:int):
+        self.level:int = level
+        self.events:list[Event] = []
+
+    def write(self, event:Event):
+        event.message = event.get_message()
+        event.parts = ()
+        self.events.append(event)
+
+    def close(self):
+        pass
+
+
+class Logger():
+
+    def __init__(self, source:str):
+        self.source:str = source
+
+    def is_enabled(self, level:int) -> bool:
+        # Check before expensive arguments are computed, e.g. lists of all Techniques
+        return level >= get_sink().level
+
+    def log(self, level:int, *parts, **fields):
+        sink = get_sink()
+        if level >= sink.level:
+            sink.write(Event(level, self.source, parts, fields))
+
+    def debug(self, *parts, **fields):
+        self.log(DEBUG, *parts, **fields)
+
+    def info(self, *parts, **fields):
+        self.log(INFO, *parts, **fields)
+
+    def warning(self, *parts, **fields):
+        self.log(WARNING, *parts, **fields)
+
+    def error(self, *parts, **fields):
+        self.log(ERROR, *parts, **fields)
+
+
+current_sink:contextvars.ContextVar = contextvars.ContextVar("current_sink", default=None)
+default_sink = None
+default_sink_lock = threading.Lock()
+
+
+def get_logger(source:str) -> Logger:
+    return Logger(source)
+
+
+def get_sink():
+    # Sink of the active run. Without an active run, the sink of the settings in setup.py is created once
+    global default_sink
+    sink = current_sink.get()
+    if sink is not None:
+        return sink
+    if default_sink is None:
+        with default_sink_lock:
+            if default_sink is None:
+                default_sink = create_sink()
+                # The buffer of the JSON-lines file is written when the program ends
+                atexit.register(default_sink.close)
+    return default_sink
+
+
+def get_level(run_context:RunContext) -> int:
+    level = run_context.get_option("LOG_LEVEL")
+    if level is not None:
+        return LEVELS[level.upper()]
+    return DEBUG if run_context.get_option("PRINT_RESULTS") else INFO
+
+
+def create_sink(run_context:RunContext = None):
+    # Sink of the options of the run. Without a run, the settings in setup.py are used
+    if run_context is None:
+        run_context = RunContext()
+    backend = run_context.get_option("LOG_BACKEND")
+    if backend.lower() == "console":
+        return ConsoleSink(get_level(run_context))
+    if backend.lower() == "jsonl":
+        return JsonLinesSink(run_context.get_option("LOG_FILE_NAME"), get_level(run_context), run_context.get_option("LOG_BUFFER_SIZE"))
+    if backend.lower() == "none":
+        return NullSink()
+    raise ValueError("Unknown LOG_BACKEND " + backend + ". Backends: console, jsonl, none")
+
+
+@contextlib.contextmanager
+def use_sink(sink):
+    # Events of the current context (thread or asyncio task) are written to the sink. The sink is not closed
+    token = current_sink.set(sink)
+    try:
+        yield sink
+    finally:
+        current_sink.reset(token)
+
+
+@contextlib.contextmanager
+def open_sink(run_context:RunContext = None):
+    # New sink for the options of the run, which is closed (and its buffer written) at the end of the run
+    sink = create_sink(run_context)
+    try:
+        with use_sink(sink):
+            yield sink
+    finally:
+        sink.close()
+
+
+def write_events(events:list[Event]):
+    # Writes collected events to the sink of the current context
+    sink = get_sink()
+    for event in events:
+        if event.level >= sink.level:
+            sink.write(event)
@@ -0,0 +1,37 @@
+from swimlanes.nvd_reader import NvdDatabase
+import os
+import sys
+import time
+import setup
+
+# Imports the NVD data feeds (JSON 2.0, e.g. nvdcve-2.0-2023.json.gz) into the local database used for assessments without
+# internet access. The feeds can be downloaded from https://nvd.nist.gov/vuln/data-feeds
+# Usage: python import_nvd_feeds.py <feed files or directories with feed files>
+# For incremental updates, import the modified feed (nvdcve-2.0-modified.json.gz) again
+
+setup.initialize()
+
+if len(sys.argv) < 2:
+    print("Usage: python import_nvd_feeds.py <feed files or directories with feed files>")
+    sys.exit(1)
+
+feed_file_names:list[str] = []
+for path in sys.argv[1:]:
+    if os.path.isdir(path):
+        feed_file_names.extend([os.path.join(path, file_name) for file_name in sorted(os.listdir(path)) if file_name.lower().endswith((".json", ".json.gz"))])
+    else:
+        feed_file_names.append(path)
+# The yearly feeds are imported first, so that the modified and recent feeds update them
+feed_file_names.sort(key=lambda file_name: "modified" in file_name or "recent" in file_name)
+
+os.makedirs(os.path.dirname(setup.NVD_DATABASE_PATH), exist_ok=True)
+nvd_database = NvdDatabase(setup.NVD_DATABASE_PATH)
+for feed_file_name in feed_file_names:
+    start = time.time()
+    (number_of_imported_cves, number_of_removed_cves) = nvd_database.import_feed(feed_file_name)
+    if number_of_imported_cves == 0 and number_of_removed_cves == 0:
+        print("Skipped", feed_file_name, "| Already imported or no CVSS data")
+    else:
+        print("Imported", feed_file_name, "|", number_of_imported_cves, "CVEs imported and", number_of_removed_cves, "rejected CVEs removed in", round(time.time()-start, 2), "Seconds")
+nvd_database.close()
+print("Database:", setup.NVD_DATABASE_PATH)
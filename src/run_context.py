@@ -0,0 +1,206 @@
+import contextlib
+import contextvars
+import functools
+import json
+import sys
+import threading
+import time
+import setup
+
+# State of one assessment run. The run that is active in the current thread (or asyncio task) is stored in a context
+# variable, so that several assessments can run in one process at the same time. The options and the errors of a run
+# are handed to the steps of the assessment by the pipeline, see assessment_pipeline.py
+
+# Settings of setup.py that can be set per run. The other settings, e.g. the tabs of the workbooks or the requests to
+# the NIST NVD with their rate limit, are the same for all runs of a process
+RUN_OPTIONS = ("PRINT_RESULTS", "LOG_BACKEND", "LOG_LEVEL", "LOG_FILE_NAME", "LOG_BUFFER_SIZE", "MACHINE_ID_SHORT", "EXCEL_AUTOS2_INFORMATION_BASE_PATH",
+               "EXCEL_ICS_ATTACK_MITIGATIONS_PATH", "EXAMPLE_CVES_PATH", "CVSS_CACHE_SIZE", "NVD_DATABASE_PATH", "NVD_OFFLINE", "RISK_ASSESSMENT_WORKERS",
+               "ATTACKER_PROFILE_SWEEP", "MONTE_CARLO_SAMPLES", "MONTE_CARLO_SEED", "MONTE_CARLO_ALL_COMPONENTS", "CR_SR_RANGE", "ATTEST_FILE_NAME",
+               "METRICS_JSON_FILE_NAME", "METRICS_PROMETHEUS_FILE_NAME")
+
+
+class Span():
+    # Computing time of all calls of a step, with the steps called by it as children
+
+    def __init__(self, name:str):
+        self.name:str = name
+        self.seconds:float = 0
+        self.calls:int = 0
+        self.children:dict[str, Span] = {}
+
+    def get_dict(self) -> dict:
+        return {"seconds": round(self.seconds, 6), "calls": self.calls, "children": {name: child.get_dict() for name, child in self.children.items()}}
+
+    def get_paths(self, path:str = "") -> list[tuple[str, "Span"]]:
+        # All spans below this span with their path, e.g. "Phase (1) Network Segmentation/create_conduits"
+        paths = []
+        for name, child in self.children.items():
+            child_path = path + "/" + name if path else name
+            paths.append((child_path, child))
+            paths.extend(child.get_paths(child_path))
+        return paths
+
+
+class RunContext():
+
+    def __init__(self, options:dict = None, output = None):
+        # Options override the settings of setup.py for this run only, e.g. {"PRINT_RESULTS": False, "ATTEST_FILE_NAME": "..."}
+        self.options:dict = dict(options) if options else {}
+        for name in self.options:
+            if name not in RUN_OPTIONS:
+                raise ValueError("Option " + name + " can not be set per run. Options: " + ", ".join(RUN_OPTIONS))
+        self.error_list:list[str] = []
+        # Computing times of the phases of the assessment, with the steps of each phase as nested spans
+        self.spans:Span = Span("Run")
+        # Counters of the run, e.g. number of zones or requests to the NIST NVD
+        self.counters:dict[str, float] = {}
+        self.lock = threading.Lock()
+        # Stream for the printed results of the run. With None, the results are printed to the console
+        self.output = output
+
+    def get_option(self, name:str):
+        # Option of this run, or the setting of setup.py
+        if name in self.options:
+            return self.options[name]
+        return getattr(setup, name)
+
+    @contextlib.contextmanager
+    def activate(self):
+        token = current_run_context.set(self)
+        span_token = current_span.set(None)
+        try:
+            if self.output is not None:
+                with redirect_output(self.output):
+                    yield self
+            else:
+                yield self
+        finally:
+            current_span.reset(span_token)
+            current_run_context.reset(token)
+
+    @contextlib.contextmanager
+    def measure(self, name:str):
+        # Spans are nested in the span that is active in the current thread. Steps running in other threads of the run,
+        # e.g. the prefetch of CVSS data, are measured below the span that was active when the thread was started
+        parent = current_span.get()
+        if parent is None:
+            parent = self.spans
+        span = parent.children.get(name)
+        if span is None:
+            span = parent.children.setdefault(name, Span(name))
+        token = current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            seconds = time.perf_counter() - start
+            current_span.reset(token)
+            with self.lock:
+                span.seconds += seconds
+                span.calls += 1
+
+    def count(self, name:str, value:float = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def get_timings(self) -> dict[str, float]:
+        # Computing time in seconds per phase of the assessment. Phases that are still running are not included
+        return {name: span.seconds for name, span in self.spans.children.items() if span.calls > 0}
+
+    def get_metrics(self) -> dict:
+        with self.lock:
+            return {"spans": {name: span.get_dict() for name, span in self.spans.children.items()}, "counters": dict(self.counters)}
+
+    def get_json(self) -> str:
+        return json.dumps(self.get_metrics(), indent=2)
+
+    def get_prometheus_text(self) -> str:
+        return get_prometheus_text([(path, span.seconds, span.calls) for path, span in self.spans.get_paths()], self.counters)
+
+
+current_run_context:contextvars.ContextVar = contextvars.ContextVar("current_run_context", default=None)
+current_output:contextvars.ContextVar = contextvars.ContextVar("current_output", default=None)
+current_span:contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+output_lock = threading.Lock()
+
+
+def get_run_context() -> RunContext:
+    return current_run_context.get()
+
+
+def measured(function):
+    # Each call of the function is measured as span of the active run. Without an active run, the function is only called
+    @functools.wraps(function)
+    def measured_function(*arguments, **keyword_arguments):
+        run_context = current_run_context.get()
+        if run_context is None:
+            return function(*arguments, **keyword_arguments)
+        with run_context.measure(function.__name__):
+            return function(*arguments, **keyword_arguments)
+    return measured_function
+
+
+def measure(name:str):
+    # Measures a block as span of the active run. Without an active run, nothing is measured
+    run_context = current_run_context.get()
+    if run_context is None:
+        return contextlib.nullcontext()
+    return run_context.measure(name)
+
+
+def count(name:str, value:float = 1):
+    # Counts for the active run. Without an active run, nothing is counted
+    run_context = current_run_context.get()
+    if run_context is not None:
+        run_context.count(name, value)
+
+
+def get_prometheus_text(spans:list[tuple[str, float, int]], counters:dict[str, float]) -> str:
+    # Prometheus text exposition format. The spans are labeled with their path
+    lines = ["# HELP autos2_span_seconds Computing time of the steps of the assessment", "# TYPE autos2_span_seconds counter"]
+    for path, seconds, calls in spans:
+        lines.append("autos2_span_seconds{span=\"" + escape_label(path) + "\"} " + repr(float(seconds)))
+    lines.extend(["# HELP autos2_span_calls Number of calls of the steps of the assessment", "# TYPE autos2_span_calls counter"])
+    for path, seconds, calls in spans:
+        lines.append("autos2_span_calls{span=\"" + escape_label(path) + "\"} " + str(calls))
+    for name, value in sorted(counters.items()):
+        lines.append("# TYPE autos2_" + name + "_total counter")
+        lines.append("autos2_" + name + "_total " + repr(float(value)))
+    return "\n".join(lines) + "\n"
+
+
+def escape_label(value:str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class ContextOutput():
+    # Replaces sys.stdout, so that the output of each thread is written to the stream redirected in its context
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def get_stream(self):
+        stream = current_output.get()
+        return stream if stream is not None else self.stream
+
+    def write(self, text:str) -> int:
+        return self.get_stream().write(text)
+
+    def flush(self):
+        self.get_stream().flush()
+
+    def __getattr__(self, name:str):
+        return getattr(self.get_stream(), name)
+
+
+@contextlib.contextmanager
+def redirect_output(stream):
+    # Same as contextlib.redirect_stdout, but only for the current context. Other threads still print to their own output
+    with output_lock:
+        if not isinstance(sys.stdout, ContextOutput):
+            sys.stdout = ContextOutput(sys.stdout)
+    token = current_output.set(stream)
+    try:
+        yield stream
+    finally:
+        current_output.reset(token)
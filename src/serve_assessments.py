@@ -0,0 +1,32 @@
+from swimlanes.assessment_pipeline import AssessmentPipeline
+from swimlanes.assessment_service import AssessmentServer, AssessmentService
+import argparse
+import setup
+
+# Local HTTP service for assessments. The knowledge and the CVSS data are read once at the start and kept in memory for
+# all requests. Each request is assessed by one of the worker threads, requests that find all workers busy are queued
+# Usage: python serve_assessments.py [--host <host>] [--port <port>] [--workers <number>] [--queue-size <number>]
+# Example: curl -X POST --data-binary @../aas_examples/CPS_Example_1.json "http://127.0.0.1:8080/assess?PRINT_RESULTS=false"
+
+setup.initialize()
+
+parser = argparse.ArgumentParser(description="Local HTTP service for assessments")
+parser.add_argument("--host", default=setup.SERVICE_HOST, help="Address the service listens on")
+parser.add_argument("--port", type=int, default=setup.SERVICE_PORT, help="Port the service listens on")
+parser.add_argument("--workers", type=int, default=setup.SERVICE_WORKERS, help="Number of assessments running at the same time")
+parser.add_argument("--queue-size", type=int, default=setup.SERVICE_QUEUE_SIZE, help="Number of requests waiting for a free worker")
+arguments = parser.parse_args()
+
+pipeline = AssessmentPipeline()
+pipeline.warm_up()
+service = AssessmentService(pipeline, arguments.workers, arguments.queue_size)
+server = AssessmentServer((arguments.host, arguments.port), service)
+print()
+print("Assessment service listening on http://" + arguments.host + ":" + str(server.server_address[1]), "with", arguments.workers, "workers and", arguments.queue_size, "queued requests")
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    print("Stop assessment service")
+finally:
+    server.server_close()
+    service.shutdown()
@@ -3,6 +3,10 @@ import os
 def initialize(): 
     global BASE_PATH
     global PRINT_RESULTS
+    global LOG_BACKEND
+    global LOG_LEVEL
+    global LOG_FILE_NAME
+    global LOG_BUFFER_SIZE
     global MACHINE_ID_SHORT
     global EXCEL_AUTOS2_INFORMATION_BASE_PATH
     global TAB_ICS_ATTACK_INTEL_TAL_MAPPING
@@ -10,17 +14,46 @@ def initialize():
     global TAB_CVE_ICS_MAPPING
     global EXCEL_ICS_ATTACK_MITIGATIONS_PATH
     global TAB_TECHNIQUES_ADDRESSED
+    global KNOWLEDGE_BASE_CACHE_PATH
     global EXAMPLE_CVES_PATH
     global CVE_API_URL
+    global CVSS_CACHE_SIZE
+    global NVD_API_KEY
+    global NVD_DATABASE_PATH
+    global NVD_OFFLINE
+    global NVD_MAX_CONNECTIONS
+    global NVD_RETRIES
+    global NVD_RETRY_BACKOFF
+    global RISK_ASSESSMENT_WORKERS
+    global ATTACKER_PROFILE_SWEEP
+    global MONTE_CARLO_SAMPLES
+    global MONTE_CARLO_SEED
+    global MONTE_CARLO_ALL_COMPONENTS
+    global CR_SR_RANGE
     global ATTEST_FILE_NAME
+    global METRICS_JSON_FILE_NAME
+    global METRICS_PROMETHEUS_FILE_NAME
+    global BATCH_OUTPUT_PATH
+    global SERVICE_HOST
+    global SERVICE_PORT
+    global SERVICE_WORKERS
+    global SERVICE_QUEUE_SIZE
+    global SERVICE_MAX_UPLOAD_SIZE
 
     global error_list
 
 
     BASE_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), "../"))
 
-    # Switch on (True) or of (False) whether the state of the process should be printed
+    # Switch on (True) or of (False) whether the detailed results of each step should be printed (events of level DEBUG, see LOG_LEVEL)
     PRINT_RESULTS = True
+    # Where the events (the printed state) of the assessment are written: "console", "jsonl" (one JSON object per line in LOG_FILE_NAME), or "none"
+    LOG_BACKEND = "console"
+    # Lowest level of the written events: "DEBUG", "INFO", "WARNING", or "ERROR". With None, DEBUG is used if PRINT_RESULTS is switched on and INFO otherwise
+    LOG_LEVEL = None
+    LOG_FILE_NAME = "events.jsonl"
+    # The JSON-lines file is written in blocks of at least this size in bytes
+    LOG_BUFFER_SIZE = 1024 * 1024
     MACHINE_ID_SHORT = "CPS"
 
     EXCEL_AUTOS2_INFORMATION_BASE_PATH = BASE_PATH + "/knowledge/autos2-knowledge_2024_01_23.xlsx"
@@ -31,10 +64,52 @@ def initialize():
     EXCEL_ICS_ATTACK_MITIGATIONS_PATH = BASE_PATH + "/knowledge/ics-attack-v13.1-mitigations.xlsx"
     TAB_TECHNIQUES_ADDRESSED = "techniques addressed"
 
+    # Compiled content of both Excel files. Rebuilt automatically if one of the files changes. Set to None to disable the cache
+    KNOWLEDGE_BASE_CACHE_PATH = BASE_PATH + "/knowledge/cache/knowledge_base.json"
+
     # As the number of requests for the NIST NVD is limited in a certain time, the CVEs that are relevant for the test scenarios are manually stored here
     EXAMPLE_CVES_PATH = BASE_PATH + "/knowledge/example_cves.json"
     CVE_API_URL = "https://services.nvd.nist.gov/rest/json/cves/2.0?cveId="
+    # Maximum number of CVEs kept in memory by the CVSS store
+    CVSS_CACHE_SIZE = 4096
+    # Optional API key for the NIST NVD (environment variable NVD_API_KEY). With a key, 50 instead of 5 requests per 30 seconds are allowed
+    NVD_API_KEY = os.environ.get("NVD_API_KEY")
+    NVD_MAX_CONNECTIONS = 10
+    # Number of attempts per CVE. The wait time between the attempts starts with NVD_RETRY_BACKOFF seconds and is doubled for each retry
+    NVD_RETRIES = 3
+    NVD_RETRY_BACKOFF = 6
+    # Local database with the CVSS data of the NVD data feeds, see import_nvd_feeds.py. Set to None to disable the database
+    NVD_DATABASE_PATH = BASE_PATH + "/knowledge/cache/nvd_cvss.sqlite"
+    # Switch on (True) without internet access. CVEs are then only read from the local files and never requested from the NIST NVD
+    NVD_OFFLINE = False
+
+    # Number of processes for the risk assessment of the zones (environment variable RISK_ASSESSMENT_WORKERS). With more than one process, the zones are assessed in parallel
+    RISK_ASSESSMENT_WORKERS = int(os.environ.get("RISK_ASSESSMENT_WORKERS", "1"))
+
+    # Switch on (True) to assess the Risks of the Targets additionally for all Intel TAL attacker profiles (Skill x Resources)
+    ATTACKER_PROFILE_SWEEP = False
+
+    # Number of random SL-C/SL-A assignments of the Monte Carlo analysis. 0 switches the analysis off
+    MONTE_CARLO_SAMPLES = 0
+    MONTE_CARLO_SEED = 0
+    # Switch on (True) to randomize all components and not only the components without SL-C in the AAS
+    MONTE_CARLO_ALL_COMPONENTS = False
+    # Range of the random SL values, as in aas_examples/Random_SL_Generator.py
+    CR_SR_RANGE = (0, 3)
 
     ATTEST_FILE_NAME = "Attest.pdf"
+    # Computing times per phase and step and counters of each run, as JSON and in the Prometheus text format. Set to None to write no file
+    METRICS_JSON_FILE_NAME = None
+    METRICS_PROMETHEUS_FILE_NAME = None
+    # Directory for the attestations, logs, and the summary of the batch assessment, see assess_machines.py
+    BATCH_OUTPUT_PATH = BASE_PATH + "/batch_results"
+    # Assessment service, see serve_assessments.py. By default, only requests from this computer are accepted
+    SERVICE_HOST = "127.0.0.1"
+    SERVICE_PORT = 8080
+    # Number of assessments running at the same time and of requests waiting for a free worker. Further requests are rejected (HTTP 503)
+    SERVICE_WORKERS = 4
+    SERVICE_QUEUE_SIZE = 16
+    # Maximum size of an uploaded AAS-JSON in bytes
+    SERVICE_MAX_UPLOAD_SIZE = 100 * 1024 * 1024
 
     error_list = []
\ No newline at end of file
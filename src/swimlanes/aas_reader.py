@@ -0,0 +1,270 @@
+from concurrent.futures import ThreadPoolExecutor
+from domain_model.asset_classes import AasEnvironmentIndex, ASSESSMENT_SUBMODEL_SEMANTIC_IDS, get_semantic_id
+from event_log import get_logger
+from run_context import measured
+from swimlanes.json_stream_reader import JsonStreamReader
+from xml.etree.ElementTree import iterparse
+import io
+import mmap
+import os
+import posixpath
+import sys
+import zipfile
+
+log = get_logger(__name__)
+
+# Meta information of Submodels and SubmodelElements which is not read by the assessment and therefore not kept in memory
+UNUSED_SUBMODEL_KEYS = frozenset(("constraints", "qualifiers", "descriptions", "description", "hasDataSpecification", "embeddedDataSpecifications",
+                                  "modelType", "valueType", "category", "kind", "local", "index", "idType", "allowDuplicates", "ordered"))
+
+AASX_ORIGIN_RELATIONSHIP = "http://www.admin-shell.io/aasx/relationships/aasx-origin"
+AASX_SPEC_RELATIONSHIP = "http://www.admin-shell.io/aasx/relationships/aas-spec"
+
+
+class MemoryMappedFile():
+    # zipfile needs a seekable file object. mmap objects only provide seekable() since Python 3.13
+
+    def __init__(self, memory:mmap.mmap):
+        self.memory:mmap.mmap = memory
+
+    def read(self, size:int = -1) -> bytes:
+        return self.memory.read(size)
+
+    def seek(self, offset:int, whence:int = os.SEEK_SET) -> int:
+        self.memory.seek(offset, whence)
+        return self.memory.tell()
+
+    def tell(self) -> int:
+        return self.memory.tell()
+
+    def seekable(self) -> bool:
+        return True
+
+
+@measured
+def load_aas_environment(file_name:str) -> AasEnvironmentIndex:
+    # The AAS-JSON is streamed. Only the AASs and the Submodels used by the assessment are kept in memory, all other
+    # Submodels, Assets, and ConceptDescriptions are skipped element by element
+    with open(file_name, "r", encoding="utf-8") as file:
+        return load_aas_environment_from_file(file, file_name)
+
+
+@measured
+def load_aas_environment_from_file(file, file_name:str) -> AasEnvironmentIndex:
+    # Same as load_aas_environment for an AAS-JSON that is already opened, e.g. uploaded to the assessment service
+    (shells, submodels, number_of_skipped_submodels) = read_aas_environment_json(file)
+    log.info("Loaded", len(shells), "AASs and", len(submodels), "Submodels from", file_name, "|", number_of_skipped_submodels, "Submodels not needed for the assessment are skipped")
+    return AasEnvironmentIndex(shells, submodels)
+
+
+@measured
+def load_aasx_packages(package_paths, max_workers:int = None) -> AasEnvironmentIndex:
+    # Accepts a directory with AASX files or a list of AASX files. The packages are read in parallel and merged into one
+    # environment without writing a merged AAS-JSON file
+    if isinstance(package_paths, str):
+        if os.path.isdir(package_paths):
+            package_paths = [os.path.join(package_paths, file_name) for file_name in sorted(os.listdir(package_paths)) if file_name.lower().endswith(".aasx")]
+        else:
+            package_paths = [package_paths]
+    shells:list[dict] = []
+    submodels:list[dict] = []
+    number_of_skipped_submodels = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # The results are merged in the order of the given packages, so that the environment does not depend on the scheduling
+        for (package_shells, package_submodels, package_skipped_submodels) in executor.map(read_aasx_package, package_paths):
+            shells.extend(package_shells)
+            submodels.extend(package_submodels)
+            number_of_skipped_submodels += package_skipped_submodels
+    log.info("Loaded", len(shells), "AASs and", len(submodels), "Submodels from", len(package_paths), "AASX packages |", number_of_skipped_submodels, "Submodels not needed for the assessment are skipped")
+    return AasEnvironmentIndex(shells, submodels)
+
+
+def read_aas_environment_json(file) -> tuple[list[dict], list[dict], int]:
+    shells:list[dict] = []
+    submodels:list[dict] = []
+    number_of_skipped_submodels = 0
+    reader = JsonStreamReader(file)
+    for key in reader.iterate_object():
+        if key == "assetAdministrationShells":
+            shells.extend(reader.iterate_array())
+        elif key == "submodels":
+            for submodel in reader.iterate_array():
+                if get_semantic_id(submodel) in ASSESSMENT_SUBMODEL_SEMANTIC_IDS:
+                    submodels.append(prune_json_element(submodel))
+                else:
+                    number_of_skipped_submodels += 1
+        else:
+            reader.skip_value()
+    return (shells, submodels, number_of_skipped_submodels)
+
+
+def read_aasx_package(package_path:str) -> tuple[list[dict], list[dict], int]:
+    shells:list[dict] = []
+    submodels:list[dict] = []
+    number_of_skipped_submodels = 0
+    with open(package_path, "rb") as file:
+        # The package is memory-mapped, so that the members are read directly from the page cache
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as package_memory:
+            with zipfile.ZipFile(MemoryMappedFile(package_memory)) as package:
+                # Only the AAS-Spec parts are decoded. Supplementary files (e.g. pictures, documents) are never read
+                for spec_part in get_aasx_spec_parts(package):
+                    with package.open(spec_part) as member:
+                        if spec_part.lower().endswith(".json"):
+                            (part_shells, part_submodels, part_skipped_submodels) = read_aas_environment_json(io.TextIOWrapper(member, encoding="utf-8-sig"))
+                        elif spec_part.lower().endswith(".xml"):
+                            (part_shells, part_submodels, part_skipped_submodels) = read_aas_environment_xml(member)
+                        else:
+                            raise ValueError("Unknown AAS-Spec format in AASX package", package_path, spec_part)
+                    shells.extend(part_shells)
+                    submodels.extend(part_submodels)
+                    number_of_skipped_submodels += part_skipped_submodels
+    return (shells, submodels, number_of_skipped_submodels)
+
+
+def get_aasx_spec_parts(package:zipfile.ZipFile) -> list[str]:
+    spec_parts:list[str] = []
+    for origin_part in get_relationship_targets(package, "", AASX_ORIGIN_RELATIONSHIP):
+        for spec_part in get_relationship_targets(package, origin_part, AASX_SPEC_RELATIONSHIP):
+            spec_parts.append(spec_part)
+    return spec_parts
+
+
+def get_relationship_targets(package:zipfile.ZipFile, source_part:str, relationship_type:str) -> list[str]:
+    # Relationships of an OPC part are stored in "_rels/<part name>.rels" next to the part
+    (directory, part_name) = posixpath.split(source_part)
+    relationships_part = posixpath.join(directory, "_rels", part_name + ".rels")
+    if relationships_part not in package.namelist():
+        return []
+    targets:list[str] = []
+    with package.open(relationships_part) as member:
+        for _, element in iterparse(member):
+            if get_local_name(element.tag) == "Relationship" and element.get("Type") == relationship_type:
+                target = element.get("Target")
+                if target.startswith("/"):
+                    target = target[1:]
+                else:
+                    target = posixpath.normpath(posixpath.join(directory, target))
+                targets.append(target)
+    return targets
+
+
+def read_aas_environment_xml(file) -> tuple[list[dict], list[dict], int]:
+    # The XML (AAS Metamodel V2) is converted to the structure of the AAS-JSON, so that all following steps are independent of the format
+    shells:list[dict] = []
+    submodels:list[dict] = []
+    number_of_skipped_submodels = 0
+    path:list[str] = []
+    for event, element in iterparse(file, events=("start", "end")):
+        if event == "start":
+            path.append(get_local_name(element.tag))
+            continue
+        path.pop()
+        if len(path) != 2:
+            continue
+        name = get_local_name(element.tag)
+        if name == "assetAdministrationShell":
+            shells.append(convert_xml_shell(element))
+        elif name == "submodel":
+            submodel = convert_xml_submodel(element)
+            if get_semantic_id(submodel) in ASSESSMENT_SUBMODEL_SEMANTIC_IDS:
+                submodels.append(prune_json_element(submodel))
+            else:
+                number_of_skipped_submodels += 1
+        # Free the converted or skipped element, so that only one AAS or Submodel is in memory at once
+        element.clear()
+    return (shells, submodels, number_of_skipped_submodels)
+
+
+def convert_xml_shell(element) -> dict:
+    shell:dict = {"submodels": []}
+    for child in element:
+        name = get_local_name(child.tag)
+        if name == "idShort":
+            shell["idShort"] = child.text or ""
+        elif name == "identification":
+            shell["identification"] = convert_xml_identification(child)
+        elif name == "assetRef":
+            shell["asset"] = convert_xml_reference(child)
+        elif name == "submodelRefs":
+            shell["submodels"] = [convert_xml_reference(submodel_ref) for submodel_ref in child]
+    return shell
+
+
+def convert_xml_submodel(element) -> dict:
+    submodel:dict = {"submodelElements": []}
+    for child in element:
+        name = get_local_name(child.tag)
+        if name == "idShort":
+            submodel["idShort"] = child.text or ""
+        elif name == "identification":
+            submodel["identification"] = convert_xml_identification(child)
+        elif name == "semanticId":
+            submodel["semanticId"] = convert_xml_reference(child)
+        elif name == "submodelElements":
+            submodel["submodelElements"] = [convert_xml_submodel_element(submodel_element) for submodel_element in child]
+    return submodel
+
+
+def convert_xml_submodel_element(wrapper) -> dict:
+    # Each <submodelElement> wraps exactly one element, e.g. <property> or <submodelElementCollection>
+    element = wrapper[0]
+    element_type = get_local_name(element.tag)
+    submodel_element:dict = {}
+    if element_type == "submodelElementCollection":
+        submodel_element["value"] = []
+    for child in element:
+        name = get_local_name(child.tag)
+        if name == "idShort":
+            submodel_element["idShort"] = child.text or ""
+        elif name == "semanticId":
+            submodel_element["semanticId"] = convert_xml_reference(child)
+        elif name == "assetRef":
+            submodel_element["asset"] = convert_xml_reference(child)
+        elif name in ("first", "second"):
+            submodel_element[name] = convert_xml_reference(child)
+        elif name == "entityType":
+            submodel_element["entityType"] = child.text or ""
+        elif name == "statements":
+            submodel_element["statements"] = [convert_xml_submodel_element(statement) for statement in child]
+        elif name == "value":
+            submodel_element["value"] = convert_xml_value(child)
+    return submodel_element
+
+
+def convert_xml_value(element):
+    child_names = [get_local_name(child.tag) for child in element]
+    if "keys" in child_names:
+        return convert_xml_reference(element)
+    elif "submodelElement" in child_names:
+        return [convert_xml_submodel_element(child) for child in element]
+    elif "langString" in child_names:
+        return {"langString": [{"language": child.get("lang"), "text": child.text or ""} for child in element]}
+    return element.text or ""
+
+
+def convert_xml_reference(element) -> dict:
+    keys:list[dict] = []
+    for child in element:
+        if get_local_name(child.tag) == "keys":
+            for key in child:
+                keys.append({"type": key.get("type"), "local": key.get("local") == "true", "value": (key.text or "").strip(), "idType": key.get("idType")})
+    return {"keys": keys}
+
+
+def convert_xml_identification(element) -> dict:
+    return {"idType": element.get("idType"), "id": (element.text or "").strip()}
+
+
+def get_local_name(tag:str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def prune_json_element(json_element):
+    # Removes the unused meta information and shares equal strings (e.g. Semantic-IDs) between all elements
+    if isinstance(json_element, dict):
+        return {sys.intern(key): prune_json_element(value) for key, value in json_element.items() if key not in UNUSED_SUBMODEL_KEYS}
+    elif isinstance(json_element, list):
+        return [prune_json_element(value) for value in json_element]
+    elif isinstance(json_element, str):
+        return sys.intern(json_element)
+    return json_element
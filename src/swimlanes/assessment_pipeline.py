@@ -0,0 +1,305 @@
+from domain_model.asset_classes import Machine
+from domain_model.requirements_guarantees_classes import KnowledgeBase, Mitre_Mitigation, Mitre_Technique, Security_Level_IEC_62443, TechniqueCrSrIndex
+from domain_model.risk_assessment_classes import CvssStore, get_cvss_store
+from event_log import DEBUG, get_logger, open_sink
+from run_context import RunContext
+from swimlanes.aas_reader import load_aas_environment, load_aas_environment_from_file, load_aasx_packages
+from swimlanes.attacker_profile_sweep import sweep_attacker_profiles
+from swimlanes.attestation import create_attestation
+from swimlanes.autos2_information_base_reader import load_knowledge_base, get_techniques_from_information_base, get_mitigations_from_information_base, assign_mitigations_to_technique, get_technique_dict_for_cves_from_information_base
+from swimlanes.monte_carlo_sensitivity import analyze_sl_sensitivity
+from swimlanes.network_segmentation import create_conduits, create_zones
+from swimlanes.parallel_risk_assessment import assess_zones_in_parallel
+from swimlanes.requirements_guarantees import generate_mitre_sl_t_vector, initialize_sl_status_vector, initialize_sl_t_with_mitre_sl_t, evaluation_on_component_level, get_sl_t_for_system, evaluation_on_system_level
+from swimlanes.risk_assessment import check_access_point_vulnerabilities, check_path_asset_vulnerabilities, check_target_assets_vulnerabilities, collect_all_access_points, collect_all_path_assets, collect_all_targets, determine_risks
+import os
+import threading
+import time
+import setup
+
+log = get_logger(__name__)
+
+
+class Knowledge():
+    # AutoS² Expert Knowledge and MITRE Knowledge, which is the same for all runs. The errors found while reading the
+    # knowledge are added to the errors of each run
+
+    def __init__(self, knowledge_base:KnowledgeBase):
+        self.knowledge_base:KnowledgeBase = knowledge_base
+        self.errors:list[str] = []
+        log.info()
+        all_mitre_techniques:list[Mitre_Technique] = get_techniques_from_information_base(knowledge_base)
+        log.info()
+        all_mitre_mitigations:list[Mitre_Mitigation] = get_mitigations_from_information_base(knowledge_base, self.errors)
+        log.info()
+        self.all_mitre_techniques:list[Mitre_Technique] = assign_mitigations_to_technique(knowledge_base, all_mitre_techniques, all_mitre_mitigations, self.errors)
+        log.info()
+        # Index the CRs/SRs of the Mitigations of each Technique as bitmask
+        self.technique_index:TechniqueCrSrIndex = TechniqueCrSrIndex(self.all_mitre_techniques)
+        # Generate SL-T Vector based in MITRE Techniques
+        self.mitre_sl_t:Security_Level_IEC_62443 = generate_mitre_sl_t_vector(self.all_mitre_techniques)
+        log.info()
+        # Technique List for CVEs, which is only read for Phase (3)
+        self.techniques_for_cves:dict = None
+        self.techniques_for_cves_errors:list[str] = []
+
+
+class AssessmentPipeline():
+    # Phases (1) to (4) of the assessment of a machine. The knowledge is read by the first run and kept for all further
+    # runs, as well as the CVSS data in the CVSS Store. Each run has its own RunContext with the errors, the options, and
+    # the computing times, so that a pipeline can be used by several threads at the same time. The options of the run
+    # and its errors are handed to each step
+
+    def __init__(self):
+        # Knowledge per paths of the two workbooks, which can be set per run
+        self.knowledge:dict[tuple[str, str], Knowledge] = {}
+        # CVSS Store of the settings in setup.py. Runs with other options for the CVSS data use the store of their options
+        self.cvss_store:CvssStore = get_cvss_store()
+        self.lock = threading.Lock()
+
+    def warm_up(self, run_context:RunContext = None):
+        # Reads all knowledge and the locally stored CVEs before the first run, e.g. before worker processes are forked
+        if run_context is None:
+            run_context = RunContext()
+        with run_context.activate(), open_sink(run_context):
+            self.get_techniques_for_cves(self.get_knowledge(run_context), run_context)
+            get_cvss_store(run_context).get_known_cves()
+
+    def prefetch_cvss_data(self, paths:list[str], run_context:RunContext = None):
+        # Requests the CVSS data of the CVEs of all machines from the NIST NVD before worker processes are forked, so that
+        # the workers find the CVSS data in the CVSS Store and do not each send requests within the rate limit. Only the
+        # warnings are written, as the machines are loaded again and printed by their runs
+        if run_context is None:
+            run_context = RunContext({"LOG_LEVEL": "WARNING"})
+        cvss_store = get_cvss_store(run_context)
+        if cvss_store.offline:
+            return
+        with run_context.activate(), open_sink(run_context):
+            knowledge = self.get_knowledge(run_context)
+            cve_ids:list[str] = []
+            for path in paths:
+                try:
+                    machine = self.load_machine(path, machine_id_short=run_context.get_option("MACHINE_ID_SHORT"))
+                except Exception:
+                    # The error is reported by the run of the machine
+                    continue
+                cve_ids.extend(get_assessed_cve_ids(machine, knowledge))
+            cvss_store.complete_prefetch(cvss_store.start_prefetch(cve_ids))
+
+    def get_knowledge(self, run_context:RunContext) -> Knowledge:
+        key = (run_context.get_option("EXCEL_AUTOS2_INFORMATION_BASE_PATH"), run_context.get_option("EXCEL_ICS_ATTACK_MITIGATIONS_PATH"))
+        with self.lock:
+            knowledge = self.knowledge.get(key)
+            if knowledge is None:
+                # Read AutoS² Expert Knowledge and MITRE Knowledge (each workbook is read only once)
+                knowledge = Knowledge(load_knowledge_base(*key))
+                self.knowledge[key] = knowledge
+        run_context.error_list.extend(knowledge.errors)
+        return knowledge
+
+    def get_techniques_for_cves(self, knowledge:Knowledge, run_context:RunContext) -> dict:
+        with self.lock:
+            if knowledge.techniques_for_cves is None:
+                # Get Technique List for CVEs from Excel
+                knowledge.techniques_for_cves = get_technique_dict_for_cves_from_information_base(knowledge.knowledge_base, knowledge.techniques_for_cves_errors)
+                log.info()
+        run_context.error_list.extend(knowledge.techniques_for_cves_errors)
+        return knowledge.techniques_for_cves
+
+    def run(self, path:str, run_context:RunContext = None, file = None) -> Machine:
+        # Assesses the machine of an AAS-JSON file, AASX file, or directory with AASX files. The results are kept in the
+        # returned machine and the errors and computing times in the run context. An AAS-JSON that is already opened
+        # is given as file, the path is then only used as its name. The events of the run are written to the sink of the
+        # settings of the run, e.g. to the console or to a JSON-lines file (LOG_BACKEND)
+        if run_context is None:
+            run_context = RunContext()
+        with run_context.activate(), open_sink(run_context):
+            with run_context.measure("Loading of the AAS"):
+                machine = self.load_machine(path, file, run_context.get_option("MACHINE_ID_SHORT"))
+            machine = self.assess(machine, run_context)
+            write_metrics(run_context)
+            return machine
+
+    def load_machine(self, path:str, file = None, machine_id_short:str = None) -> Machine:
+        # Open JSON with all AASs and Submodels of the machine
+        if machine_id_short is None:
+            machine_id_short = setup.MACHINE_ID_SHORT
+        if file is not None:
+            aas_environment = load_aas_environment_from_file(file, path)
+        elif os.path.isdir(path) or path.lower().endswith(".aasx"):
+            aas_environment = load_aasx_packages(path)
+        else:
+            aas_environment = load_aas_environment(path)
+        machine:Machine = None
+        for aas in aas_environment.shells:
+            if aas["idShort"] == machine_id_short:
+                machine = Machine(aas_environment=aas_environment, aas=aas, id=aas["identification"]["id"])
+                break
+        if machine is None:
+            raise ValueError("No AAS with idShort " + machine_id_short + " found in " + path)
+        log.info(machine.id_short + ":")
+        for module in machine.hierarchy:
+            log.info("|--", module.id_short)
+            for component in module.hierarchy:
+                log.info("    |--", component.id_short)
+            if not module.hierarchy:
+                log.info("    |-- No components found in AAS")
+
+        log.info()
+        log.info()
+        return machine
+
+    def assess(self, machine:Machine, run_context:RunContext) -> Machine:
+        cvss_store:CvssStore = get_cvss_store(run_context)
+        error_list:list[str] = run_context.error_list
+
+        # The "machine" containing all AASs and submodels of the machine in scope is always handed to the functions, edited, and returned for the next step
+        start = time.time()
+
+        # Phase (1) Network Segmentation
+        with run_context.measure("Phase (1) Network Segmentation"):
+            log.info("---- Phase (1): Network Segmentation ----")
+            machine = create_zones(machine)
+            log.info()
+
+            machine = create_conduits(machine)
+            log.info()
+            log.info()
+
+        # Phase (2) Requirements Guarantees
+        with run_context.measure("Phase (2) Requirements Guarantees"):
+            log.info("---- Phase (2) Requirements Guarantees ----")
+            log.info()
+
+            # Override SL-Status that was read from AAS before:
+            machine = initialize_sl_status_vector(machine)
+            log.info()
+
+            knowledge = self.get_knowledge(run_context)
+
+            # Request the CVSS data of the CVEs that are not stored locally from the NIST NVD in the background, while Phase (2) and (3) run
+            cvss_prefetch = cvss_store.start_prefetch(get_assessed_cve_ids(machine, knowledge))
+
+            # Override SL-T that was read from AAS before:
+            machine = initialize_sl_t_with_mitre_sl_t(machine, knowledge.mitre_sl_t)
+            log.info()
+
+            # Check the SL-Vectors of the components and assign SHIFTEDTOSYSTEM, TOBECHECKED, MITIGATED, or RECONFIGURATIONADVISED to the SL-Status of the component
+            machine = evaluation_on_component_level(machine)
+            log.info()
+
+            # Get the maximum SL-T for each CR that is shifted to the system level
+            machine = get_sl_t_for_system(machine)
+            log.info()
+
+            # Check the SL-Vectors of the zones and assign UNMITIGATED, MITIGATED, or RECONFIGURATIONADVISED to the SL-Status of the zone
+            machine = evaluation_on_system_level(machine)
+            log.info()
+            log.info()
+
+        with run_context.measure("Phase (3) Risk Assessment"):
+            log.info("---- Phase (3) Risk Assessment ----")
+            log.info()
+
+            techniques_for_cves:dict = self.get_techniques_for_cves(knowledge, run_context)
+            technique_index:TechniqueCrSrIndex = knowledge.technique_index
+
+            # Collect all Access Points defined during creation of Conduits
+            machine = collect_all_access_points(machine)
+            log.info()
+
+            # Set Target for all "SuitableForSafety"-Assets that are no access points
+            machine = collect_all_targets(machine)
+            log.info()
+
+            # Set Path Assets for all assets between an Access Point and Target Asset. Remove "Target"-Bit for all Path Assets
+            machine = collect_all_path_assets(machine)
+            log.info()
+            log.info()
+            count_assets(machine, run_context)
+
+            log.info("Start Risk Assessment for Access Points, Path Assets, and Targets")
+            log.info()
+
+            # Wait for the CVSS data requested from the NIST NVD in the background
+            cvss_store.complete_prefetch(cvss_prefetch)
+
+            risk_assessment_workers:int = run_context.get_option("RISK_ASSESSMENT_WORKERS")
+            if risk_assessment_workers > 1:
+                # Check Access Points, Path Assets, and Target Assets and determine the Risks of all zones in parallel processes
+                machine = assess_zones_in_parallel(machine, techniques_for_cves, technique_index, risk_assessment_workers, cvss_store, error_list)
+            else:
+                # Check Access Points
+                machine = check_access_point_vulnerabilities(machine, techniques_for_cves, technique_index, cvss_store, error_list)
+                log.info()
+
+                # Check Path Assets
+                machine = check_path_asset_vulnerabilities(machine, techniques_for_cves, technique_index, cvss_store, error_list)
+                log.info()
+
+                # Check Target Assets
+                machine = check_target_assets_vulnerabilities(machine, techniques_for_cves, technique_index, cvss_store, error_list)
+                log.info()
+
+                # Determine Risk for each Target Asset
+                machine = determine_risks(machine)
+            log.info()
+            if log.is_enabled(DEBUG):
+                log.debug("CVSS Store:", cvss_store.get_statistics())
+            log.info()
+
+        if run_context.get_option("ATTACKER_PROFILE_SWEEP"):
+            # Risk of each Target per attacker profile. Only the SL evaluation and the risk assessment are repeated per profile
+            with run_context.measure("Attacker Profile Sweep"):
+                sweep_attacker_profiles(machine, techniques_for_cves, technique_index, cvss_store)
+                log.info()
+
+        if run_context.get_option("MONTE_CARLO_SAMPLES") > 0:
+            # Risk distribution of each Target for random SL-C and SL-A values. No AAS files are written
+            with run_context.measure("Monte Carlo Sensitivity"):
+                analyze_sl_sensitivity(machine, techniques_for_cves, technique_index, run_context, cvss_store)
+                log.info()
+
+        log.info("---- Phase (4) Attestation ----")
+        log.info()
+
+        end = time.time()
+        computing_time = round(end-start, 2)
+        with run_context.measure("Phase (4) Attestation"):
+            machine = create_attestation(machine, computing_time, run_context.get_timings(), error_list, run_context.get_option("ATTEST_FILE_NAME"))
+        log.info()
+        log.info()
+        log.info()
+        return machine
+
+
+def get_assessed_cve_ids(machine:Machine, knowledge:Knowledge) -> list[str]:
+    # Only CVEs with Techniques in the AutoS² Information Base are assessed, so that the CVSS data of other CVEs is not needed
+    technique_names_for_cves:dict = knowledge.knowledge_base.technique_names_for_cves
+    return [cve_id for module in machine.hierarchy for component in module.hierarchy for cve_id in component.cve_ids if cve_id in technique_names_for_cves]
+
+
+def count_assets(machine:Machine, run_context:RunContext):
+    zones = [zone for module in machine.hierarchy for zone in module.zones]
+    components = [component for module in machine.hierarchy for component in module.hierarchy]
+    run_context.count("modules", len(machine.hierarchy))
+    run_context.count("components", len(components))
+    run_context.count("zones", len(zones))
+    # Conduits between two zones belong to both zones
+    run_context.count("conduits", len({conduit.id for zone in zones for conduit in zone.conduits}))
+    run_context.count("access_points", len([component for component in components if component.is_access_point]))
+    run_context.count("path_assets", len([component for component in components if component.is_path_asset]))
+    run_context.count("targets", len([component for component in components if component.is_target]))
+    run_context.count("cve_ids", len({cve_id for component in components for cve_id in component.cve_ids}))
+
+
+def write_metrics(run_context:RunContext):
+    # Computing times and counters of the run as JSON and in the Prometheus text format, if file names are set
+    json_file_name = run_context.get_option("METRICS_JSON_FILE_NAME")
+    if json_file_name:
+        with open(json_file_name, "w", encoding="utf-8") as file:
+            file.write(run_context.get_json())
+    prometheus_file_name = run_context.get_option("METRICS_PROMETHEUS_FILE_NAME")
+    if prometheus_file_name:
+        with open(prometheus_file_name, "w", encoding="utf-8") as file:
+            file.write(run_context.get_prometheus_text())
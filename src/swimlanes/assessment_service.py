@@ -0,0 +1,237 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from domain_model.asset_classes import Machine
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from run_context import RunContext, get_prometheus_text
+from swimlanes.assessment_pipeline import AssessmentPipeline
+from urllib.parse import parse_qs, urlparse
+import base64
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import traceback
+import setup
+
+# Options of setup.py that can be set per request as query parameter, e.g. POST /assess?ATTACKER_PROFILE_SWEEP=true
+SERVICE_OPTIONS = ("PRINT_RESULTS", "MACHINE_ID_SHORT", "ATTACKER_PROFILE_SWEEP", "MONTE_CARLO_SAMPLES", "MONTE_CARLO_SEED", "MONTE_CARLO_ALL_COMPONENTS")
+
+
+class ServiceError(Exception):
+
+    def __init__(self, status:int, message:str):
+        super().__init__(message)
+        self.status:int = status
+
+
+class AssessmentJob():
+    # One request: an uploaded AAS-JSON or the path of a machine on this computer, and the options for this run only
+
+    def __init__(self, path:str, upload:bytes, options:dict):
+        self.path:str = path
+        self.upload:bytes = upload
+        self.options:dict = options
+
+
+class AssessmentService():
+    # Assesses the machines of the requests with one pipeline, so that the knowledge and the CVSS data stay in memory for
+    # all requests. At most max_workers assessments run at the same time and at most queue_size further requests wait
+    # for a free worker. Further requests are rejected, so that clients retry later instead of piling up requests
+
+    def __init__(self, pipeline:AssessmentPipeline, max_workers:int, queue_size:int):
+        self.pipeline:AssessmentPipeline = pipeline
+        self.max_workers:int = max_workers
+        self.queue_size:int = queue_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="assessment")
+        self.slots = threading.BoundedSemaphore(max_workers + queue_size)
+        self.lock = threading.Lock()
+        self.number_of_pending_jobs:int = 0
+        self.number_of_running_jobs:int = 0
+        self.number_of_completed_jobs:int = 0
+        self.number_of_failed_jobs:int = 0
+        self.number_of_rejected_jobs:int = 0
+        self.start:float = time.time()
+        # Computing times (seconds and calls per span path) and counters of all runs, see GET /metrics
+        self.spans:dict[str, list[float]] = {}
+        self.counters:dict[str, float] = {}
+
+    def submit(self, job:AssessmentJob) -> Future:
+        # Returns None if all workers are busy and the queue is full
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.number_of_rejected_jobs += 1
+            return None
+        with self.lock:
+            self.number_of_pending_jobs += 1
+        future = self.executor.submit(self.assess, job)
+        future.add_done_callback(lambda future: self.slots.release())
+        return future
+
+    def assess(self, job:AssessmentJob) -> dict:
+        with self.lock:
+            self.number_of_pending_jobs -= 1
+            self.number_of_running_jobs += 1
+        output = io.StringIO()
+        start = time.time()
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                attestation_file_name = os.path.join(directory, "Attest.pdf")
+                # The zones are not assessed in forked processes, as the service runs several assessments in threads
+                options = {"RISK_ASSESSMENT_WORKERS": 1, "ATTEST_FILE_NAME": attestation_file_name}
+                options.update(job.options)
+                run_context = RunContext(options, output)
+                if job.upload is not None:
+                    machine = self.pipeline.run(job.path, run_context, io.TextIOWrapper(io.BytesIO(job.upload), encoding="utf-8"))
+                else:
+                    machine = self.pipeline.run(job.path, run_context)
+                with open(attestation_file_name, "rb") as file:
+                    attestation = base64.b64encode(file.read()).decode("ascii")
+        except Exception as error:
+            with self.lock:
+                self.number_of_running_jobs -= 1
+                self.number_of_failed_jobs += 1
+            traceback.print_exc(file=output)
+            return {"status": "Failed: " + type(error).__name__ + ": " + str(error), "output": output.getvalue()}
+        with self.lock:
+            self.number_of_running_jobs -= 1
+            self.number_of_completed_jobs += 1
+            for path, span in run_context.spans.get_paths():
+                seconds_and_calls = self.spans.setdefault(path, [0, 0])
+                seconds_and_calls[0] += span.seconds
+                seconds_and_calls[1] += span.calls
+            for name, value in run_context.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+        result = get_results(machine, run_context)
+        result["computing_time"] = round(time.time() - start, 2)
+        result["output"] = output.getvalue()
+        result["attestation"] = attestation
+        return result
+
+    def get_statistics(self) -> dict:
+        with self.lock:
+            return {"workers": self.max_workers, "queue_size": self.queue_size, "pending": self.number_of_pending_jobs, "running": self.number_of_running_jobs,
+                    "completed": self.number_of_completed_jobs, "failed": self.number_of_failed_jobs, "rejected": self.number_of_rejected_jobs,
+                    "uptime": round(time.time() - self.start, 2), "cvss_store": self.pipeline.cvss_store.get_statistics()}
+
+    def get_prometheus_text(self) -> str:
+        with self.lock:
+            counters = dict(self.counters)
+            counters.update({"service_completed_jobs": self.number_of_completed_jobs, "service_failed_jobs": self.number_of_failed_jobs, "service_rejected_jobs": self.number_of_rejected_jobs})
+            spans = [(path, seconds, calls) for path, (seconds, calls) in self.spans.items()]
+        return get_prometheus_text(spans, counters)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+def get_results(machine:Machine, run_context:RunContext) -> dict:
+    components = []
+    for module in machine.hierarchy:
+        for component in module.hierarchy:
+            components.append({"module": module.id_short, "component": component.id_short, "id": component.id, "access_point": component.is_access_point,
+                               "path_asset": component.is_path_asset, "target": component.is_target, "risk_id": component.risk.id, "risk": component.risk.risk.value,
+                               "impact": component.risk.impact.value, "complexity": component.risk.complexity.value})
+    # Results of the options ATTACKER_PROFILE_SWEEP and MONTE_CARLO_SAMPLES, or None if they were not enabled
+    attacker_profiles = machine.attacker_profile_sweep.get_risk_matrix() if machine.attacker_profile_sweep is not None else None
+    sensitivity = machine.sl_sensitivity.get_report() if machine.sl_sensitivity is not None else None
+    return {"status": "OK", "machine": machine.id_short, "id": machine.id, "components": components, "attacker_profiles": attacker_profiles, "sensitivity": sensitivity,
+            "errors": run_context.error_list, "timings": {name: round(seconds, 3) for name, seconds in run_context.get_timings().items()}, "metrics": run_context.get_metrics()}
+
+
+def get_options(query:dict[str, list[str]]) -> dict:
+    # The values are converted to the type of the setting in setup.py
+    options = {}
+    for name, values in query.items():
+        if name == "path":
+            continue
+        if name not in SERVICE_OPTIONS:
+            raise ServiceError(400, "Unknown option " + name + ". Options: " + ", ".join(SERVICE_OPTIONS))
+        default = getattr(setup, name)
+        value = values[-1]
+        if isinstance(default, bool):
+            if value.lower() not in ("true", "false"):
+                raise ServiceError(400, "Option " + name + " must be true or false")
+            options[name] = value.lower() == "true"
+        elif isinstance(default, int):
+            try:
+                options[name] = int(value)
+            except ValueError:
+                raise ServiceError(400, "Option " + name + " must be an integer")
+        else:
+            options[name] = value
+    return options
+
+
+class AssessmentRequestHandler(BaseHTTPRequestHandler):
+    # GET /health, GET /statistics, GET /metrics (Prometheus), and POST /assess with an AAS-JSON as body or POST /assess?path=<AAS-JSON file, AASX
+    # file, or directory with AASX files>. The results are returned as JSON with the attestation as base64 encoded PDF,
+    # and with the risks per attacker profile (ATTACKER_PROFILE_SWEEP) and the risk distribution (MONTE_CARLO_SAMPLES) if requested
+
+    server_version = "AutoS2AssessmentService"
+
+    def do_GET(self):
+        service:AssessmentService = self.server.service
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self.send_json(200, {"status": "OK"})
+        elif url.path == "/statistics":
+            self.send_json(200, service.get_statistics())
+        elif url.path == "/metrics":
+            self.send_body(200, service.get_prometheus_text().encode("utf-8"), "text/plain; version=0.0.4")
+        else:
+            self.send_json(404, {"status": "Unknown path " + url.path})
+
+    def do_POST(self):
+        service:AssessmentService = self.server.service
+        url = urlparse(self.path)
+        if url.path != "/assess":
+            self.send_json(404, {"status": "Unknown path " + url.path})
+            return
+        try:
+            job = self.get_job(parse_qs(url.query))
+        except ServiceError as error:
+            self.send_json(error.status, {"status": str(error)})
+            return
+        future = service.submit(job)
+        if future is None:
+            self.send_json(503, {"status": "All workers are busy and the queue is full. Try again later"}, {"Retry-After": "1"})
+            return
+        result = future.result()
+        self.send_json(200 if result["status"] == "OK" else 422, result)
+
+    def get_job(self, query:dict[str, list[str]]) -> AssessmentJob:
+        options = get_options(query)
+        length = int(self.headers.get("Content-Length", 0))
+        if length > setup.SERVICE_MAX_UPLOAD_SIZE:
+            raise ServiceError(413, "AAS-JSON is larger than " + str(setup.SERVICE_MAX_UPLOAD_SIZE) + " bytes")
+        upload = self.rfile.read(length) if length > 0 else None
+        if upload is not None:
+            # The path is then only used as name of the uploaded AAS-JSON
+            return AssessmentJob(query.get("path", ["upload"])[-1], upload, options)
+        if "path" in query:
+            path = query["path"][-1]
+            if not os.path.exists(path):
+                raise ServiceError(404, "File not found: " + path)
+            return AssessmentJob(path, None, options)
+        raise ServiceError(400, "Upload an AAS-JSON or give the path of the machine as query parameter path")
+
+    def send_json(self, status:int, content:dict, headers:dict = None):
+        self.send_body(status, json.dumps(content).encode("utf-8"), "application/json", headers)
+
+    def send_body(self, status:int, body:bytes, content_type:str, headers:dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class AssessmentServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address:tuple[str, int], service:AssessmentService):
+        super().__init__(address, AssessmentRequestHandler)
+        self.service:AssessmentService = service
@@ -0,0 +1,102 @@
+from domain_model.asset_classes import Component, Machine
+from domain_model.network_segmentation_classes import Zone
+from domain_model.requirements_guarantees_classes import AttackerTechniqueCrSrIndex, Mitre_Technique, Security_Level_IEC_62443, TAL_RESOURCES, TAL_SKILLS, TechniqueCrSrIndex
+from domain_model.risk_assessment_classes import CvssStore, Risk_Enum
+from event_log import DEBUG, INFO, get_logger
+from run_context import measured
+from swimlanes.mitigation_simulator import ScenarioZone
+from swimlanes.parallel_risk_assessment import assess_zone_risks
+from swimlanes.requirements_guarantees import evaluate_zone_on_system_level, evaluate_zones_on_component_level, get_sl_t_for_zone, get_sl_t_of_techniques
+
+log = get_logger(__name__)
+
+
+class AttackerProfile():
+    # Intel TAL attacker. The SL-T is derived only from the MITRE Techniques the attacker is able to use
+
+    def __init__(self, tal_skill:str, tal_resources:str, technique_index:TechniqueCrSrIndex):
+        self.tal_skill:str = tal_skill
+        self.tal_resources:str = tal_resources
+        self.techniques:list[Mitre_Technique] = [technique for technique in technique_index.techniques if technique.is_usable_by(tal_skill, tal_resources)]
+        self.technique_index:AttackerTechniqueCrSrIndex = AttackerTechniqueCrSrIndex(technique_index.techniques, self.techniques)
+        self.sl_t:Security_Level_IEC_62443 = get_sl_t_of_techniques(self.techniques)
+        # Risk per target of the sweep
+        self.risks:list[Risk_Enum] = []
+
+    def get_name(self) -> str:
+        return self.tal_skill + " / " + self.tal_resources
+
+
+class AttackerProfileSweep():
+    # Risks of the targets of an assessed machine for all 4 x 6 Intel TAL attacker profiles. The network segmentation,
+    # the CVE information and the attack paths of the assessment are used for all profiles. Only the SL evaluation of
+    # Phase (2) and the risk assessment of Phase (3) depend on the profile. The risks of a zone only depend on its
+    # unmitigated Techniques and are assessed once for all profiles with the same unmitigated Techniques in the zone
+
+    def __init__(self, machine:Machine, techniques_for_cves:dict, technique_index:TechniqueCrSrIndex, cvss_store:CvssStore = None):
+        self.machine:Machine = machine
+        self.techniques_for_cves:dict = techniques_for_cves
+        self.technique_index:TechniqueCrSrIndex = technique_index
+        self.cvss_store:CvssStore = cvss_store
+        topology = machine.topology
+        self.zones:list[Zone] = topology.zones
+        self.zone_nodes:list[list[int]] = [[topology.get_node(component) for component in zone.components] for zone in self.zones]
+        self.target_nodes:list[int] = [node for node, component in enumerate(topology.components) if component.is_target]
+        self.targets:list[Component] = [topology.components[node] for node in self.target_nodes]
+        self.profiles:list[AttackerProfile] = [AttackerProfile(tal_skill, tal_resources, technique_index) for tal_resources in TAL_RESOURCES for tal_skill in TAL_SKILLS]
+        # Risks of the components of a zone per zone index and unmitigated Techniques
+        self.zone_risks:dict[tuple[int, frozenset], list[Risk_Enum]] = {}
+
+    def run(self) -> list[AttackerProfile]:
+        # The components of all zones are evaluated for all profiles as one stacked matrix
+        scenario_zones = [ScenarioZone(zone, profile.sl_t) for profile in self.profiles for zone in self.zones]
+        if scenario_zones:
+            evaluate_zones_on_component_level(scenario_zones)
+        for scenario_zone in scenario_zones:
+            get_sl_t_for_zone(scenario_zone)
+            evaluate_zone_on_system_level(scenario_zone)
+        for profile_index, profile in enumerate(self.profiles):
+            # Components that are not part of a zone keep the risk of the assessment
+            risks = [component.risk.risk for component in self.machine.topology.components]
+            for zone_index in range(len(self.zones)):
+                scenario_zone = scenario_zones[profile_index * len(self.zones) + zone_index]
+                for node, risk in zip(self.zone_nodes[zone_index], self.get_zone_risks(zone_index, scenario_zone, profile)):
+                    risks[node] = risk
+            profile.risks = [risks[node] for node in self.target_nodes]
+        return self.profiles
+
+    def get_zone_risks(self, zone_index:int, scenario_zone:ScenarioZone, profile:AttackerProfile) -> list[Risk_Enum]:
+        unmitigated_techniques = frozenset(technique for technique in profile.techniques if profile.technique_index.is_unmitigated(technique, scenario_zone.unmitigated_mask))
+        zone_risks = self.zone_risks.get((zone_index, unmitigated_techniques))
+        if zone_risks is None:
+            zone_risks = assess_zone_risks(self.zones[zone_index], self.zone_nodes[zone_index], bytes(scenario_zone.sl_status.vector), scenario_zone.unmitigated_mask, self.techniques_for_cves, profile.technique_index, self.cvss_store)
+            self.zone_risks[(zone_index, unmitigated_techniques)] = zone_risks
+        return zone_risks
+
+    def get_risk_matrix(self) -> dict[str, dict[str, str]]:
+        # Risk of each target (idShort) per attacker profile
+        return {profile.get_name(): {target.id_short: risk.value for target, risk in zip(self.targets, profile.risks)} for profile in self.profiles}
+
+    def print_risk_matrix(self):
+        # The risk matrix is the result of the sweep and is written also without PRINT_RESULTS
+        if log.is_enabled(INFO):
+            # One column per target, wide enough for the name of the target and the longest risk
+            widths = [max(len(target.id_short), len(Risk_Enum.NORISK.value)) + 2 for target in self.targets]
+            log.info("|-- {:<30}".format("Attacker (Skill / Resources)") + "".join([target.id_short.ljust(width) for target, width in zip(self.targets, widths)]))
+            for profile in self.profiles:
+                log.info("|-- {:<30}".format(profile.get_name()) + "".join([risk.value.ljust(width) for risk, width in zip(profile.risks, widths)]))
+            if not self.targets:
+                log.info("|-- No Targets")
+
+
+@measured
+def sweep_attacker_profiles(machine:Machine, techniques_for_cves:dict, technique_index:TechniqueCrSrIndex, cvss_store:CvssStore = None) -> AttackerProfileSweep:
+    # The sweep is kept on the machine, so that callers of the pipeline can read the risk matrix, see get_risk_matrix()
+    log.info("Assess the Risks of all Targets for all Intel TAL Attacker Profiles (Skill x Resources)")
+    attacker_profile_sweep = AttackerProfileSweep(machine, techniques_for_cves, technique_index, cvss_store)
+    attacker_profile_sweep.run()
+    machine.attacker_profile_sweep = attacker_profile_sweep
+    attacker_profile_sweep.print_risk_matrix()
+    if log.is_enabled(DEBUG):
+        log.debug("|-- Zones assessed:", len(attacker_profile_sweep.zone_risks), "for", len(attacker_profile_sweep.profiles), "profiles and", len(attacker_profile_sweep.zones), "zones")
+    return attacker_profile_sweep
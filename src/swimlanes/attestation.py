@@ -1,13 +1,24 @@
 from datetime import datetime
+from event_log import get_logger
 from fpdf import FPDF
 from domain_model.asset_classes import Machine
-from domain_model.requirements_guarantees_classes import SL_Status_Enum
+from domain_model.requirements_guarantees_classes import SL_Status_Enum, TAL_RESOURCES, TAL_SKILLS
 from domain_model.risk_assessment_classes import Risk_Enum
+from run_context import measured
+import getpass
 import os
 import setup
 
+log = get_logger(__name__)
 
-def create_attestation(machine:Machine, computing_time:float) -> Machine:
+
+@measured
+def create_attestation(machine:Machine, computing_time:float, timings:dict[str, float] = None, error_list:list[str] = None, file_name:str = None) -> Machine:
+    # Without a run, the errors and the file name of the settings in setup.py are used
+    if error_list is None:
+        error_list = setup.error_list
+    if file_name is None:
+        file_name = setup.ATTEST_FILE_NAME
 
     now = datetime.now()
     machine_hash = hash(machine)
@@ -48,14 +59,14 @@ def create_attestation(machine:Machine, computing_time:float) -> Machine:
                 number_of_reconfiguration_zones += 1
             if SL_Status_Enum.UNMITIGATED in zone.sl_status.cr_sr.values():
                 number_of_unmitigated_zones += 1
-    setup.error_list = list(dict.fromkeys(setup.error_list))    # Remove Duplicates
+    error_list[:] = list(dict.fromkeys(error_list))    # Remove Duplicates
 
     attestation_texts = {}
     attestation_texts["Date and Time of Attestation:"] = (now.strftime("%d.%m.%Y %H:%M:%S"),)
     attestation_texts["Attestation ID:"]               = (str(hex(abs(hash(str(machine_hash)+now.strftime("%d.%m.%Y %H:%M:%S"))))),)
     attestation_texts["Algorithm Computing Time:"]     = (str(computing_time) + " Seconds",)
-    attestation_texts["Operator (Username):"]          = (os.getlogin(),)
-    attestation_texts["Errors from the Algorithm:"]    = (str(len(setup.error_list)) + " Errors",)
+    attestation_texts["Operator (Username):"]          = (get_operator_name(),)
+    attestation_texts["Errors from the Algorithm:"]    = (str(len(error_list)) + " Errors",)
     suc_texts = {}
     suc_texts["Total Number of Modules:"]         = (str(len(machine.hierarchy)),)
     suc_texts["Total Number of Components:"]      = (str(number_of_assets),)
@@ -68,37 +79,47 @@ def create_attestation(machine:Machine, computing_time:float) -> Machine:
     results_texts["Highest Risk of all Target Assets:"]                = (str(highest_risk.value),)
     results_texts["Lowest Intel TAL Attacker Skill (unmitigated):"]    = (str(overall_minimum_tal_skill),)
     results_texts["Lowest Intel TAL Attacker Resource (unmitigated):"] = (str(overall_minimum_tal_resource),)
+    # Computing time of each phase, e.g. to find out whether the time is spent waiting for the NIST NVD or for the path search
+    timing_texts = {}
+    for name, seconds in (timings or {}).items():
+        timing_texts[name + ":"] = (str(round(seconds, 2)) + " Seconds",)
     risks_dict = get_sorted_risks_dict(machine)
     
-    print("Attestation:")
+    log.info("Attestation:")
     for key, value in attestation_texts.items():
-        print("- {:<30} {}".format(key, *value))
-    for number, error in enumerate(setup.error_list):
+        log.info("- {:<30} {}".format(key, *value))
+    for number, error in enumerate(error_list):
         error = str(number+1) + ") " + error
-        setup.error_list[number] = error
-        print("                                 " + error)
-    print()
+        error_list[number] = error
+        log.info("                                 " + error)
+    log.info()
 
-    print("SuC:")
+    log.info("SuC:")
     for key, value in suc_texts.items():
         if len(value) == 1:
-            print("- {:<32} {}".format(key, *value))
+            log.info("- {:<32} {}".format(key, *value))
         elif len(value) == 4:
-            print("- {:<32} {} {} {} {}".format(key, *value))
+            log.info("- {:<32} {} {} {} {}".format(key, *value))
         else:
-            print("- {:<32} {}".format(key, value))
-    print()
+            log.info("- {:<32} {}".format(key, value))
+    log.info()
 
-    print("Results:")
+    log.info("Results:")
     for key, value in results_texts.items():
-        print("- {:<49} {}".format(key, *value))
-    print()
+        log.info("- {:<49} {}".format(key, *value))
+    log.info()
+
+    if timing_texts:
+        log.info("Computing Time per Phase:")
+        for key, value in timing_texts.items():
+            log.info("- {:<49} {}".format(key, *value))
+        log.info()
 
-    print("All Targets and Resulting Risks:")
+    log.info("All Targets and Resulting Risks:")
     for key, value in risks_dict.items():
         value:Risk_Enum
         risks_dict[key] = ("", value)
-        print("- {:<25} {}  {}".format(key, *risks_dict[key]))
+        log.info("- {:<25} {}  {}".format(key, *risks_dict[key]), target=key, risk=value)
 
     pdf = PDF(orientation='P', unit='mm', format='A4')
     pdf.add_page()
@@ -111,21 +132,23 @@ def create_attestation(machine:Machine, computing_time:float) -> Machine:
 
     pdf.image(setup.BASE_PATH + "/doc/AutoS2_Logo.png", x=150, y=20, w=40,h=40)
 
-    if len(setup.error_list) > 0:
+    if timing_texts:
+        pdf.add_page()
+        pdf.text_block("Computing Time per Phase", timing_texts, 120)
+
+    if len(error_list) > 0:
         pdf.add_page()
         pdf.subheader("Errors from the Algorithm:")
-        pdf.errors_text()
+        pdf.errors_text(error_list)
 
     pdf.set_author('AutoS2 Automated Risk Assessment')
-    pdf.output(setup.ATTEST_FILE_NAME, 'F')
-    print()
-    print("Attest File created:", setup.ATTEST_FILE_NAME)
+    pdf.output(file_name, 'F')
+    log.info()
+    log.info("Attest File created:", file_name)
     return machine
 
 
 def get_lowest_attacker(machine:Machine):
-    tal_skills_ordered = ["None", "Minimal", "Operational", "Adept"]
-    tal_resources_ordered = ["Individual", "Club", "Contest", "Team", "Organization", "Government"]
     all_minimum_tal_skills = []
     all_minimum_tal_resources = []
     overall_minimum_tal_skill:str
@@ -135,12 +158,12 @@ def get_lowest_attacker(machine:Machine):
             for technique in component.techniques_unmitigated:
                 all_minimum_tal_skills.append(technique.minimum_tal_skill)
                 all_minimum_tal_resources.append(technique.minimum_tal_resources)
-    for skill in tal_skills_ordered:
+    for skill in TAL_SKILLS:
         if all_minimum_tal_skills == []:
             overall_minimum_tal_skill = "No Unmitigated Risk"
         if skill in all_minimum_tal_skills:
             overall_minimum_tal_skill = skill
-    for resource in tal_resources_ordered:
+    for resource in TAL_RESOURCES:
         if all_minimum_tal_resources == []:
             overall_minimum_tal_resource = "No Unmitigated Risk"
         if resource in all_minimum_tal_resources:
@@ -211,10 +234,18 @@ class PDF(FPDF):
         self.cell(100, 12, header_text)
         self.ln()
 
-    def errors_text(self):
+    def errors_text(self, error_list:list[str]):
         self.set_xy(10.0, self.get_y())
-        for error in setup.error_list:
+        for error in error_list:
             self.set_font('Helvetica', '', 12)
             self.multi_cell(180.0, 5.0, error)
             self.ln(3.0)
-        self.ln()
\ No newline at end of file
+        self.ln()
+
+
+def get_operator_name() -> str:
+    # Without a terminal (e.g. batch assessment), there is no login name and the user of the process is used
+    try:
+        return os.getlogin()
+    except OSError:
+        return getpass.getuser()
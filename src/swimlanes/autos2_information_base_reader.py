@@ -1,143 +1,247 @@
-from domain_model.requirements_guarantees_classes import Mitre_Mitigation, Mitre_Technique, Mitre_Technique_Level_Enum
-from openpyxl import load_workbook
+from domain_model.requirements_guarantees_classes import KnowledgeBase, Mitre_Mitigation, Mitre_Technique, Mitre_Technique_Level_Enum
+from event_log import DEBUG, get_logger
+from run_context import measured
+import hashlib
+import json
+import os
 import setup
 
+log = get_logger(__name__)
 
-def get_techniques_from_information_base(file_name:str, excel_tab:str) -> list[Mitre_Technique]:
-    print("Get all specified MITRE Techniques from AutoS² Information Base in file", file_name, "| Tab:", excel_tab)
-    print("Add attacker Skills and Resources to the MITRE Technique")
-    all_mitre_techniques:list[Mitre_Technique] = []
-    workbook = load_workbook(file_name)
-    sheet = workbook[excel_tab]    
-    if sheet.cell(row=1, column=1).value != "#" or sheet.cell(row=1, column=2).value != "ICS Technique" or sheet.cell(row=1, column=3).value != "Minimum TAL Skill" or sheet.cell(row=1, column=4).value != "Minimum TAL Resources":
-        raise ValueError("Wrong Excel Format?", file_name, excel_tab)
-    for i in range(2, sheet.max_row+1):
-        if sheet.cell(row=i, column=1).value is None:
+KNOWLEDGE_BASE_CACHE_VERSION = 1
+
+
+@measured
+def load_knowledge_base(information_base_file_name:str, mitigations_file_name:str) -> KnowledgeBase:
+    cache_key = get_knowledge_base_cache_key(information_base_file_name, mitigations_file_name)
+    knowledge_base = read_knowledge_base_cache(setup.KNOWLEDGE_BASE_CACHE_PATH, cache_key, information_base_file_name, mitigations_file_name)
+    if knowledge_base is not None:
+        log.info("Load AutoS² Information Base and MITRE ICS Mitigations from cache file", setup.KNOWLEDGE_BASE_CACHE_PATH)
+        return knowledge_base
+    knowledge_base = load_knowledge_base_from_workbooks(information_base_file_name, mitigations_file_name)
+    write_knowledge_base_cache(setup.KNOWLEDGE_BASE_CACHE_PATH, cache_key, knowledge_base)
+    return knowledge_base
+
+
+@measured
+def load_knowledge_base_from_workbooks(information_base_file_name:str, mitigations_file_name:str) -> KnowledgeBase:
+    # openpyxl is only imported if the cache cannot be used
+    from openpyxl import load_workbook
+    log.info("Load AutoS² Information Base from file", information_base_file_name, "and MITRE ICS Mitigations from file", mitigations_file_name)
+    knowledge_base = KnowledgeBase(information_base_file_name, mitigations_file_name)
+    # Each workbook is opened only once and streamed row by row
+    workbook = load_workbook(information_base_file_name, read_only=True)
+    read_techniques(knowledge_base, workbook, setup.TAB_ICS_ATTACK_INTEL_TAL_MAPPING)
+    read_mitigations(knowledge_base, workbook, setup.TAB_MITIGATION_IEC_62443_MAPPING)
+    read_technique_names_for_cves(knowledge_base, workbook, setup.TAB_CVE_ICS_MAPPING)
+    workbook.close()
+    workbook = load_workbook(mitigations_file_name, read_only=True)
+    read_mitigations_for_techniques(knowledge_base, workbook, setup.TAB_TECHNIQUES_ADDRESSED)
+    workbook.close()
+    return knowledge_base
+
+
+def get_knowledge_base_cache_key(information_base_file_name:str, mitigations_file_name:str) -> str:
+    # The cache is invalidated as soon as the content of a workbook or the name of a used tab changes
+    key = hashlib.sha256()
+    for file_name in (information_base_file_name, mitigations_file_name):
+        with open(file_name, "rb") as file:
+            key.update(hashlib.sha256(file.read()).digest())
+    for excel_tab in (setup.TAB_ICS_ATTACK_INTEL_TAL_MAPPING, setup.TAB_MITIGATION_IEC_62443_MAPPING, setup.TAB_CVE_ICS_MAPPING, setup.TAB_TECHNIQUES_ADDRESSED):
+        key.update(excel_tab.encode("utf-8") + b"\0")
+    key.update(str(KNOWLEDGE_BASE_CACHE_VERSION).encode("utf-8"))
+    return key.hexdigest()
+
+
+def read_knowledge_base_cache(cache_path:str, cache_key:str, information_base_file_name:str, mitigations_file_name:str):
+    if not cache_path or not os.path.isfile(cache_path):
+        return None
+    try:
+        with open(cache_path, "r", encoding="utf-8") as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if cache.get("key") != cache_key:
+        return None
+    knowledge_base = KnowledgeBase(information_base_file_name, mitigations_file_name)
+    for name, minimum_tal_skill, minimum_tal_resources in cache["techniques"]:
+        knowledge_base.add_technique(Mitre_Technique(name, minimum_tal_skill, minimum_tal_resources))
+    for name, id, cr_sr in cache["mitigations"]:
+        knowledge_base.add_mitigation(Mitre_Mitigation(name, id, cr_sr))
+    for technique_name, mitigation_indexes in cache["mitigations_for_technique"]:
+        knowledge_base.mitigations_for_technique[technique_name] = [knowledge_base.mitigations[index] for index in mitigation_indexes]
+    for cve_id, technique_name_and_levels in cache["technique_names_for_cves"]:
+        knowledge_base.set_technique_names_for_cve(cve_id, [(name, Mitre_Technique_Level_Enum(level)) for name, level in technique_name_and_levels])
+    return knowledge_base
+
+
+def write_knowledge_base_cache(cache_path:str, cache_key:str, knowledge_base:KnowledgeBase):
+    if not cache_path:
+        return
+    mitigation_indexes = {id(mitigation): index for index, mitigation in enumerate(knowledge_base.mitigations)}
+    cache = {
+        "key": cache_key,
+        "techniques": [(technique.name, technique.minimum_tal_skill, technique.minimum_tal_resources) for technique in knowledge_base.techniques],
+        "mitigations": [(mitigation.name, mitigation.id, mitigation.cr_sr) for mitigation in knowledge_base.mitigations],
+        "mitigations_for_technique": [(technique_name, [mitigation_indexes[id(mitigation)] for mitigation in mitigations]) for technique_name, mitigations in knowledge_base.mitigations_for_technique.items()],
+        "technique_names_for_cves": [(cve_id, [(name, level.value) for name, level in technique_name_and_levels]) for cve_id, technique_name_and_levels in knowledge_base.technique_names_for_cves.items()],
+    }
+    # Write to a temporary file first, so that parallel runs never read a partially written cache
+    temporary_path = cache_path + "." + str(os.getpid()) + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(cache, file, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temporary_path, cache_path)
+    except OSError as error:
+        log.warning(" ! Knowledge base cache could not be written:", error)
+
+
+def get_rows(workbook, excel_tab:str, number_of_columns:int) -> list[tuple]:
+    # Rows of read-only sheets can be shorter than the header, so they are padded to the expected number of columns
+    rows:list[tuple] = []
+    for row in workbook[excel_tab].iter_rows(values_only=True):
+        row = tuple(row[:number_of_columns])
+        rows.append(row + (None,) * (number_of_columns - len(row)))
+    return rows
+
+
+def read_techniques(knowledge_base:KnowledgeBase, workbook, excel_tab:str):
+    rows = get_rows(workbook, excel_tab, 4)
+    if rows[0] != ("#", "ICS Technique", "Minimum TAL Skill", "Minimum TAL Resources"):
+        raise ValueError("Wrong Excel Format?", knowledge_base.information_base_file_name, excel_tab)
+    for row in rows[1:]:
+        if row[0] is None:
             break
-        name = sheet.cell(row=i, column=2).value
-        minimum_tal_skill = sheet.cell(row=i, column=3).value
-        minimum_tal_resources = sheet.cell(row=i, column=4).value
-        all_mitre_techniques.append(Mitre_Technique(name, minimum_tal_skill, minimum_tal_resources))
-    if setup.PRINT_RESULTS:
-        print("|-- Number of Techniques:   ", len(all_mitre_techniques))
-        print("|-- First Technique Details:", all_mitre_techniques[0].name, "| Skill:", all_mitre_techniques[0].minimum_tal_skill, "| Resources:", all_mitre_techniques[0].minimum_tal_resources, "| SL-T:", all_mitre_techniques[0].sl_t, "| Level:", all_mitre_techniques[0].technique_level)
-        print("|-- Last Technique Details: ", all_mitre_techniques[-1].name,"| Skill:", all_mitre_techniques[-1].minimum_tal_skill,"| Resources:", all_mitre_techniques[-1].minimum_tal_resources,"| SL-T:", all_mitre_techniques[-1].sl_t, "| Level:", all_mitre_techniques[0].technique_level)
-        print("|-- Techniques:             ", [techn.name for techn in all_mitre_techniques])
-        print()
+        knowledge_base.add_technique(Mitre_Technique(name=row[1], minimum_tal_skill=row[2], minimum_tal_resources=row[3]))
+
+
+def read_mitigations(knowledge_base:KnowledgeBase, workbook, excel_tab:str):
+    rows = get_rows(workbook, excel_tab, 3)
+    if rows[0] != ("ID", "Mitigation", "CR/SR"):
+        raise ValueError("Wrong Excel Format?", knowledge_base.information_base_file_name, excel_tab)
+    for row in rows[1:]:
+        knowledge_base.add_mitigation(Mitre_Mitigation(name=row[1], id=row[0], cr_sr=row[2]))
+
+
+def read_technique_names_for_cves(knowledge_base:KnowledgeBase, workbook, excel_tab:str):
+    rows = get_rows(workbook, excel_tab, 6)
+    if rows[0][:6] != ("#", "Asset", "CVE ID", "Exploitation (ICS Technique)", "Primary Impact (ICS Technique)", "Secondary Impact (ICS Technique)"):
+        raise ValueError("Wrong Excel Format?", knowledge_base.information_base_file_name, excel_tab)
+    levels = (Mitre_Technique_Level_Enum.EXPLOITATION, Mitre_Technique_Level_Enum.PRIMARYIMPACT, Mitre_Technique_Level_Enum.SECONDAYIMPACT)
+    for row in rows[1:]:
+        technique_name_and_levels:list[(str, Mitre_Technique_Level_Enum)] = []
+        for value, level in zip(row[3:6], levels):
+            if value != "-":
+                technique_name_and_levels.append((value, level))
+        knowledge_base.set_technique_names_for_cve(row[2], technique_name_and_levels)
+
+
+def read_mitigations_for_techniques(knowledge_base:KnowledgeBase, workbook, excel_tab:str):
+    rows = get_rows(workbook, excel_tab, 6)
+    if rows[0][1] != "source name" or rows[0][5] != "target name":
+        raise ValueError("Wrong Excel Format?", knowledge_base.mitigations_file_name, excel_tab)
+    for row in rows[1:]:
+        if row[5] is None:
+            break
+        knowledge_base.add_mitigation_for_technique(technique_name=row[5], mitigation_name=row[1])
+
+
+@measured
+def get_techniques_from_information_base(knowledge_base:KnowledgeBase) -> list[Mitre_Technique]:
+    log.info("Get all specified MITRE Techniques from AutoS² Information Base in file", knowledge_base.information_base_file_name, "| Tab:", setup.TAB_ICS_ATTACK_INTEL_TAL_MAPPING)
+    log.info("Add attacker Skills and Resources to the MITRE Technique")
+    all_mitre_techniques:list[Mitre_Technique] = list(knowledge_base.techniques)
+    if log.is_enabled(DEBUG):
+        log.debug("|-- Number of Techniques:   ", len(all_mitre_techniques))
+        log.debug("|-- First Technique Details:", all_mitre_techniques[0].name, "| Skill:", all_mitre_techniques[0].minimum_tal_skill, "| Resources:", all_mitre_techniques[0].minimum_tal_resources, "| SL-T:", all_mitre_techniques[0].sl_t, "| Level:", all_mitre_techniques[0].technique_level)
+        log.debug("|-- Last Technique Details: ", all_mitre_techniques[-1].name,"| Skill:", all_mitre_techniques[-1].minimum_tal_skill,"| Resources:", all_mitre_techniques[-1].minimum_tal_resources,"| SL-T:", all_mitre_techniques[-1].sl_t, "| Level:", all_mitre_techniques[0].technique_level)
+        log.debug("|-- Techniques:             ", [techn.name for techn in all_mitre_techniques])
+        log.debug()
     return all_mitre_techniques
 
 
-def get_mitigations_from_information_base(file_name:str, excel_tab:str) -> list[Mitre_Mitigation]:
-    print("Get all MITRE Mitigations with assigned IEC 62443 CR/SR from AutoS² Information Base in file", file_name, "| Tab:", excel_tab)
-    print("Get CR/SR-ID per MITRE Technique")
-    all_mitre_mitigations:list[Mitre_Mitigation] = []
-    workbook = load_workbook(file_name)
-    sheet = workbook[excel_tab]
-    if sheet.cell(row=1, column=1).value != "ID" or sheet.cell(row=1, column=2).value != "Mitigation" or sheet.cell(row=1, column=3).value != "CR/SR":
-        raise ValueError("Wrong Excel Format?", file_name, excel_tab)
-    for i in range(2, sheet.max_row+1):
-        name = sheet.cell(row=i, column=2).value
-        id = sheet.cell(row=i, column=1).value
-        cr_sr = sheet.cell(row=i, column=3).value
-        all_mitre_mitigations.append(Mitre_Mitigation(name, id, cr_sr))
+@measured
+def get_mitigations_from_information_base(knowledge_base:KnowledgeBase, error_list:list[str] = None) -> list[Mitre_Mitigation]:
+    # Without an error list, the errors are added to the errors in setup.py
+    if error_list is None:
+        error_list = setup.error_list
+    log.info("Get all MITRE Mitigations with assigned IEC 62443 CR/SR from AutoS² Information Base in file", knowledge_base.information_base_file_name, "| Tab:", setup.TAB_MITIGATION_IEC_62443_MAPPING)
+    log.info("Get CR/SR-ID per MITRE Technique")
+    all_mitre_mitigations:list[Mitre_Mitigation] = list(knowledge_base.mitigations)
     for mitigation in all_mitre_mitigations:
         if not mitigation.cr_sr:
-            setup.error_list.append("No CR/SR assigned for Mitigation '" + mitigation.name + "'. Not considered in further assessment.")
-            if setup.PRINT_RESULTS:
-                print(" ! ", setup.error_list[-1])
+            error_list.append("No CR/SR assigned for Mitigation '" + mitigation.name + "'. Not considered in further assessment.")
+            if log.is_enabled(DEBUG):
+                log.debug(" ! ", error_list[-1])
     # Remove all Mitigations with unknown CR/SR
     all_mitre_mitigations = [item for item in all_mitre_mitigations if item.cr_sr is not None]
-    if setup.PRINT_RESULTS:
-        print("|-- Number of Mitigations: ", len(all_mitre_mitigations))
-        print("|-- First Mitigation:      ", all_mitre_mitigations[0].name, "| ID:", all_mitre_mitigations[0].id, "| CR/SR:", all_mitre_mitigations[0].cr_sr)
-        print("|-- Last Mitigation:       ", all_mitre_mitigations[-1].name,"| ID:", all_mitre_mitigations[-1].id,"| CR/SR:", all_mitre_mitigations[-1].cr_sr)
-    print()
-    
+    if log.is_enabled(DEBUG):
+        log.debug("|-- Number of Mitigations: ", len(all_mitre_mitigations))
+        log.debug("|-- First Mitigation:      ", all_mitre_mitigations[0].name, "| ID:", all_mitre_mitigations[0].id, "| CR/SR:", all_mitre_mitigations[0].cr_sr)
+        log.debug("|-- Last Mitigation:       ", all_mitre_mitigations[-1].name,"| ID:", all_mitre_mitigations[-1].id,"| CR/SR:", all_mitre_mitigations[-1].cr_sr)
+    log.info()
+
     addressed_cr_sr:list = []
     for mitigation in all_mitre_mitigations:
         addressed_cr_sr.append(mitigation.cr_sr)
     addressed_cr_sr = list(dict.fromkeys(addressed_cr_sr))
-    print("Only the following", len(addressed_cr_sr),"CRs/SRs are addressed by MITRE Mitigations and therefore part of the further assessment:")
-    print(addressed_cr_sr)
-    
-    print()
+    log.info("Only the following", len(addressed_cr_sr),"CRs/SRs are addressed by MITRE Mitigations and therefore part of the further assessment:")
+    log.info(addressed_cr_sr)
+
+    log.info()
     return all_mitre_mitigations
 
 
-def assign_mitigations_to_technique(file_name:str, excel_tab:str, all_mitre_techniques:list[Mitre_Technique], all_mitre_mitigations:list[Mitre_Mitigation]) -> list[Mitre_Technique]:
-    print("Get all MITRE Mitigations for MITRE Techniques according to MITRE ICS in file", file_name, "| Tab:", excel_tab)
+@measured
+def assign_mitigations_to_technique(knowledge_base:KnowledgeBase, all_mitre_techniques:list[Mitre_Technique], all_mitre_mitigations:list[Mitre_Mitigation], error_list:list[str] = None) -> list[Mitre_Technique]:
+    if error_list is None:
+        error_list = setup.error_list
+    log.info("Get all MITRE Mitigations for MITRE Techniques according to MITRE ICS in file", knowledge_base.mitigations_file_name, "| Tab:", setup.TAB_TECHNIQUES_ADDRESSED)
     number_of_techniques_with_mitigations = 0
+    # Only the given Mitigations are assigned, e.g. Mitigations without CR/SR are already removed
+    considered_mitigations = set(all_mitre_mitigations)
     for technique in all_mitre_techniques:
         technique:Mitre_Technique
         mitre_mitigations:list[Mitre_Mitigation] = []
-        workbook = load_workbook(file_name)
-        sheet = workbook[excel_tab]
-        if sheet.cell(row=1, column=2).value != "source name" or sheet.cell(row=1, column=6).value != "target name":
-            raise ValueError("Wrong Excel Format?", file_name, excel_tab)
-        for i in range(2, sheet.max_row+1):
-            if sheet.cell(row=i, column=6).value is None:
-                break
-            if sheet.cell(row=i, column=6).value == technique.name:
-                corresponding_mitigation = sheet.cell(row=i, column=2).value
-                for mitigation in all_mitre_mitigations:
-                    if mitigation.name == corresponding_mitigation:
-                        mitre_mitigations.append(mitigation)
+        for mitigation in knowledge_base.mitigations_for_technique.get(technique.name, []):
+            if mitigation in considered_mitigations:
+                mitre_mitigations.append(mitigation)
         technique.mitigations = mitre_mitigations
         if technique.mitigations == []:
-            setup.error_list.append("No Mitigations found for Technique '" + technique.name + "'. Not considered in further assessment.")
-            if setup.PRINT_RESULTS:
-                print(" ! ", setup.error_list[-1])
+            error_list.append("No Mitigations found for Technique '" + technique.name + "'. Not considered in further assessment.")
+            if log.is_enabled(DEBUG):
+                log.debug(" ! ", error_list[-1])
         else:
             number_of_techniques_with_mitigations+=1
-    if setup.PRINT_RESULTS:
-        print("|-- Number of Techniques with Mitigations: ", number_of_techniques_with_mitigations)
-        print("|-- Mitigations for ", all_mitre_techniques[0].name, "=", [(mitigation.name, mitigation.cr_sr) for mitigation in all_mitre_techniques[0].mitigations])
-        print("|-- Mitigations for ", all_mitre_techniques[-1].name, "=",[(mitigation.name, mitigation.cr_sr) for mitigation in all_mitre_techniques[-1].mitigations])
-        print()
-    print()
+    if log.is_enabled(DEBUG):
+        log.debug("|-- Number of Techniques with Mitigations: ", number_of_techniques_with_mitigations)
+        log.debug("|-- Mitigations for ", all_mitre_techniques[0].name, "=", [(mitigation.name, mitigation.cr_sr) for mitigation in all_mitre_techniques[0].mitigations])
+        log.debug("|-- Mitigations for ", all_mitre_techniques[-1].name, "=",[(mitigation.name, mitigation.cr_sr) for mitigation in all_mitre_techniques[-1].mitigations])
+        log.debug()
+    log.info()
     return all_mitre_techniques
 
 
-def get_technique_dict_for_cves_from_information_base(file_name:str, excel_tab:str, all_mitre_techniques:list[Mitre_Technique]) -> dict:
-    print("Read Techniques for CVEs from AutoS² Information Base in file", file_name, "| Tab:", excel_tab)
-    technique_names_for_cves:dict = {}
-    workbook = load_workbook(file_name)
-    sheet = workbook[excel_tab]
-    if sheet.cell(row=1, column=1).value != "#" or sheet.cell(row=1, column=2).value != "Asset" or sheet.cell(row=1, column=3).value != "CVE ID" or sheet.cell(row=1, column=4).value != "Exploitation (ICS Technique)" or sheet.cell(row=1, column=5).value != "Primary Impact (ICS Technique)" or sheet.cell(row=1, column=6).value != "Secondary Impact (ICS Technique)":
-        raise ValueError("Wrong Excel Format?", file_name, excel_tab)
-    for i in range(2, sheet.max_row+1):
-        cve_id = sheet.cell(row=i, column=3).value
-        technique_name_and_levels:list[(str, Mitre_Technique_Level_Enum)] = []
-        for j in range(4, 7):
-            if j == 4:
-                level = Mitre_Technique_Level_Enum.EXPLOITATION
-            elif j == 5:
-                level = Mitre_Technique_Level_Enum.PRIMARYIMPACT
-            elif j == 6:
-                level = Mitre_Technique_Level_Enum.SECONDAYIMPACT
-            else:
-                level = Mitre_Technique_Level_Enum.UNKNOWN
-            value = sheet.cell(row=i, column=j).value
-            if value != "-":
-                technique_name_and_level:tuple = (value, level)
-                technique_name_and_levels.append(technique_name_and_level)
-        technique_names_for_cves[cve_id] = technique_name_and_levels
+@measured
+def get_technique_dict_for_cves_from_information_base(knowledge_base:KnowledgeBase, error_list:list[str] = None) -> dict:
+    if error_list is None:
+        error_list = setup.error_list
+    log.info("Read Techniques for CVEs from AutoS² Information Base in file", knowledge_base.information_base_file_name, "| Tab:", setup.TAB_CVE_ICS_MAPPING)
     techniques_for_cves:dict = {}
-    for cve_id, technique_name_and_levels in technique_names_for_cves.items():
+    for cve_id, technique_name_and_levels in knowledge_base.technique_names_for_cves.items():
         techniques_for_cve:dict = {}
         for technique_name_and_level in technique_name_and_levels:
-            technique_found = False
-            for mitre_technique in all_mitre_techniques:
-                if mitre_technique.name == technique_name_and_level[0]:
-                    techniques_for_cve[technique_name_and_level[1]] = mitre_technique
-                    technique_found = True
-            if not technique_found:
-                setup.error_list.append("Technique '" + technique_name_and_level[0] + "' not found in AutoS² Information Base. Not considered in further assessment.")
-                if setup.PRINT_RESULTS:
-                    print(" ! ", setup.error_list[-1])
+            mitre_technique = knowledge_base.technique_by_name.get(technique_name_and_level[0])
+            if mitre_technique is not None:
+                techniques_for_cve[technique_name_and_level[1]] = mitre_technique
+            else:
+                error_list.append("Technique '" + technique_name_and_level[0] + "' not found in AutoS² Information Base. Not considered in further assessment.")
+                if log.is_enabled(DEBUG):
+                    log.debug(" ! ", error_list[-1])
         techniques_for_cves[cve_id] = techniques_for_cve
-    if setup.PRINT_RESULTS:
+    if log.is_enabled(DEBUG):
         cve_id_example = "CVE-2020-12518"
         cve_level_example = Mitre_Technique_Level_Enum.SECONDAYIMPACT
-        print("|-- Example", cve_level_example.name, "for", cve_id_example, "=", techniques_for_cves[cve_id_example][cve_level_example].name)
+        log.debug("|-- Example", cve_level_example.name, "for", cve_id_example, "=", techniques_for_cves[cve_id_example][cve_level_example].name)
     return techniques_for_cves
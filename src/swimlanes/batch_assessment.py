@@ -0,0 +1,139 @@
+from concurrent.futures import ProcessPoolExecutor
+from domain_model.asset_classes import Machine
+from domain_model.risk_assessment_classes import Risk_Enum, reset_cvss_stores_after_fork
+from run_context import RunContext
+from swimlanes.assessment_pipeline import AssessmentPipeline
+from swimlanes.nvd_reader import reset_nvd_fetcher_after_fork
+import csv
+import glob
+import multiprocessing
+import os
+import time
+import traceback
+import setup
+
+
+class MachineSummary():
+
+    def __init__(self, path:str, output_name:str):
+        self.path:str = path
+        self.output_name:str = output_name
+        self.status:str = "OK"
+        self.number_of_components:int = 0
+        self.number_of_zones:int = 0
+        self.number_of_targets:int = 0
+        self.number_of_high_risks:int = 0
+        self.highest_risk:Risk_Enum = Risk_Enum.UNDEFINED
+        self.number_of_errors:int = 0
+        self.computing_time:float = 0
+
+    def add_results(self, machine:Machine, run_context:RunContext):
+        for module in machine.hierarchy:
+            self.number_of_zones += len(module.zones)
+            for component in module.hierarchy:
+                self.number_of_components += 1
+                if component.is_target:
+                    self.number_of_targets += 1
+                    self.highest_risk = Risk_Enum.get_max(self.highest_risk, component.risk.risk)
+                    if component.risk.risk in (Risk_Enum.HIGH, Risk_Enum.VERYHIGH):
+                        self.number_of_high_risks += 1
+        self.number_of_errors = len(run_context.error_list)
+
+
+def get_machine_paths(patterns:list[str]) -> list[str]:
+    # Each AAS-JSON file, AASX file, or directory with AASX files is one machine. A directory with AAS-JSON files or
+    # subdirectories is searched for machines. Glob patterns are expanded
+    paths:list[str] = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]:
+            if os.path.isdir(path):
+                file_names = sorted(os.listdir(path))
+                if any(file_name.lower().endswith(".aasx") for file_name in file_names) and not any(file_name.lower().endswith(".json") for file_name in file_names):
+                    paths.append(path)
+                else:
+                    paths.extend([os.path.join(path, file_name) for file_name in file_names if file_name.lower().endswith((".json", ".aasx")) or os.path.isdir(os.path.join(path, file_name))])
+            else:
+                paths.append(path)
+    return paths
+
+
+def get_output_names(paths:list[str]) -> list[str]:
+    # Name of the files written for each machine. Machines with the same file name in different directories are numbered
+    output_names:list[str] = []
+    for path in paths:
+        name = os.path.basename(os.path.normpath(path))
+        for extension in (".json", ".aasx"):
+            if name.lower().endswith(extension):
+                name = name[:-len(extension)]
+        output_name = name
+        number = 2
+        while output_name in output_names:
+            output_name = name + "_" + str(number)
+            number += 1
+        output_names.append(output_name)
+    return output_names
+
+
+worker_pipeline:AssessmentPipeline = None
+worker_output_directory:str = None
+
+
+def initialize_worker(pipeline:AssessmentPipeline, output_directory:str, number_of_processes:int = 1):
+    global worker_pipeline
+    global worker_output_directory
+    worker_pipeline = pipeline
+    worker_output_directory = output_directory
+    if number_of_processes > 1:
+        reset_cvss_stores_after_fork()
+        reset_nvd_fetcher_after_fork(number_of_processes)
+
+
+def assess_machine_in_worker(job:tuple[str, str]) -> MachineSummary:
+    # The printed results, the attestation, and the metrics of each machine are written to its own files in the output directory
+    (path, output_name) = job
+    summary = MachineSummary(path, output_name)
+    start = time.time()
+    with open(os.path.join(worker_output_directory, output_name + ".log"), "w", encoding="utf-8") as log_file:
+        # The machines are the unit of parallelization. The zones of a machine are not distributed over further processes
+        options = {"ATTEST_FILE_NAME": os.path.join(worker_output_directory, output_name + "_Attest.pdf"), "RISK_ASSESSMENT_WORKERS": 1,
+                   "METRICS_JSON_FILE_NAME": os.path.join(worker_output_directory, output_name + "_metrics.json")}
+        if setup.LOG_BACKEND.lower() == "jsonl":
+            # Each process writes the events of its machines to their own files, so that the events do not interleave
+            options["LOG_FILE_NAME"] = os.path.join(worker_output_directory, output_name + "_events.jsonl")
+        run_context = RunContext(options, log_file)
+        try:
+            summary.add_results(worker_pipeline.run(path, run_context), run_context)
+        except Exception as error:
+            # One machine that can not be assessed does not stop the batch
+            summary.status = "Failed: " + type(error).__name__ + ": " + str(error)
+            traceback.print_exc(file=log_file)
+    summary.computing_time = round(time.time() - start, 2)
+    return summary
+
+
+def assess_machines(paths:list[str], pipeline:AssessmentPipeline, output_directory:str, max_workers:int) -> list[MachineSummary]:
+    # The workers are forked after the knowledge was read by the pipeline, so that they share it with the parent process.
+    # The CVSS data of all machines is requested from the NIST NVD before, so that the workers share it as well and the
+    # risks do not depend on the number of workers, e.g. if a request failed because of the rate limit
+    os.makedirs(output_directory, exist_ok=True)
+    jobs = list(zip(paths, get_output_names(paths)))
+    if max_workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+        pipeline.prefetch_cvss_data(paths)
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("fork"), initializer=initialize_worker, initargs=(pipeline, output_directory, max_workers)) as executor:
+            return list(executor.map(assess_machine_in_worker, jobs))
+    initialize_worker(pipeline, output_directory)
+    return [assess_machine_in_worker(job) for job in jobs]
+
+
+def print_summary(summaries:list[MachineSummary]):
+    print("{:<32} {:>10} {:>6} {:>8} {:>11} {:<18} {:>7} {:>9}  {}".format("Machine", "Components", "Zones", "Targets", "High Risks", "Highest Risk", "Errors", "Time [s]", "Status"))
+    for summary in summaries:
+        print("{:<32} {:>10} {:>6} {:>8} {:>11} {:<18} {:>7} {:>9}  {}".format(summary.output_name, summary.number_of_components, summary.number_of_zones, summary.number_of_targets, summary.number_of_high_risks, summary.highest_risk.value, summary.number_of_errors, summary.computing_time, summary.status))
+
+
+def write_summary(summaries:list[MachineSummary], file_name:str):
+    with open(file_name, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Machine", "Path", "Components", "Zones", "Targets", "High Risks", "Highest Risk", "Errors", "Time [s]", "Status"])
+        for summary in summaries:
+            writer.writerow([summary.output_name, summary.path, summary.number_of_components, summary.number_of_zones, summary.number_of_targets, summary.number_of_high_risks, summary.highest_risk.value, summary.number_of_errors, summary.computing_time, summary.status])
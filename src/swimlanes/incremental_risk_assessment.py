@@ -0,0 +1,214 @@
+from domain_model.asset_classes import Component, Machine
+from domain_model.network_segmentation_classes import Conduit, TopologyGraph, Zone
+from domain_model.requirements_guarantees_classes import CR_SR_INDEX, Security_Level_Enum, TechniqueCrSrIndex
+from domain_model.risk_assessment_classes import CvssStore, Risk, get_cvss_store
+from event_log import DEBUG, get_logger
+from swimlanes.network_segmentation import create_conduits_of_zone
+from swimlanes.requirements_guarantees import evaluate_zone_on_system_level, evaluate_zones_on_component_level, get_sl_t_for_zone, initialize_sl_status_vector_of_zone
+from swimlanes.risk_assessment import check_access_point_vulnerabilities_of_zone, check_path_asset_vulnerabilities_of_zone, check_target_assets_vulnerabilities_of_zone, collect_path_assets_of_zone, \
+    determine_risks_of_zone, print_access_point_check_steps, print_path_asset_check_steps, print_risk_determination_steps, print_target_check_steps
+import copy
+
+log = get_logger(__name__)
+
+# Phases of the assessment that have to be repeated for a zone
+NETWORK_SEGMENTATION = 1
+REQUIREMENTS_GUARANTEES = 2
+RISK_ASSESSMENT = 3
+
+
+class ZoneDependencies():
+    # Inputs that fed the risk assessment of a zone: its components, the unmitigated CRs/SRs, the components whose CVEs
+    # are assessed (Access Points and Targets), their CVEs, and the components on the attack paths
+
+    def __init__(self, topology:TopologyGraph, zone:Zone):
+        self.nodes:list[int] = [topology.get_node(component) for component in zone.components]
+        self.unmitigated_mask:int = zone.unmitigated_mask
+        self.assessed_nodes:set[int] = {node for node in self.nodes if topology.components[node].is_access_point or topology.components[node].is_target}
+        self.cve_ids:set[str] = {cve_id for node in self.assessed_nodes for cve_id in topology.components[node].cve_ids}
+        self.path_nodes:set[int] = set(zone.attack_paths.access_points + zone.attack_paths.nodes) if zone.attack_paths is not None else set()
+
+
+class RiskChange():
+
+    def __init__(self, component:Component, old_risk:Risk, new_risk:Risk):
+        self.component:Component = component
+        self.old_risk:Risk = old_risk
+        self.new_risk:Risk = new_risk
+
+
+class AssessmentState():
+    # Assessed machine with the dependencies of each zone. Changes of single components are collected and only the zones
+    # whose results depend on them are assessed again, starting with the first phase that is affected by the change
+
+    def __init__(self, machine:Machine, techniques_for_cves:dict, technique_index:TechniqueCrSrIndex, cvss_store:CvssStore = None, error_list:list[str] = None):
+        self.machine:Machine = machine
+        self.techniques_for_cves:dict = techniques_for_cves
+        self.technique_index:TechniqueCrSrIndex = technique_index
+        # The CVSS store of the assessment, so that the CVEs are not requested again
+        self.cvss_store:CvssStore = cvss_store if cvss_store is not None else get_cvss_store()
+        # Errors of the re-assessments, e.g. missing CVE information, such as the error list of the run of the assessment.
+        # Without an error list, the errors are collected per state, so that states used at the same time do not share them
+        self.error_list:list[str] = error_list if error_list is not None else []
+        self.zone_dependencies:list[ZoneDependencies] = [ZoneDependencies(machine.topology, zone) for zone in machine.topology.zones]
+        self.risks:list[Risk] = [copy.copy(component.risk) for component in machine.topology.components]
+        # Phases to repeat per zone index of the topology
+        self.changed_zones:dict[int, set[int]] = {}
+        self.topology_changed:bool = False
+
+    def get_components(self, component_id:str) -> list[Component]:
+        # A component can be used by several modules. A change applies to all of them
+        nodes = self.machine.topology.nodes_by_id.get(component_id)
+        if not nodes:
+            raise ValueError("Unknown component", component_id)
+        return [self.machine.topology.components[node] for node in nodes]
+
+    def mark_zone(self, component:Component, phase:int):
+        zone_index = self.machine.topology.zone_of_node[self.machine.topology.get_node(component)]
+        if zone_index >= 0:
+            self.changed_zones.setdefault(zone_index, set()).add(phase)
+
+    def set_security_level(self, component_id:str, security_level_type:Security_Level_Enum, cr_sr:str, value:int):
+        # Only the SL-C and SL-A are read from the AAS. The SL-T is derived from the MITRE Techniques for all components
+        if security_level_type not in (Security_Level_Enum.SL_C, Security_Level_Enum.SL_A):
+            raise ValueError("Only SL-C and SL-A of a component can be changed", security_level_type)
+        if cr_sr not in CR_SR_INDEX:
+            raise ValueError("Unknown CR/SR", cr_sr)
+        for component in self.get_components(component_id):
+            security_level = component.sl_c if security_level_type is Security_Level_Enum.SL_C else component.sl_a
+            security_level.set_value(CR_SR_INDEX[cr_sr], value)
+            self.mark_zone(component, REQUIREMENTS_GUARANTEES)
+
+    def add_cve(self, component_id:str, cve_id:str):
+        for component in self.get_components(component_id):
+            if cve_id not in component.cve_ids:
+                component.cve_ids.append(cve_id)
+                self.mark_cve_change(component)
+
+    def remove_cve(self, component_id:str, cve_id:str):
+        for component in self.get_components(component_id):
+            if cve_id in component.cve_ids:
+                component.cve_ids.remove(cve_id)
+                self.mark_cve_change(component)
+
+    def mark_cve_change(self, component:Component):
+        # The CVEs are only assessed for Access Points and Targets. CVEs of other components do not change any result
+        node = self.machine.topology.get_node(component)
+        zone_index = self.machine.topology.zone_of_node[node]
+        if zone_index >= 0 and node in self.zone_dependencies[zone_index].assessed_nodes:
+            self.mark_zone(component, RISK_ASSESSMENT)
+
+    def rewire_port(self, component_id:str, port_name:str, port_endpoint_id:str):
+        # The Conduits and Access Points of a zone only depend on the ports of its own components
+        for component in self.get_components(component_id):
+            ports = [port for port in component.physical_port_endpoint_ids if port.port_name == port_name]
+            if not ports:
+                raise ValueError("Unknown port", port_name, "of component", component_id)
+            for port in ports:
+                port.port_endpoint_id = port_endpoint_id
+            self.topology_changed = True
+            self.mark_zone(component, NETWORK_SEGMENTATION)
+
+    def reassess(self) -> list[RiskChange]:
+        # Returns the components whose risk changed, in the order of the hierarchy
+        if self.topology_changed:
+            self.update_topology()
+        topology = self.machine.topology
+        zones = topology.zones
+        # A new network segmentation changes the Access Points, which are used by all following phases
+        network_segmentation_zones = [zone_index for zone_index, phases in sorted(self.changed_zones.items()) if NETWORK_SEGMENTATION in phases]
+        requirements_guarantees_zones = [zone_index for zone_index, phases in sorted(self.changed_zones.items()) if NETWORK_SEGMENTATION in phases or REQUIREMENTS_GUARANTEES in phases]
+        risk_assessment_zones = [zone_index for zone_index, phases in sorted(self.changed_zones.items()) if NETWORK_SEGMENTATION in phases or RISK_ASSESSMENT in phases]
+        log.info("Re-assess", len(self.changed_zones), "of", len(zones), "zones")
+        if network_segmentation_zones:
+            # Conduits between two zones are shared with the zones that are not assessed again
+            conduits_by_id:dict[str, Conduit] = {conduit.id: conduit for zone in zones for conduit in zone.conduits if conduit.access_point_id_2 != "UnknownComponent"}
+            for zone_index in network_segmentation_zones:
+                zone = zones[zone_index]
+                zone.conduits = []
+                for component in zone.components:
+                    component.is_access_point = False
+                    component.is_integrated_in_path = False
+                    component.is_path_asset = False
+                    component.next_hops_ids_to_target = []
+                create_conduits_of_zone(topology, zone, conduits_by_id)
+                collect_path_assets_of_zone(topology, zone)
+        if requirements_guarantees_zones:
+            for zone_index in requirements_guarantees_zones:
+                initialize_sl_status_vector_of_zone(zones[zone_index])
+            evaluate_zones_on_component_level([zones[zone_index] for zone_index in requirements_guarantees_zones])
+            for zone_index in requirements_guarantees_zones:
+                zone = zones[zone_index]
+                get_sl_t_for_zone(zone)
+                evaluate_zone_on_system_level(zone)
+                # The risks of the zone only depend on its SL-Vectors via the unmitigated CRs/SRs
+                if zone_index not in risk_assessment_zones and zone.unmitigated_mask != self.zone_dependencies[zone_index].unmitigated_mask:
+                    risk_assessment_zones.append(zone_index)
+            risk_assessment_zones.sort()
+        if risk_assessment_zones:
+            self.assess_zones([zones[zone_index] for zone_index in risk_assessment_zones])
+            self.update_risk_ids()
+        for zone_index in self.changed_zones:
+            self.zone_dependencies[zone_index] = ZoneDependencies(topology, zones[zone_index])
+        self.changed_zones = {}
+        return self.get_risk_changes()
+
+    def update_topology(self):
+        # The nodes keep their numbers, as the components of the machine do not change
+        topology = TopologyGraph([module.hierarchy for module in self.machine.hierarchy])
+        for zone in self.machine.topology.zones:
+            topology.add_zone(zone)
+            if zone.attack_paths is not None:
+                zone.attack_paths.topology = topology
+        self.machine.topology = topology
+        self.topology_changed = False
+
+    def assess_zones(self, zones:list[Zone]):
+        # The same steps as for the whole machine, starting with the components as read from the AAS
+        for zone in zones:
+            zone.best_attack_paths = None
+            for component in zone.components:
+                component.cves = []
+                component.techniques_unmitigated = []
+                component.is_protected_by_path = False
+                component.risk = Risk("DefaultRisk")
+        print_access_point_check_steps()
+        for zone in zones:
+            check_access_point_vulnerabilities_of_zone(zone, self.techniques_for_cves, self.technique_index, self.cvss_store, self.error_list)
+        print_path_asset_check_steps()
+        for zone in zones:
+            check_path_asset_vulnerabilities_of_zone(zone, self.techniques_for_cves, self.technique_index, self.cvss_store, self.error_list)
+        print_target_check_steps()
+        for zone in zones:
+            check_target_assets_vulnerabilities_of_zone(zone, self.techniques_for_cves, self.technique_index, self.cvss_store, self.error_list)
+        print_risk_determination_steps()
+        for zone in zones:
+            determine_risks_of_zone(zone, 1)
+
+    def update_risk_ids(self):
+        # The risk IDs are numbered over all zones in the order of the hierarchy, as by the assessment of the whole machine
+        risk_id:int = 1
+        for zone in self.machine.topology.zones:
+            if zone.access_points_secure:
+                continue
+            for node in zone.attack_paths.access_points + zone.attack_paths.nodes:
+                risk = self.machine.topology.components[node].risk
+                if risk.id.startswith("Risk_"):
+                    risk.update_risk(risk_id)
+                    risk_id += 1
+
+    def get_risk_changes(self) -> list[RiskChange]:
+        risk_changes:list[RiskChange] = []
+        for node, component in enumerate(self.machine.topology.components):
+            old_risk = self.risks[node]
+            new_risk = copy.copy(component.risk)
+            if (old_risk.impact, old_risk.complexity, old_risk.risk) != (new_risk.impact, new_risk.complexity, new_risk.risk):
+                risk_changes.append(RiskChange(component, old_risk, new_risk))
+            self.risks[node] = new_risk
+        if log.is_enabled(DEBUG):
+            log.debug("Changed Risks:")
+            for risk_change in risk_changes:
+                log.debug("|-- Component: {:<14}  {:<8}: {:<16} -> {:<8}: {:<16}".format(risk_change.component.id_short, risk_change.old_risk.id, risk_change.old_risk.risk.name, risk_change.new_risk.id, risk_change.new_risk.risk.name))
+            if not risk_changes:
+                log.debug("|-- No Risk changed")
+        return risk_changes
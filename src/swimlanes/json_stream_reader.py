@@ -0,0 +1,95 @@
+import json
+
+JSON_WHITESPACE = " \t\n\r"
+
+
+class JsonStreamReader():
+    # Incremental JSON parser for large files. Only single values (e.g. one element of an array) are decoded at once,
+    # so the memory needed is proportional to the largest element and not to the size of the file
+
+    def __init__(self, file, chunk_size:int = 1 << 20):
+        self.file = file
+        self.chunk_size:int = chunk_size
+        self.buffer:str = ""
+        self.position:int = 0
+        self.end_of_file:bool = False
+        self.decoder = json.JSONDecoder()
+
+    def read_more(self, size:int = 0) -> bool:
+        if self.end_of_file:
+            return False
+        chunk = self.file.read(max(size, self.chunk_size))
+        if not chunk:
+            self.end_of_file = True
+            return False
+        # Drop the part of the buffer that is already parsed
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in JSON_WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.read_more():
+                raise ValueError("Unexpected end of JSON file")
+
+    def expect(self, character:str):
+        if self.peek() != character:
+            raise ValueError("Expected '" + character + "' in JSON file but found '" + self.buffer[self.position] + "'")
+        self.position += 1
+
+    def read_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # A number at the end of the buffer or followed by a fraction or an exponent (e.g. "1." | "5" or
+                # "1.5e" | "3") continues in the next chunk
+                if self.end_of_file or not isinstance(value, (int, float)) or (end < len(self.buffer) and self.buffer[end] not in ".eE"):
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.end_of_file:
+                    raise
+            # Double the buffer for large values, so that a value is not decoded again for every chunk
+            self.read_more(len(self.buffer) - self.position)
+
+    def iterate_object(self):
+        # Yields the keys of an object. The caller has to read, iterate, or skip the value of each key
+        self.expect("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.position += 1
+            else:
+                self.expect("}")
+                return
+
+    def iterate_array(self):
+        # Yields the decoded elements of an array one by one
+        self.expect("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield self.read_value()
+            if self.peek() == ",":
+                self.position += 1
+            else:
+                self.expect("]")
+                return
+
+    def skip_value(self):
+        if self.peek() == "[":
+            for element in self.iterate_array():
+                pass
+        else:
+            self.read_value()
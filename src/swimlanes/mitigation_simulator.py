@@ -0,0 +1,204 @@
+from domain_model.network_segmentation_classes import Zone
+from domain_model.requirements_guarantees_classes import CR_SR_INDEX, CR_SR_KEYS, Security_Level_Enum, Security_Level_IEC_62443, SL_Status_Enum, count_lanes
+from domain_model.risk_assessment_classes import Risk_Enum
+from event_log import DEBUG, get_logger
+from swimlanes.incremental_risk_assessment import AssessmentState
+from swimlanes.parallel_risk_assessment import assess_zone_risks
+from swimlanes.requirements_guarantees import evaluate_zone_on_system_level, evaluate_zones_on_component_level, get_sl_t_for_zone
+
+log = get_logger(__name__)
+
+# Weight of the risks for the ranking of the reconfigurations. Components without risk are not counted
+RISK_SCORE = {Risk_Enum.UNDEFINED: 0, Risk_Enum.NORISK: 0, Risk_Enum.VERYLOW: 1, Risk_Enum.LOW: 2, Risk_Enum.MEDIUM: 3, Risk_Enum.HIGH: 4, Risk_Enum.VERYHIGH: 5}
+
+
+class SlChange():
+
+    def __init__(self, component_id:str, security_level_type:Security_Level_Enum, cr_sr:str, value:int):
+        # Only the SL-C and SL-A are read from the AAS. The SL-T is derived from the MITRE Techniques for all components
+        if security_level_type not in (Security_Level_Enum.SL_C, Security_Level_Enum.SL_A):
+            raise ValueError("Only SL-C and SL-A of a component can be changed", security_level_type)
+        if cr_sr not in CR_SR_INDEX:
+            raise ValueError("Unknown CR/SR", cr_sr)
+        self.component_id:str = component_id
+        self.security_level_type:Security_Level_Enum = security_level_type
+        self.cr_sr:str = cr_sr
+        self.value:int = value
+
+
+class Reconfiguration():
+    # Candidate of the simulation. All changes are applied together, e.g. all CRs/SRs that mitigate one MITRE Technique
+
+    def __init__(self, name:str, changes:list[SlChange]):
+        self.name:str = name
+        self.changes:list[SlChange] = changes
+
+
+class ScenarioComponent():
+    # Copy of the SL-Vectors of a component, so that the SL-Vectors of the machine are not changed by a simulation
+
+    def __init__(self, component, sl_t:Security_Level_IEC_62443):
+        self.sl_t:Security_Level_IEC_62443 = sl_t
+        self.sl_c:Security_Level_IEC_62443 = copy_security_level(component.sl_c)
+        self.sl_a:Security_Level_IEC_62443 = copy_security_level(component.sl_a)
+        self.sl_status:Security_Level_IEC_62443 = Security_Level_IEC_62443(Security_Level_Enum.SL_STATUS)
+        self.is_access_point:bool = component.is_access_point
+
+
+class ScenarioZone():
+    # Copy of a zone with the attributes used by the SL evaluation of Phase (2). Another SL-T, e.g. of an attacker
+    # profile, replaces the SL-T of the zone and its components
+
+    def __init__(self, zone:Zone, sl_t:Security_Level_IEC_62443 = None):
+        self.sl_t:Security_Level_IEC_62443 = copy_security_level(zone.sl_t if sl_t is None else sl_t)
+        self.sl_status:Security_Level_IEC_62443 = Security_Level_IEC_62443(Security_Level_Enum.SL_STATUS)
+        self.unmitigated_mask:int = 0
+        self.components:list[ScenarioComponent] = [ScenarioComponent(component, component.sl_t if sl_t is None else sl_t) for component in zone.components]
+
+
+class SimulationResult():
+
+    def __init__(self, reconfigurations:list[Reconfiguration], risks:list[Risk_Enum], number_of_unmitigated:int):
+        self.reconfigurations:list[Reconfiguration] = reconfigurations
+        # Risk per node of the topology of the machine
+        self.risks:list[Risk_Enum] = risks
+        self.risk_score:int = sum(RISK_SCORE[risk] for risk in risks)
+        # Unmitigated SRs of the zones with risks
+        self.number_of_unmitigated:int = number_of_unmitigated
+        self.number_of_changes:int = sum(len(reconfiguration.changes) for reconfiguration in reconfigurations)
+
+    def get_rank_key(self) -> tuple[int, int, int]:
+        # Lower risks first. Fewer unmitigated SRs are a step towards lower risks. Smaller reconfigurations are preferred
+        return (self.risk_score, self.number_of_unmitigated, self.number_of_changes)
+
+
+class MitigationSimulator():
+    # What-if analysis on an assessed machine. The candidates only change SL-Vectors, so that only the SL evaluation of
+    # Phase (2) is repeated for the changed zones. The risks of a zone only depend on its unmitigated SRs and are
+    # assessed once per zone and combination of unmitigated SRs, reusing the knowledge base and the CVE data
+
+    def __init__(self, state:AssessmentState):
+        self.state:AssessmentState = state
+        topology = state.machine.topology
+        self.zones:list[Zone] = topology.zones
+        self.base_risks:list[Risk_Enum] = [component.risk.risk for component in topology.components]
+        # Zone index and position in the zone of each component
+        self.positions_by_id:dict[str, list[tuple[int, int]]] = {}
+        # Risks of the components of a zone per zone index and unmitigated SRs
+        self.zone_risks:dict[tuple[int, int], list[Risk_Enum]] = {}
+        for zone_index, dependencies in enumerate(state.zone_dependencies):
+            for position, node in enumerate(dependencies.nodes):
+                self.positions_by_id.setdefault(topology.components[node].id, []).append((zone_index, position))
+            self.zone_risks[(zone_index, dependencies.unmitigated_mask)] = [self.base_risks[node] for node in dependencies.nodes]
+        self.base_number_of_unmitigated:int = sum(self.get_number_of_unmitigated(zone_index, dependencies.unmitigated_mask) for zone_index, dependencies in enumerate(state.zone_dependencies))
+
+    def get_base_result(self) -> SimulationResult:
+        return SimulationResult([], list(self.base_risks), self.base_number_of_unmitigated)
+
+    def evaluate(self, candidates:list[Reconfiguration], applied:list[Reconfiguration] = None) -> list[SimulationResult]:
+        # Each candidate is evaluated together with the already applied reconfigurations
+        applied = applied or []
+        scenarios:list[dict[int, ScenarioZone]] = []
+        for candidate in candidates:
+            scenario_zones:dict[int, ScenarioZone] = {}
+            for reconfiguration in applied + [candidate]:
+                for change in reconfiguration.changes:
+                    positions = self.positions_by_id.get(change.component_id)
+                    if not positions:
+                        raise ValueError("Unknown component or component without zone", change.component_id)
+                    for zone_index, position in positions:
+                        if zone_index not in scenario_zones:
+                            scenario_zones[zone_index] = ScenarioZone(self.zones[zone_index])
+                        component = scenario_zones[zone_index].components[position]
+                        security_level = component.sl_c if change.security_level_type is Security_Level_Enum.SL_C else component.sl_a
+                        security_level.set_value(CR_SR_INDEX[change.cr_sr], change.value)
+            scenarios.append(scenario_zones)
+        # The components of the changed zones of all candidates are evaluated as one stacked matrix
+        scenario_zone_list = [scenario_zone for scenario_zones in scenarios for scenario_zone in scenario_zones.values()]
+        if scenario_zone_list:
+            evaluate_zones_on_component_level(scenario_zone_list)
+        for scenario_zone in scenario_zone_list:
+            get_sl_t_for_zone(scenario_zone)
+            evaluate_zone_on_system_level(scenario_zone)
+        results:list[SimulationResult] = []
+        for candidate, scenario_zones in zip(candidates, scenarios):
+            risks = list(self.base_risks)
+            number_of_unmitigated = self.base_number_of_unmitigated
+            for zone_index, scenario_zone in scenario_zones.items():
+                unmitigated_mask = scenario_zone.unmitigated_mask
+                for node, risk in zip(self.state.zone_dependencies[zone_index].nodes, self.get_zone_risks(zone_index, scenario_zone, unmitigated_mask)):
+                    risks[node] = risk
+                number_of_unmitigated += self.get_number_of_unmitigated(zone_index, unmitigated_mask) - self.get_number_of_unmitigated(zone_index, self.state.zone_dependencies[zone_index].unmitigated_mask)
+            results.append(SimulationResult(applied + [candidate], risks, number_of_unmitigated))
+        return results
+
+    def get_zone_risks(self, zone_index:int, scenario_zone:ScenarioZone, unmitigated_mask:int) -> list[Risk_Enum]:
+        zone_risks = self.zone_risks.get((zone_index, unmitigated_mask))
+        if zone_risks is None:
+            zone_risks = assess_zone_risks(self.zones[zone_index], self.state.zone_dependencies[zone_index].nodes, bytes(scenario_zone.sl_status.vector), unmitigated_mask, self.state.techniques_for_cves, self.state.technique_index, self.state.cvss_store)
+            self.zone_risks[(zone_index, unmitigated_mask)] = zone_risks
+        return zone_risks
+
+    def get_number_of_unmitigated(self, zone_index:int, unmitigated_mask:int) -> int:
+        # Unmitigated SRs of zones without risks do not have to be mitigated
+        if any(RISK_SCORE[risk] for risk in self.zone_risks[(zone_index, unmitigated_mask)]):
+            return count_lanes(unmitigated_mask)
+        return 0
+
+    def rank(self, candidates:list[Reconfiguration]) -> list[SimulationResult]:
+        # Single candidates ordered by their risk reduction. Candidates with the same rank keep their order
+        return sorted(self.evaluate(candidates), key=SimulationResult.get_rank_key)
+
+    def search_greedy(self, candidates:list[Reconfiguration], max_steps:int = None) -> list[SimulationResult]:
+        # Applies the best remaining candidate step by step, until no risk is left or no candidate improves the result.
+        # Returns the result after each step
+        steps:list[SimulationResult] = []
+        best = self.get_base_result()
+        remaining = list(candidates)
+        while remaining and best.risk_score > 0 and (max_steps is None or len(steps) < max_steps):
+            result = min(self.evaluate(remaining, best.reconfigurations), key=SimulationResult.get_rank_key)
+            if result.get_rank_key()[:2] >= best.get_rank_key()[:2]:
+                break
+            best = result
+            remaining.remove(result.reconfigurations[-1])
+            steps.append(result)
+        return steps
+
+    def get_candidates(self) -> list[Reconfiguration]:
+        # Candidates derived from the SL-Status of the assessment: Raise the SL-C and SL-A of the Access Point that
+        # determines the SR-Status of the zone to the SL-T for all unmitigated SRs of a MITRE Technique, and raise the
+        # SL-A to the SL-C of all CRs/SRs of a component with the status 'Reconfiguration Advised'
+        candidates:list[Reconfiguration] = []
+        technique_index = self.state.technique_index
+        for zone_index, zone in enumerate(self.zones):
+            unmitigated_mask = self.state.zone_dependencies[zone_index].unmitigated_mask
+            access_points = [component for component in zone.components if component.is_access_point]
+            if access_points and unmitigated_mask:
+                access_point = access_points[0]
+                for technique in technique_index.get_unmitigated_techniques(unmitigated_mask):
+                    changes:list[SlChange] = []
+                    technique_mask = technique_index.get_mask(technique) & unmitigated_mask
+                    for index, key in enumerate(CR_SR_KEYS):
+                        if technique_mask >> index & 1:
+                            changes.append(SlChange(access_point.id, Security_Level_Enum.SL_C, key, zone.sl_t.vector[index]))
+                            if access_point.sl_a.vector[index] < zone.sl_t.vector[index]:
+                                changes.append(SlChange(access_point.id, Security_Level_Enum.SL_A, key, zone.sl_t.vector[index]))
+                    candidates.append(Reconfiguration("Mitigate " + technique.name + " at " + access_point.id_short, changes))
+            for component in zone.components:
+                reconfiguration_advised_mask = component.sl_status.get_status_mask(SL_Status_Enum.RECONFIGURATIONADVISED)
+                changes = [SlChange(component.id, Security_Level_Enum.SL_A, key, component.sl_c.vector[index]) for index, key in enumerate(CR_SR_KEYS) if reconfiguration_advised_mask >> index & 1]
+                if changes:
+                    candidates.append(Reconfiguration("Reconfigure SL-A of " + component.id_short, changes))
+        return candidates
+
+    def print_results(self, results:list[SimulationResult]):
+        if log.is_enabled(DEBUG):
+            base = self.get_base_result()
+            for result in results:
+                log.debug("|-- {:<60}  Risk Score: {:>3} -> {:>3}  Unmitigated SRs: {:>3} -> {:>3}  Changes: {:>3}".format(result.reconfigurations[-1].name, base.risk_score, result.risk_score, base.number_of_unmitigated, result.number_of_unmitigated, result.number_of_changes))
+
+
+def copy_security_level(security_level:Security_Level_IEC_62443) -> Security_Level_IEC_62443:
+    security_level_copy = Security_Level_IEC_62443(security_level.security_level_type)
+    security_level_copy.vector[:] = security_level.vector
+    return security_level_copy
@@ -0,0 +1,241 @@
+from concurrent.futures import ProcessPoolExecutor
+from domain_model.asset_classes import Component, Machine
+from domain_model.network_segmentation_classes import Zone
+from domain_model.requirements_guarantees_classes import CR_SR_COUNT, CR_SR_KEYS, Mitre_Technique, TechniqueCrSrIndex
+from domain_model.risk_assessment_classes import CvssStore, Risk_Enum, reset_cvss_stores_after_fork
+from event_log import DEBUG, INFO, get_logger
+from run_context import RunContext, measured
+from swimlanes.mitigation_simulator import ScenarioZone
+from swimlanes.parallel_risk_assessment import assess_zone_risks
+from swimlanes.requirements_guarantees import evaluate_zone_on_system_level, evaluate_zones_on_component_level, get_sl_t_for_zone
+import math
+import multiprocessing
+import random
+import setup
+
+log = get_logger(__name__)
+
+# Risks of a target that count as high risk for the correlation with the CRs/SRs
+HIGH_RISKS = (Risk_Enum.HIGH, Risk_Enum.VERYHIGH)
+
+
+class SensitivityStatistics():
+    # Risk histograms per target and the sums for the correlation of each randomized SL value with the number of
+    # targets with high risk. Statistics of the batches are merged, so that they do not depend on the number of processes
+
+    def __init__(self, number_of_targets:int, number_of_variables:int):
+        self.number_of_samples:int = 0
+        self.histograms:list[dict[Risk_Enum, int]] = [dict.fromkeys(Risk_Enum, 0) for _ in range(number_of_targets)]
+        self.sum_x:list[int] = [0] * number_of_variables
+        self.sum_xx:list[int] = [0] * number_of_variables
+        self.sum_xy:list[int] = [0] * number_of_variables
+        self.sum_y:int = 0
+        self.sum_yy:int = 0
+
+    def add_sample(self, target_risks:list[Risk_Enum], values:bytes):
+        self.number_of_samples += 1
+        for histogram, risk in zip(self.histograms, target_risks):
+            histogram[risk] += 1
+        y = sum(1 for risk in target_risks if risk in HIGH_RISKS)
+        self.sum_y += y
+        self.sum_yy += y * y
+        for variable, x in enumerate(values):
+            self.sum_x[variable] += x
+            self.sum_xx[variable] += x * x
+            if y:
+                self.sum_xy[variable] += x * y
+
+    def merge(self, statistics):
+        statistics:SensitivityStatistics
+        self.number_of_samples += statistics.number_of_samples
+        for histogram, other_histogram in zip(self.histograms, statistics.histograms):
+            for risk, count in other_histogram.items():
+                histogram[risk] += count
+        for variable in range(len(self.sum_x)):
+            self.sum_x[variable] += statistics.sum_x[variable]
+            self.sum_xx[variable] += statistics.sum_xx[variable]
+            self.sum_xy[variable] += statistics.sum_xy[variable]
+        self.sum_y += statistics.sum_y
+        self.sum_yy += statistics.sum_yy
+
+    def get_correlation(self, variable:int) -> float:
+        # Pearson correlation. 0 if the SL value or the number of targets with high risk never changed
+        n = self.number_of_samples
+        variance_x = n * self.sum_xx[variable] - self.sum_x[variable] ** 2
+        variance_y = n * self.sum_yy - self.sum_y ** 2
+        if variance_x <= 0 or variance_y <= 0:
+            return 0.0
+        return (n * self.sum_xy[variable] - self.sum_x[variable] * self.sum_y) / math.sqrt(variance_x * variance_y)
+
+
+class MonteCarloSensitivity():
+    # Risks of the targets for random SL-C and SL-A values of the given components. The values are generated in memory
+    # with SL-A <= SL-C in the range CR_SR_RANGE. Only the SL evaluation of Phase (2) and the risk assessment of
+    # Phase (3) are repeated per sample. The risks of a zone only depend on the unmitigated Techniques of the CVEs in the
+    # zone and are assessed once per combination of unmitigated Techniques
+
+    def __init__(self, machine:Machine, techniques_for_cves:dict, technique_index:TechniqueCrSrIndex, components:list[Component], seed:int, batch_size:int = 100,
+                 cr_sr_range:tuple[int, int] = None, cvss_store:CvssStore = None):
+        self.machine:Machine = machine
+        self.techniques_for_cves:dict = techniques_for_cves
+        self.technique_index:TechniqueCrSrIndex = technique_index
+        self.seed:int = seed
+        self.cr_sr_range:tuple[int, int] = cr_sr_range if cr_sr_range is not None else setup.CR_SR_RANGE
+        self.cvss_store:CvssStore = cvss_store
+        self.batch_size:int = batch_size
+        topology = machine.topology
+        self.zones:list[Zone] = topology.zones
+        self.zone_nodes:list[list[int]] = [[topology.get_node(component) for component in zone.components] for zone in self.zones]
+        self.target_nodes:list[int] = [node for node, component in enumerate(topology.components) if component.is_target]
+        self.targets:list[Component] = [topology.components[node] for node in self.target_nodes]
+        self.base_risks:list[Risk_Enum] = [component.risk.risk for component in topology.components]
+        # Positions of the randomized components per zone. Zones without randomized components keep the risks of the assessment
+        self.randomized_positions:dict[int, list[int]] = {}
+        # The randomized components in the order of their SL values in a sample: SL-C and SL-A of each component
+        self.randomized_components:list[Component] = []
+        components = set(components)
+        for zone_index, zone in enumerate(self.zones):
+            for position, component in enumerate(zone.components):
+                if component in components:
+                    self.randomized_positions.setdefault(zone_index, []).append(position)
+                    self.randomized_components.append(component)
+        # Techniques of the CVEs of each zone. Other Techniques do not change the risks of the zone
+        self.zone_techniques:dict[int, list[Mitre_Technique]] = {}
+        for zone_index in self.randomized_positions:
+            techniques:dict[Mitre_Technique, None] = {}
+            for component in self.zones[zone_index].components:
+                for cve_id in component.cve_ids:
+                    techniques.update(dict.fromkeys(self.techniques_for_cves.get(cve_id, {}).values()))
+            self.zone_techniques[zone_index] = list(techniques)
+        self.zone_risks:dict[tuple[int, frozenset], list[Risk_Enum]] = {}
+        # Statistics of the last run
+        self.statistics:SensitivityStatistics = None
+
+    def get_number_of_variables(self) -> int:
+        return len(self.randomized_components) * 2 * CR_SR_COUNT
+
+    def run(self, number_of_samples:int, max_workers:int = 1) -> SensitivityStatistics:
+        # The samples of a batch are generated from the seed and the batch number, so that the results do not depend on the number of processes
+        batches = [(batch_index, min(self.batch_size, number_of_samples - batch_index * self.batch_size)) for batch_index in range((number_of_samples + self.batch_size - 1) // self.batch_size)]
+        statistics = SensitivityStatistics(len(self.targets), self.get_number_of_variables())
+        if max_workers > 1 and len(batches) > 1 and "fork" in multiprocessing.get_all_start_methods():
+            # Forked workers inherit the assessed machine, the knowledge base and the CVSS data
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("fork"), initializer=initialize_worker, initargs=(self,)) as executor:
+                for batch_statistics in executor.map(run_worker_batch, batches):
+                    statistics.merge(batch_statistics)
+        else:
+            for batch in batches:
+                statistics.merge(self.run_batch(batch))
+        self.statistics = statistics
+        return statistics
+
+    def run_batch(self, batch:tuple[int, int]) -> SensitivityStatistics:
+        (batch_index, number_of_samples) = batch
+        generator = random.Random(str(self.seed) + "-" + str(batch_index))
+        (minimum, maximum) = self.cr_sr_range
+        samples:list[tuple[dict[int, ScenarioZone], bytearray]] = []
+        for _ in range(number_of_samples):
+            scenario_zones:dict[int, ScenarioZone] = {}
+            values = bytearray()
+            for zone_index, positions in self.randomized_positions.items():
+                scenario_zone = ScenarioZone(self.zones[zone_index])
+                for position in positions:
+                    component = scenario_zone.components[position]
+                    for index in range(CR_SR_COUNT):
+                        sl_c = minimum + int(generator.random() * (maximum - minimum + 1))
+                        # Avoid State with SL-A > SL-C
+                        component.sl_c.vector[index] = sl_c
+                        component.sl_a.vector[index] = minimum + int(generator.random() * (sl_c - minimum + 1))
+                    values += component.sl_c.vector + component.sl_a.vector
+                scenario_zones[zone_index] = scenario_zone
+            samples.append((scenario_zones, values))
+        # The components of the zones of all samples of the batch are evaluated as one stacked matrix
+        scenario_zone_list = [scenario_zone for (scenario_zones, _) in samples for scenario_zone in scenario_zones.values()]
+        if scenario_zone_list:
+            evaluate_zones_on_component_level(scenario_zone_list)
+        for scenario_zone in scenario_zone_list:
+            get_sl_t_for_zone(scenario_zone)
+            evaluate_zone_on_system_level(scenario_zone)
+        statistics = SensitivityStatistics(len(self.targets), self.get_number_of_variables())
+        for (scenario_zones, values) in samples:
+            risks = list(self.base_risks)
+            for zone_index, scenario_zone in scenario_zones.items():
+                for node, risk in zip(self.zone_nodes[zone_index], self.get_zone_risks(zone_index, scenario_zone)):
+                    risks[node] = risk
+            statistics.add_sample([risks[node] for node in self.target_nodes], values)
+        return statistics
+
+    def get_zone_risks(self, zone_index:int, scenario_zone:ScenarioZone) -> list[Risk_Enum]:
+        unmitigated_techniques = frozenset(technique for technique in self.zone_techniques[zone_index] if self.technique_index.is_unmitigated(technique, scenario_zone.unmitigated_mask))
+        zone_risks = self.zone_risks.get((zone_index, unmitigated_techniques))
+        if zone_risks is None:
+            zone_risks = assess_zone_risks(self.zones[zone_index], self.zone_nodes[zone_index], bytes(scenario_zone.sl_status.vector), scenario_zone.unmitigated_mask, self.techniques_for_cves, self.technique_index, self.cvss_store)
+            self.zone_risks[(zone_index, unmitigated_techniques)] = zone_risks
+        return zone_risks
+
+    def get_variable_name(self, variable:int) -> tuple[str, str, str]:
+        # Component, SL-Vector and CR/SR of a randomized SL value
+        (component_index, offset) = divmod(variable, 2 * CR_SR_COUNT)
+        (security_level_index, index) = divmod(offset, CR_SR_COUNT)
+        return (self.randomized_components[component_index].id_short, ("SL-C", "SL-A")[security_level_index], CR_SR_KEYS[index])
+
+    def get_report(self, number_of_variables:int = 10) -> dict:
+        # Risk histogram of each target (idShort) and the SL values most correlated with the number of targets with high risk
+        statistics = self.statistics
+        correlations = sorted([(statistics.get_correlation(variable), variable) for variable in range(self.get_number_of_variables())], key=lambda correlation: -abs(correlation[0]))
+        top_correlations = []
+        for (correlation, variable) in correlations[:number_of_variables]:
+            if correlation == 0:
+                break
+            (component_id_short, security_level_type, cr_sr) = self.get_variable_name(variable)
+            top_correlations.append({"component": component_id_short, "security_level": security_level_type, "cr_sr": cr_sr, "correlation": correlation})
+        return {"samples": statistics.number_of_samples, "seed": self.seed,
+                "histograms": {target.id_short: {risk.value: histogram[risk] for risk in Risk_Enum if risk is not Risk_Enum.UNDEFINED} for target, histogram in zip(self.targets, statistics.histograms)},
+                "correlations": top_correlations}
+
+    def print_statistics(self, number_of_variables:int = 10):
+        # The risk distribution and the correlations are the result of the analysis and are written also without PRINT_RESULTS
+        if log.is_enabled(INFO):
+            report = self.get_report(number_of_variables)
+            log.info("Risk distribution of the Targets in", report["samples"], "samples:")
+            risks = [risk.value for risk in Risk_Enum if risk is not Risk_Enum.UNDEFINED]
+            log.info("|-- {:<26}".format("Target") + "".join(["{:>18}".format(risk) for risk in risks]))
+            for target, histogram in report["histograms"].items():
+                log.info("|-- {:<26}".format(target) + "".join(["{:>17.1f}%".format(100 * histogram[risk] / max(1, report["samples"])) for risk in risks]))
+            log.info("CRs/SRs most correlated with the number of Targets with Risk HIGH or VERY HIGH:")
+            for correlation in report["correlations"]:
+                log.info("|-- Component: {:<26}  {}  CR/SR {:<5} Correlation: {:>6.3f}".format(correlation["component"], correlation["security_level"], correlation["cr_sr"], correlation["correlation"]))
+
+
+worker_sensitivity:MonteCarloSensitivity = None
+
+
+def initialize_worker(sensitivity:MonteCarloSensitivity):
+    global worker_sensitivity
+    worker_sensitivity = sensitivity
+    reset_cvss_stores_after_fork()
+
+
+def run_worker_batch(batch:tuple[int, int]) -> SensitivityStatistics:
+    return worker_sensitivity.run_batch(batch)
+
+
+@measured
+def analyze_sl_sensitivity(machine:Machine, techniques_for_cves:dict, technique_index:TechniqueCrSrIndex, run_context:RunContext = None, cvss_store:CvssStore = None) -> SensitivityStatistics:
+    # The options of the analysis are the options of the run, or the settings in setup.py without a run. The analysis
+    # with its statistics is kept on the machine, so that callers of the pipeline can read the report, see get_report()
+    if run_context is None:
+        run_context = RunContext()
+    log.info("Monte Carlo Analysis: Assess the Risks of the Targets for random SL-C and SL-A values")
+    components = [component for zone in machine.topology.zones for component in zone.components]
+    if not run_context.get_option("MONTE_CARLO_ALL_COMPONENTS"):
+        # Only components without any SL-C in the AAS, e.g. because the vendor does not publish it
+        components = [component for component in components if not any(component.sl_c.vector)]
+    (number_of_samples, seed, cr_sr_range) = (run_context.get_option("MONTE_CARLO_SAMPLES"), run_context.get_option("MONTE_CARLO_SEED"), run_context.get_option("CR_SR_RANGE"))
+    if log.is_enabled(DEBUG):
+        log.debug("|-- Randomized Components:", len(components), "| Samples:", number_of_samples, "| Seed:", seed, "| SL Range:", cr_sr_range)
+    monte_carlo_sensitivity = MonteCarloSensitivity(machine, techniques_for_cves, technique_index, components, seed, cr_sr_range=cr_sr_range, cvss_store=cvss_store)
+    statistics = monte_carlo_sensitivity.run(number_of_samples, run_context.get_option("RISK_ASSESSMENT_WORKERS"))
+    machine.sl_sensitivity = monte_carlo_sensitivity
+    monte_carlo_sensitivity.print_statistics()
+    return statistics
@@ -0,0 +1,278 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from event_log import get_logger
+from run_context import count, measure
+from swimlanes.json_stream_reader import JsonStreamReader
+import asyncio
+import contextvars
+import gzip
+import os
+import sqlite3
+import threading
+import time
+import requests
+import setup
+
+log = get_logger(__name__)
+
+# Public rate limits of the NIST NVD API: Requests in a rolling window of 30 seconds without and with API key
+NVD_RATE_LIMIT_WITHOUT_API_KEY = 5
+NVD_RATE_LIMIT_WITH_API_KEY = 50
+NVD_RATE_LIMIT_WINDOW = 30
+CVSS_METRIC_VERSIONS = ["cvssMetricV31", "cvssMetricV30", "cvssMetricV2"]
+CVSS_FIELDS = ["attackVector", "scope", "attackComplexity", "confidentialityImpact", "integrityImpact", "availabilityImpact"]
+
+
+class TokenBucket():
+    # Rate limiter for all requests of the process. A token is returned to the bucket "period" seconds after it was
+    # taken, so that at most "capacity" requests are sent in any rolling window of "period" seconds
+
+    def __init__(self, capacity:int, period:float):
+        self.capacity:int = capacity
+        self.period:float = period
+        self.refill_times:deque[float] = deque()
+        self.lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        # Takes a token and returns 0, or returns the seconds until the next token is available
+        with self.lock:
+            now = time.monotonic()
+            while self.refill_times and self.refill_times[0] <= now:
+                self.refill_times.popleft()
+            if len(self.refill_times) < self.capacity:
+                self.refill_times.append(now + self.period)
+                return 0
+            return self.refill_times[0] - now
+
+    async def acquire(self):
+        wait = self.try_acquire()
+        while wait > 0:
+            count("nvd_rate_limit_sleep_seconds", wait)
+            await asyncio.sleep(wait)
+            wait = self.try_acquire()
+
+
+class NvdFetcher():
+    # Requests the CVSS data of CVEs concurrently from the NIST NVD. The blocking requests of the pooled HTTP session
+    # are executed in a thread pool, so that many requests can be waiting for the rate limiter and the server at once
+
+    def __init__(self, api_url:str, api_key:str = None, max_connections:int = 10, retries:int = 3, retry_backoff:float = 6, timeout:float = 30):
+        self.api_url:str = api_url
+        self.retries:int = retries
+        self.retry_backoff:float = retry_backoff
+        self.timeout:float = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if api_key:
+            self.session.headers["apiKey"] = api_key
+            self.rate_limiter = TokenBucket(NVD_RATE_LIMIT_WITH_API_KEY, NVD_RATE_LIMIT_WINDOW)
+        else:
+            self.rate_limiter = TokenBucket(NVD_RATE_LIMIT_WITHOUT_API_KEY, NVD_RATE_LIMIT_WINDOW)
+        self.max_connections:int = max_connections
+        self.executor = ThreadPoolExecutor(max_workers=max_connections)
+        # Messages are collected per CVE and printed by the caller, so that a background prefetch does not mix up the console output
+        self.messages:dict[str, list[str]] = {}
+
+    def reset_after_fork(self, number_of_processes:int):
+        # The threads and connections of the parent process do not exist in the forked process. The rate limit is shared
+        # by the forked processes, so that together they do not send more requests than allowed. The requests of the
+        # parent process in the current window are kept, as all processes use the same clock
+        self.executor = ThreadPoolExecutor(max_workers=self.max_connections)
+        session = requests.Session()
+        session.headers.update(self.session.headers)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        self.session = session
+        rate_limiter = TokenBucket(max(1, self.rate_limiter.capacity // number_of_processes), self.rate_limiter.period)
+        rate_limiter.refill_times.extend(self.rate_limiter.refill_times)
+        self.rate_limiter = rate_limiter
+
+    def request_cvss_data(self, cve_id:str):
+        cvss_json = asyncio.run(self.fetch_cvss_data(cve_id))
+        self.print_messages([cve_id])
+        return cvss_json
+
+    def request_all_cvss_data(self, cve_ids:list[str]) -> dict:
+        return asyncio.run(self.fetch_all_cvss_data(cve_ids))
+
+    async def fetch_all_cvss_data(self, cve_ids:list[str]) -> dict:
+        cvss_data = await asyncio.gather(*[self.fetch_cvss_data(cve_id) for cve_id in cve_ids])
+        return dict(zip(cve_ids, cvss_data))
+
+    async def fetch_cvss_data(self, cve_id:str):
+        # Returns the CVSS data of the CVE or False if the information could not be requested
+        api_url = self.api_url + cve_id
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.retries):
+            await self.rate_limiter.acquire()
+            count("nvd_http_requests")
+            if attempt > 0:
+                count("nvd_http_retries")
+            try:
+                response = await loop.run_in_executor(self.executor, lambda: self.session.get(api_url, timeout=self.timeout))
+            except requests.RequestException as error:
+                self.add_message(cve_id, "HTTP REST Error: " + str(error) + " " + api_url)
+            else:
+                if response.status_code == 200:
+                    return self.get_cvss_data_from_response(cve_id, response.json())
+                elif response.status_code in (403, 429):
+                    self.add_message(cve_id, "HTTP REST Error: " + str(response.status_code) + ". Probably too many requests. URL: " + api_url)
+                elif response.status_code < 500:
+                    # The request itself is invalid, e.g. unknown CVE. Another attempt would not change the result
+                    self.add_message(cve_id, "HTTP REST Error: " + str(response.status_code) + " " + api_url)
+                    break
+                else:
+                    self.add_message(cve_id, "HTTP REST Error: " + str(response.status_code) + " " + api_url)
+            if attempt < self.retries - 1:
+                count("nvd_retry_sleep_seconds", self.retry_backoff * 2 ** attempt)
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+        self.add_message(cve_id, "Could not get information for " + cve_id)
+        return False
+
+    def get_cvss_data_from_response(self, cve_id:str, response_json:dict):
+        vulnerabilities = response_json.get("vulnerabilities", [])
+        if not vulnerabilities:
+            self.add_message(cve_id, "Error: " + cve_id + " not found in the NIST NVD")
+            return False
+        cvss_json = get_cvss_data_from_metrics(vulnerabilities[0]["cve"].get("metrics", {}))
+        if cvss_json is None:
+            self.add_message(cve_id, "Error: Unknown CVSS Metric Version for " + cve_id + ". Checked for the following versions: " + str(CVSS_METRIC_VERSIONS))
+            return False
+        return cvss_json
+
+    def add_message(self, cve_id:str, message:str):
+        self.messages.setdefault(cve_id, []).append(message)
+
+    def print_messages(self, cve_ids:list[str]):
+        # The messages are printed in the order of the given CVEs and not in the order the requests were completed
+        for cve_id in cve_ids:
+            for message in self.messages.pop(cve_id, []):
+                log.warning(message, cve_id=cve_id)
+
+
+class NvdDatabase():
+    # Local index of the CVSS data from the NVD data feeds (JSON 2.0), so that CVEs can be assessed without internet access
+
+    def __init__(self, file_name:str):
+        self.file_name:str = file_name
+        # The connection is shared by the threads of the CVSS Store, which serializes the access
+        self.connection = sqlite3.connect(file_name, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS cvss (cve_id TEXT PRIMARY KEY, last_modified TEXT, " + ", ".join(CVSS_FIELDS) + ") WITHOUT ROWID")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS feeds (feed_name TEXT PRIMARY KEY, timestamp TEXT)")
+        self.connection.commit()
+
+    def get_cvss_data(self, cve_id:str):
+        row = self.connection.execute("SELECT " + ", ".join(CVSS_FIELDS) + " FROM cvss WHERE cve_id = ?", (cve_id,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(CVSS_FIELDS, row))
+
+    def contains(self, cve_id:str) -> bool:
+        return self.connection.execute("SELECT 1 FROM cvss WHERE cve_id = ?", (cve_id,)).fetchone() is not None
+
+    def import_feed(self, feed_file_name:str, batch_size:int = 10000) -> tuple[int, int]:
+        # The feed is streamed, so that also the large yearly feeds are imported without loading them into memory. Entries
+        # are only replaced by newer ones, so that the modified feed can be imported repeatedly for incremental updates.
+        # Returns the number of imported and removed CVEs or (0, 0) if the feed was already imported
+        feed_name = os.path.basename(feed_file_name)
+        number_of_imported_cves = 0
+        number_of_removed_cves = 0
+        upserts:list[tuple] = []
+        removals:list[tuple] = []
+        opener = gzip.open if feed_file_name.lower().endswith(".gz") else open
+        with opener(feed_file_name, "rt", encoding="utf-8") as file:
+            reader = JsonStreamReader(file)
+            for key in reader.iterate_object():
+                if key == "timestamp":
+                    timestamp = reader.read_value()
+                    row = self.connection.execute("SELECT timestamp FROM feeds WHERE feed_name = ?", (feed_name,)).fetchone()
+                    if row is not None and row[0] == timestamp:
+                        return (0, 0)
+                    self.connection.execute("INSERT OR REPLACE INTO feeds VALUES (?, ?)", (feed_name, timestamp))
+                elif key == "vulnerabilities":
+                    for vulnerability in reader.iterate_array():
+                        cve:dict = vulnerability["cve"]
+                        cvss_json = get_cvss_data_from_metrics(cve.get("metrics", {}))
+                        if cve.get("vulnStatus") == "Rejected":
+                            removals.append((cve["id"], cve.get("lastModified", "")))
+                        elif cvss_json is not None:
+                            upserts.append((cve["id"], cve.get("lastModified", "")) + tuple(cvss_json[field] for field in CVSS_FIELDS))
+                        if len(upserts) + len(removals) >= batch_size:
+                            number_of_imported_cves += len(upserts)
+                            number_of_removed_cves += len(removals)
+                            self.write(upserts, removals)
+                            upserts = []
+                            removals = []
+                else:
+                    reader.skip_value()
+        number_of_imported_cves += len(upserts)
+        number_of_removed_cves += len(removals)
+        self.write(upserts, removals)
+        self.connection.commit()
+        return (number_of_imported_cves, number_of_removed_cves)
+
+    def write(self, upserts:list[tuple], removals:list[tuple]):
+        self.connection.executemany("INSERT INTO cvss VALUES (" + ", ".join(["?"] * (len(CVSS_FIELDS) + 2)) + ") ON CONFLICT(cve_id) DO UPDATE SET last_modified = excluded.last_modified, "
+                                    + ", ".join([field + " = excluded." + field for field in CVSS_FIELDS]) + " WHERE excluded.last_modified >= cvss.last_modified", upserts)
+        self.connection.executemany("DELETE FROM cvss WHERE cve_id = ? AND last_modified <= ?", removals)
+
+    def close(self):
+        self.connection.close()
+
+
+class NvdPrefetch():
+    # Requests the CVSS data of the given CVEs in a background thread, while the assessment continues
+
+    def __init__(self, fetcher:NvdFetcher, cve_ids:list[str]):
+        self.fetcher:NvdFetcher = fetcher
+        self.cve_ids:list[str] = cve_ids
+        self.cvss_data:dict = {}
+        # The thread runs in the context of the caller, so that its requests are counted and measured for the run of the caller
+        self.thread = threading.Thread(target=contextvars.copy_context().run, args=(self.run,), daemon=True)
+        self.thread.start()
+
+    def run(self):
+        if not self.cve_ids:
+            return
+        with measure("NIST NVD Prefetch (Background)"):
+            self.cvss_data = self.fetcher.request_all_cvss_data(self.cve_ids)
+
+    def wait(self) -> dict:
+        self.thread.join()
+        self.fetcher.print_messages(self.cve_ids)
+        return self.cvss_data
+
+
+nvd_fetcher:NvdFetcher = None
+
+
+def get_nvd_fetcher() -> NvdFetcher:
+    # One fetcher per process, so that all requests share the HTTP connections and the rate limit
+    global nvd_fetcher
+    if nvd_fetcher is None:
+        nvd_fetcher = NvdFetcher(setup.CVE_API_URL, api_key=setup.NVD_API_KEY, max_connections=setup.NVD_MAX_CONNECTIONS, retries=setup.NVD_RETRIES, retry_backoff=setup.NVD_RETRY_BACKOFF)
+    return nvd_fetcher
+
+
+def reset_nvd_fetcher_after_fork(number_of_processes:int):
+    if nvd_fetcher is not None:
+        nvd_fetcher.reset_after_fork(number_of_processes)
+
+
+def get_cvss_data_from_metrics(metrics:dict):
+    # Uses the newest available CVSS version. CVSS V2 has no scope and names the vector and complexity differently.
+    # The access complexity MEDIUM of CVSS V2 is assessed as HIGH, as CVSS V3 only distinguishes LOW and HIGH
+    for version in CVSS_METRIC_VERSIONS:
+        if metrics.get(version):
+            cvss_data:dict = metrics[version][0]["cvssData"]
+            attack_complexity = cvss_data.get("attackComplexity", cvss_data.get("accessComplexity"))
+            return {"attackVector": cvss_data.get("attackVector", cvss_data.get("accessVector")),
+                    "scope": cvss_data.get("scope", "Unknown"),
+                    "attackComplexity": "HIGH" if attack_complexity == "MEDIUM" else attack_complexity,
+                    "confidentialityImpact": cvss_data["confidentialityImpact"],
+                    "integrityImpact": cvss_data["integrityImpact"],
+                    "availabilityImpact": cvss_data["availabilityImpact"]}
+    return None
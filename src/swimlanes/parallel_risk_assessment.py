@@ -0,0 +1,199 @@
+from concurrent.futures import ProcessPoolExecutor
+from domain_model.asset_classes import Component, Machine, Port
+from domain_model.network_segmentation_classes import AttackPathDag, BestAttackPaths, TopologyGraph, Zone
+from domain_model.requirements_guarantees_classes import Mitre_Technique, TechniqueCrSrIndex
+from domain_model.risk_assessment_classes import CvssStore, Risk, Risk_Enum, get_cvss_store, reset_cvss_stores_after_fork
+from event_log import CollectingSink, Event, NullSink, get_logger, get_sink, use_sink, write_events
+from swimlanes.risk_assessment import check_access_point_vulnerabilities, check_access_point_vulnerabilities_of_zone, check_path_asset_vulnerabilities, check_path_asset_vulnerabilities_of_zone, \
+    check_target_assets_vulnerabilities, check_target_assets_vulnerabilities_of_zone, determine_risks, determine_risks_of_zone, get_component_complexities, \
+    print_access_point_check_steps, print_path_asset_check_steps, print_risk_determination_steps, print_target_check_steps, print_target_risks, print_zones_not_secured
+from run_context import measured
+import multiprocessing
+import setup
+
+log = get_logger(__name__)
+
+
+class ZoneComponent():
+    # Copy of the attributes of a component that are used by the risk assessment of its zone. Results of an earlier
+    # assessment are not copied, so that an assessed zone can be assessed again, e.g. with another SL-Status
+
+    def __init__(self, component:Component):
+        self.id:str = component.id
+        self.id_short:str = component.id_short
+        self.physical_port_endpoint_ids:list[Port] = component.physical_port_endpoint_ids
+        self.cve_ids:list[str] = component.cve_ids
+        self.cves:list = []
+        self.is_access_point:bool = component.is_access_point
+        self.is_target:bool = component.is_target
+        self.is_path_asset:bool = component.is_path_asset
+        self.is_protected_by_path:bool = False
+        self.techniques_unmitigated:list[Mitre_Technique] = []
+        self.risk:Risk = Risk("DefaultRisk")
+
+
+class ZonePayload():
+    # Everything a worker process needs to assess one zone, apart from the knowledge and the CVSS data inherited from the parent process
+
+    def __init__(self, zone:Zone, nodes:list[int]):
+        self.zone_id:str = zone.id
+        self.safety:bool = zone.safety
+        self.sl_status_vector:bytes = bytes(zone.sl_status.vector)
+        self.unmitigated_mask:int = zone.unmitigated_mask
+        self.components:list[ZoneComponent] = [ZoneComponent(component) for component in zone.components]
+        # Positions of the components in the order of the nodes of the machine, so that the paths are searched in the same order
+        self.node_order:list[int] = sorted(range(len(nodes)), key=lambda position: nodes[position])
+
+
+class ZoneResult():
+    # Results of the assessment of one zone per component position. Techniques and CVEs are referenced by name and ID
+
+    def __init__(self, zone:Zone, events:list[list[Event]], errors:list[list[str]], cvss_store:CvssStore):
+        self.access_points_secure:bool = zone.access_points_secure
+        self.events:list[list[Event]] = events
+        self.errors:list[list[str]] = errors
+        self.technique_names:list[list[str]] = [[technique.name for technique in component.techniques_unmitigated] for component in zone.components]
+        self.cve_ids:list[list[str]] = [[cve.cve_id for cve in component.cves] for component in zone.components]
+        # CVSS data requested by the worker, so that the parent process does not request it again
+        self.cvss_data:dict = {cve_id: cvss_store.cvss_data[cve_id] for cve_ids in self.cve_ids for cve_id in cve_ids if cve_id in cvss_store.cvss_data}
+        self.is_protected_by_path:list[bool] = [component.is_protected_by_path for component in zone.components]
+        self.risks:list[Risk] = [component.risk for component in zone.components]
+        # Components in the order their risk IDs were assigned in the zone
+        self.risk_order:list[int] = sorted([position for position, risk in enumerate(self.risks) if risk.id.startswith("Risk_")], key=lambda position: int(self.risks[position].id[5:]))
+
+
+worker_techniques_for_cves:dict = None
+worker_technique_index:TechniqueCrSrIndex = None
+worker_cvss_store:CvssStore = None
+
+
+def initialize_worker(techniques_for_cves:dict, technique_index:TechniqueCrSrIndex, cvss_store:CvssStore):
+    global worker_techniques_for_cves
+    global worker_technique_index
+    global worker_cvss_store
+    worker_techniques_for_cves = techniques_for_cves
+    worker_technique_index = technique_index
+    worker_cvss_store = cvss_store
+    reset_cvss_stores_after_fork()
+
+
+@measured
+def assess_zones_in_parallel(machine:Machine, techniques_for_cves:dict, technique_index:TechniqueCrSrIndex, max_workers:int, cvss_store:CvssStore = None, error_list:list[str] = None) -> Machine:
+    # The zones are independent after the network segmentation and the requirements guarantees, so that all checks of a
+    # zone are done in one worker process. The results are merged in the order of the zones and the events of the
+    # workers are written step by step, so that the output is the same as with the sequential assessment
+    if cvss_store is None:
+        cvss_store = get_cvss_store()
+    if error_list is None:
+        error_list = setup.error_list
+    if "fork" not in multiprocessing.get_all_start_methods():
+        # New processes would have to run the main script again
+        log.info("Parallel risk assessment is not supported on this platform. The zones are assessed sequentially")
+        return assess_zones_sequentially(machine, techniques_for_cves, technique_index, cvss_store, error_list)
+    zones:list[Zone] = [zone for module in machine.hierarchy for zone in module.zones]
+    payloads = [ZonePayload(zone, [machine.topology.get_node(component) for component in zone.components]) for zone in zones]
+    # Forked workers inherit the knowledge base and the CVSS data requested from the NIST NVD instead of receiving a copy per zone
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("fork"), initializer=initialize_worker, initargs=(techniques_for_cves, technique_index, cvss_store)) as executor:
+        results:list[ZoneResult] = list(executor.map(assess_zone, payloads, chunksize=max(1, len(payloads) // (max_workers * 4))))
+    technique_by_name:dict[str, Mitre_Technique] = {technique.name: technique for techniques_for_cve in techniques_for_cves.values() for technique in techniques_for_cve.values()}
+    risk_id:int = 1
+    for zone, result in zip(zones, results):
+        risk_id = merge_zone_result(zone, result, techniques_for_cves, technique_by_name, risk_id, cvss_store)
+    print_access_point_check_steps()
+    print_zone_outputs(results, 0, error_list)
+    print_zones_not_secured(machine)
+    log.info()
+    print_path_asset_check_steps()
+    print_zone_outputs(results, 1, error_list)
+    log.info()
+    print_target_check_steps()
+    print_zone_outputs(results, 2, error_list)
+    log.info()
+    print_risk_determination_steps()
+    print_zone_outputs(results, 3, error_list)
+    print_target_risks(machine)
+    return machine
+
+
+def assess_zones_sequentially(machine:Machine, techniques_for_cves:dict, technique_index:TechniqueCrSrIndex, cvss_store:CvssStore = None, error_list:list[str] = None) -> Machine:
+    machine = check_access_point_vulnerabilities(machine, techniques_for_cves, technique_index, cvss_store, error_list)
+    log.info()
+    machine = check_path_asset_vulnerabilities(machine, techniques_for_cves, technique_index, cvss_store, error_list)
+    log.info()
+    machine = check_target_assets_vulnerabilities(machine, techniques_for_cves, technique_index, cvss_store, error_list)
+    log.info()
+    return determine_risks(machine)
+
+
+def assess_zone(payload:ZonePayload) -> ZoneResult:
+    return assess_zone_payload(payload, worker_techniques_for_cves, worker_technique_index, worker_cvss_store)
+
+
+def assess_zone_payload(payload:ZonePayload, techniques_for_cves:dict, technique_index:TechniqueCrSrIndex, cvss_store:CvssStore) -> ZoneResult:
+    # The zone is assessed on copies of its components, so that the components of the machine are not changed
+    zone = Zone(payload.zone_id, payload.safety)
+    zone.sl_status.vector[:] = payload.sl_status_vector
+    zone.unmitigated_mask = payload.unmitigated_mask
+    zone.components = payload.components
+    topology = TopologyGraph([[zone.components[position] for position in payload.node_order]])
+    topology.add_zone(zone)
+    zone.attack_paths = AttackPathDag(topology, zone)
+    steps = [lambda error_list: check_access_point_vulnerabilities_of_zone(zone, techniques_for_cves, technique_index, cvss_store, error_list),
+             lambda error_list: check_path_asset_vulnerabilities_of_zone(zone, techniques_for_cves, technique_index, cvss_store, error_list),
+             lambda error_list: check_target_assets_vulnerabilities_of_zone(zone, techniques_for_cves, technique_index, cvss_store, error_list),
+             lambda error_list: determine_risks_of_zone(zone, 1)]
+    events:list[list[Event]] = []
+    errors:list[list[str]] = []
+    level = get_sink().level
+    for step in steps:
+        # Only the events of this thread are collected, as zones are also assessed by runs in other threads
+        sink = CollectingSink(level)
+        errors.append([])
+        with use_sink(sink):
+            step(errors[-1])
+        events.append(sink.events)
+    return ZoneResult(zone, events, errors, cvss_store)
+
+
+def assess_zone_risks(zone:Zone, nodes:list[int], sl_status_vector:bytes, unmitigated_mask:int, techniques_for_cves:dict, technique_index:TechniqueCrSrIndex, cvss_store:CvssStore = None) -> list[Risk_Enum]:
+    # Risks of the components of an assessed zone with another SL-Status of the zone, e.g. for simulations. The errors
+    # were already reported by the assessment of the machine
+    if cvss_store is None:
+        cvss_store = get_cvss_store()
+    payload = ZonePayload(zone, nodes)
+    payload.sl_status_vector = sl_status_vector
+    payload.unmitigated_mask = unmitigated_mask
+    # The events of the zone are not needed, so that they are not even formatted
+    with use_sink(NullSink()):
+        result = assess_zone_payload(payload, techniques_for_cves, technique_index, cvss_store)
+    return [risk.risk for risk in result.risks]
+
+
+def merge_zone_result(zone:Zone, result:ZoneResult, techniques_for_cves:dict, technique_by_name:dict[str, Mitre_Technique], risk_id:int, cvss_store:CvssStore) -> int:
+    # Risk IDs are numbered from risk_id on in the order of the zone. Returns the next free risk ID
+    zone.access_points_secure = result.access_points_secure
+    for cve_id, cvss_json in result.cvss_data.items():
+        if cve_id not in cvss_store.cvss_data:
+            cvss_store.put(cvss_store.cvss_data, cve_id, cvss_json)
+    for position, component in enumerate(zone.components):
+        component.techniques_unmitigated = [technique_by_name[technique_name] for technique_name in result.technique_names[position]]
+        component.cves = [cvss_store.get_cve(cve_id, techniques_for_cves[cve_id]) for cve_id in result.cve_ids[position]]
+        component.is_protected_by_path = result.is_protected_by_path[position]
+        risk = result.risks[position]
+        component.risk.id = risk.id
+        component.risk.impact = risk.impact
+        component.risk.complexity = risk.complexity
+        component.risk.risk = risk.risk
+    for position in result.risk_order:
+        zone.components[position].risk.update_risk(risk_id)
+        risk_id += 1
+    # The best attack paths are derived from the merged results, so that they refer to the nodes of the machine
+    if not zone.access_points_secure:
+        zone.best_attack_paths = BestAttackPaths(zone.attack_paths, get_component_complexities(zone))
+    return risk_id
+
+
+def print_zone_outputs(results:list[ZoneResult], step:int, error_list:list[str]):
+    for result in results:
+        write_events(result.events[step])
+        error_list.extend(result.errors[step])
@@ -1,10 +1,21 @@
-from domain_model.requirements_guarantees_classes import Mitre_Technique, Security_Level_IEC_62443, SL_Status_Enum
+from domain_model.requirements_guarantees_classes import CR_SR_INDEX, Mitre_Technique, Security_Level_IEC_62443, SL_Status_Enum, SL_STATUS_CODES, LANE_HIGH_BIT, get_lanes, stack_vectors, unstack_vectors, lanes_less_than, lanes_equal, lanes_with_value, lanes_maximum, count_lanes, get_lane_bits, split_rows, or_rows, maximum_of_rows
 from domain_model.asset_classes import Machine
-import setup
+from domain_model.network_segmentation_classes import Zone
+from event_log import DEBUG, get_logger
+from run_context import measured
 
+log = get_logger(__name__)
 
+MITIGATED = SL_STATUS_CODES[SL_Status_Enum.MITIGATED]
+UNMITIGATED = SL_STATUS_CODES[SL_Status_Enum.UNMITIGATED]
+TOBECHECKED = SL_STATUS_CODES[SL_Status_Enum.TOBECHECKED]
+SHIFTEDTOSYSTEM = SL_STATUS_CODES[SL_Status_Enum.SHIFTEDTOSYSTEM]
+RECONFIGURATIONADVISED = SL_STATUS_CODES[SL_Status_Enum.RECONFIGURATIONADVISED]
+
+
+@measured
 def initialize_sl_status_vector(machine:Machine) -> Machine:
-    print("Initialize all CR-Status and SR-Status with the default value 'NoDefinition'")
+    log.info("Initialize all CR-Status and SR-Status with the default value 'NoDefinition'")
     for module in machine.hierarchy:
         for zone in module.zones:
             if hasattr(zone, 'sl_status'):
@@ -19,25 +30,40 @@ def initialize_sl_status_vector(machine:Machine) -> Machine:
     return machine
 
 
+def initialize_sl_status_vector_of_zone(zone:Zone) -> Zone:
+    zone.sl_status.overwrite_cr_sr_with_value(SL_Status_Enum.NODEFINITION)
+    for component in zone.components:
+        component.sl_status.overwrite_cr_sr_with_value(SL_Status_Enum.NODEFINITION)
+    return zone
+
+
+@measured
 def generate_mitre_sl_t_vector(all_mitre_techniques:list[Mitre_Technique]) -> Security_Level_IEC_62443:
-    print("Check for highest SL-T from all linked MITRE Techniques")
+    log.info("Check for highest SL-T from all linked MITRE Techniques")
+    if log.is_enabled(DEBUG):
+        log.debug("Before SL-T Assignment:", Security_Level_IEC_62443("SL-T").cr_sr)
+    sl_t = get_sl_t_of_techniques(all_mitre_techniques)
+    if log.is_enabled(DEBUG):
+        log.debug("After SL-T Assignment: ", sl_t.cr_sr)
+        log.debug()
+        log.debug("Number of CRs/SRs:     ", len(sl_t.cr_sr))
+    return sl_t
+
+
+def get_sl_t_of_techniques(techniques:list[Mitre_Technique]) -> Security_Level_IEC_62443:
+    # Highest SL-T of the Techniques that are mitigated by a CR/SR
     sl_t = Security_Level_IEC_62443("SL-T")
-    if setup.PRINT_RESULTS: 
-        print("Before SL-T Assignment:", Security_Level_IEC_62443("SL-T").cr_sr)
-    for technique in all_mitre_techniques:
+    for technique in techniques:
         for mitigation in technique.mitigations:
-            for key, value in sl_t.cr_sr.items():
-                if key == mitigation.cr_sr:
-                    sl_t.cr_sr[key] = max(value, technique.sl_t)
-    if setup.PRINT_RESULTS: 
-        print("After SL-T Assignment: ", sl_t.cr_sr)
-        print()
-        print("Number of CRs/SRs:     ", len(sl_t.cr_sr))
+            index = CR_SR_INDEX.get(mitigation.cr_sr)
+            if index is not None:
+                sl_t.vector[index] = max(sl_t.vector[index], technique.sl_t)
     return sl_t
 
 
+@measured
 def initialize_sl_t_with_mitre_sl_t(machine:Machine, mitre_sl_t:Security_Level_IEC_62443) -> Machine:
-    print("Assign the identified highest SL-T for the CR-ID and SR-ID. Assign the SL-T-Vector to the Components and Zones")
+    log.info("Assign the identified highest SL-T for the CR-ID and SR-ID. Assign the SL-T-Vector to the Components and Zones")
     for module in machine.hierarchy:
         for zone in module.zones:
             if hasattr(zone, 'sl_t'):
@@ -52,91 +78,122 @@ def initialize_sl_t_with_mitre_sl_t(machine:Machine, mitre_sl_t:Security_Level_I
     return machine
 
 
+@measured
 def evaluation_on_component_level(machine:Machine) -> Machine:
-    print("Evaluate SL-T, SL-A and SL-C on Component-Level and assign Status for CRs")
-    print("Change CR-Status to 'Shifted to System' and SR-Status to 'To be Checked', CR-Status to 'Mitigated', or CR-Status to 'Reconfiguration Advised'")
-    count_shifted_to_system = 0
-    count_mitigated = 0
-    count_reconfiguration_advised = 0
-    for module in machine.hierarchy:
-        for zone in module.zones:
-            for component in zone.components:
-                for key in component.sl_c.cr_sr.keys():
-                    # SL-C and SL-T:
-                    if int(component.sl_c.cr_sr[key]) < int(component.sl_t.cr_sr[key]):
-                        component.sl_status.cr_sr[key] = SL_Status_Enum.SHIFTEDTOSYSTEM
-                        zone.sl_status.cr_sr[key] = SL_Status_Enum.TOBECHECKED
-                        count_shifted_to_system += 1
-                        # print("|-- CR/SR", key, "of", component.idShort, "-- Shifted to", module.idShort)
-                    else:
-                        # SL-A and SL-C
-                        if int(component.sl_a.cr_sr[key]) < int(component.sl_c.cr_sr[key]):
-                            component.sl_status.cr_sr[key] = SL_Status_Enum.RECONFIGURATIONADVISED
-                            count_mitigated += 1
-                            # print("|-- CR/SR", key, "of", component.idShort, "-- Reconfiguration advised")
-                        else:
-                            component.sl_status.cr_sr[key] = SL_Status_Enum.MITIGATED
-                            count_reconfiguration_advised += 1
-                            # print("|-- CR/SR", key, "of", component.idShort, "-- Mitigated")
-    if setup.PRINT_RESULTS:
-        print("|-- Shifted to System: {:>3}".format(count_shifted_to_system))
-        print("|-- Mitigated:         {:>3}".format(count_mitigated))
-        print("|-- Reconfig. Advised: {:>3}".format(count_reconfiguration_advised))
+    log.info("Evaluate SL-T, SL-A and SL-C on Component-Level and assign Status for CRs")
+    log.info("Change CR-Status to 'Shifted to System' and SR-Status to 'To be Checked', CR-Status to 'Mitigated', or CR-Status to 'Reconfiguration Advised'")
+    (count_shifted_to_system, count_mitigated, count_reconfiguration_advised) = evaluate_zones_on_component_level([zone for module in machine.hierarchy for zone in module.zones])
+    if log.is_enabled(DEBUG):
+        log.debug("|-- Shifted to System: {:>3}".format(count_shifted_to_system))
+        log.debug("|-- Mitigated:         {:>3}".format(count_mitigated))
+        log.debug("|-- Reconfig. Advised: {:>3}".format(count_reconfiguration_advised))
         # For manual evaluation: 58 CRs/SRs x 19 components = 1102 Status
     return machine
 
 
+def evaluate_zones_on_component_level(zones:list[Zone]) -> tuple[int, int, int]:
+    # The SL-Vectors of all components of the zones are stacked to one components x CRs matrix and compared at once
+    components = [component for zone in zones for component in zone.components]
+    rows = len(components)
+    sl_c = stack_vectors([component.sl_c for component in components])
+    sl_a = stack_vectors([component.sl_a for component in components])
+    sl_t = stack_vectors([component.sl_t for component in components])
+    # SL-C and SL-T:
+    shifted_to_system = lanes_less_than(sl_c, sl_t, rows)
+    # SL-A and SL-C
+    reconfiguration_advised = lanes_less_than(sl_a, sl_c, rows) & ~shifted_to_system
+    mitigated = get_lanes(LANE_HIGH_BIT, rows) & ~shifted_to_system & ~reconfiguration_advised
+    component_status = lanes_with_value(shifted_to_system, SHIFTEDTOSYSTEM) | lanes_with_value(reconfiguration_advised, RECONFIGURATIONADVISED) | lanes_with_value(mitigated, MITIGATED)
+    unstack_vectors(component_status, [component.sl_status for component in components])
+    count_shifted_to_system = count_lanes(shifted_to_system)
+    count_mitigated = count_lanes(reconfiguration_advised)
+    count_reconfiguration_advised = count_lanes(mitigated)
+    # A SR of the zone has to be checked if the CR is shifted to system for any component of the zone
+    shifted_to_system_rows = split_rows(shifted_to_system, rows)
+    first_row = 0
+    for zone in zones:
+        zone_shifted_to_system = or_rows(shifted_to_system_rows[first_row:first_row + len(zone.components)])
+        first_row += len(zone.components)
+        zone_status = stack_vectors([zone.sl_status])
+        zone_status = (zone_status & ~lanes_with_value(zone_shifted_to_system, 0xFF)) | lanes_with_value(zone_shifted_to_system, TOBECHECKED)
+        unstack_vectors(zone_status, [zone.sl_status])
+    return (count_shifted_to_system, count_mitigated, count_reconfiguration_advised)
+
+
+@measured
 def get_sl_t_for_system(machine:Machine) -> Machine:
-    print("Remove duplicate entries from the CRs with CR-Status 'Shifted to System' from different Assets within a zone and keep the maximum SL-T value for the whole zone")
+    log.info("Remove duplicate entries from the CRs with CR-Status 'Shifted to System' from different Assets within a zone and keep the maximum SL-T value for the whole zone")
     for module in machine.hierarchy:
         for zone in module.zones:
-            count_shifted_to_system = 0
-            for component in zone.components:
-                for key, value in component.sl_status.cr_sr.items():
-                    if value == SL_Status_Enum.SHIFTEDTOSYSTEM:
-                        zone.sl_t.cr_sr[key] = max(int(zone.sl_t.cr_sr[key]), int(component.sl_t.cr_sr[key]))
-                        count_shifted_to_system += 1
-            if setup.PRINT_RESULTS:
-                print("|-- Shifted to System: {:>3}".format(count_shifted_to_system), "in", zone.id)
+            count_shifted_to_system = get_sl_t_for_zone(zone)
+            if log.is_enabled(DEBUG):
+                log.debug("|-- Shifted to System: {:>3}".format(count_shifted_to_system), "in", zone.id)
                 # For manual evaluation: 245 CRs/SRs in total
     return machine
 
 
+def get_sl_t_for_zone(zone:Zone) -> int:
+    # Returns the number of CRs that are shifted to system in the zone
+    rows = len(zone.components)
+    shifted_to_system = lanes_equal(stack_vectors([component.sl_status for component in zone.components]), SHIFTEDTOSYSTEM, rows)
+    # Grouped maximum over the components of the zone. CRs that are not shifted to system are set to 0 and do not change the maximum
+    sl_t = stack_vectors([component.sl_t for component in zone.components]) & lanes_with_value(shifted_to_system, 0xFF)
+    zone_sl_t = lanes_maximum(stack_vectors([zone.sl_t]), maximum_of_rows(split_rows(sl_t, rows)))
+    unstack_vectors(zone_sl_t, [zone.sl_t])
+    return count_lanes(shifted_to_system)
+
+
+@measured
 def evaluation_on_system_level(machine:Machine) -> Machine:
-    print("Evaluate SL-T, SL-A and SL-C on System/Zone-Level (check AccessPoint SLs of Zones) and assign Status for SRs")
-    print("Mark SR-Status as 'Unmitigated', SR-Status as 'Mitigated', or SR-Status and CR-Status of Access Point to 'Reconfiguration Advised'")
-    print("Only AccessPoints inside a Zone and of Zones with SR-Status 'ToBeChecked' are considered")
+    log.info("Evaluate SL-T, SL-A and SL-C on System/Zone-Level (check AccessPoint SLs of Zones) and assign Status for SRs")
+    log.info("Mark SR-Status as 'Unmitigated', SR-Status as 'Mitigated', or SR-Status and CR-Status of Access Point to 'Reconfiguration Advised'")
+    log.info("Only AccessPoints inside a Zone and of Zones with SR-Status 'ToBeChecked' are considered")
     count_mitigated = 0
     count_reconfiguration_advised = 0
     count_unmitigated = 0
     for module in machine.hierarchy:
         for zone in module.zones:
-            # Nur die Conduits in der "eigenen" Zone werden weiter betrachtet. Nicht die Conduits in der benachbarten Zone
-            for component in zone.components:
-                if component.is_access_point == True:
-                    for key in component.sl_c.cr_sr.keys():
-                        if zone.sl_status.cr_sr[key] == SL_Status_Enum.TOBECHECKED:
-                            # For multiple AccessPoints: Always overwrite with "Unmitigated"
-                            if int(component.sl_c.cr_sr[key]) < int(zone.sl_t.cr_sr[key]):
-                                zone.sl_status.cr_sr[key] = SL_Status_Enum.UNMITIGATED
-                                count_unmitigated += 1
-                            # For multiple AccessPoints: Only select "ReconfigurationAdvised" or "Mitigated" if not already marked as "Unmitigated"
-                            elif zone.sl_status.cr_sr[key] != SL_Status_Enum.UNMITIGATED:
-                                if int(component.sl_a.cr_sr[key]) < int(component.sl_c.cr_sr[key]):
-                                    zone.sl_status.cr_sr[key] = SL_Status_Enum.RECONFIGURATIONADVISED
-                                    # Identification of AccessPoint that has to be reconfigured is possible by Component SL-Status
-                                    component.sl_status.cr_sr[key] = SL_Status_Enum.RECONFIGURATIONADVISED
-                                    count_reconfiguration_advised += 1
-                                elif zone.sl_status.cr_sr[key] != SL_Status_Enum.RECONFIGURATIONADVISED:
-                                    zone.sl_status.cr_sr[key] = SL_Status_Enum.MITIGATED
-                                    count_mitigated += 1
-                                else:
-                                    raise Exception("Unknown State")
-                            else:
-                                raise Exception("Unknown State")
-    if setup.PRINT_RESULTS:
-        print("|-- Mitigated by Access Points:          {:>4}".format(count_mitigated))
-        print("|-- Reconfig. Advised for Access Points: {:>4}".format(count_reconfiguration_advised))
-        print("|-- Unmitigated by Access Points:        {:>4}".format(count_unmitigated))
+            (zone_mitigated, zone_reconfiguration_advised, zone_unmitigated) = evaluate_zone_on_system_level(zone)
+            count_mitigated += zone_mitigated
+            count_reconfiguration_advised += zone_reconfiguration_advised
+            count_unmitigated += zone_unmitigated
+    if log.is_enabled(DEBUG):
+        log.debug("|-- Mitigated by Access Points:          {:>4}".format(count_mitigated))
+        log.debug("|-- Reconfig. Advised for Access Points: {:>4}".format(count_reconfiguration_advised))
+        log.debug("|-- Unmitigated by Access Points:        {:>4}".format(count_unmitigated))
         # For manual evaluation: 18 Techniques x 5 AccessPoints = 90 in total
     return machine
+
+
+def evaluate_zone_on_system_level(zone:Zone) -> tuple[int, int, int]:
+    # Returns the number of mitigated, reconfiguration advised, and unmitigated SRs of the zone
+    count_mitigated = 0
+    count_reconfiguration_advised = 0
+    count_unmitigated = 0
+    # Nur die Conduits in der "eigenen" Zone werden weiter betrachtet. Nicht die Conduits in der benachbarten Zone
+    zone_status = stack_vectors([zone.sl_status])
+    zone_sl_t = stack_vectors([zone.sl_t])
+    to_be_checked = lanes_equal(zone_status, TOBECHECKED)
+    for component in zone.components:
+        if not to_be_checked:
+            break
+        if component.is_access_point == True:
+            sl_c = stack_vectors([component.sl_c])
+            sl_a = stack_vectors([component.sl_a])
+            # For multiple AccessPoints: The first AccessPoint of the zone assigns the SR-Status. Afterwards the SR-Status is no longer "ToBeChecked"
+            unmitigated = lanes_less_than(sl_c, zone_sl_t) & to_be_checked
+            reconfiguration_advised = lanes_less_than(sl_a, sl_c) & to_be_checked & ~unmitigated
+            mitigated = to_be_checked & ~unmitigated & ~reconfiguration_advised
+            zone_status = (zone_status & ~lanes_with_value(to_be_checked, 0xFF)) | lanes_with_value(unmitigated, UNMITIGATED) | lanes_with_value(reconfiguration_advised, RECONFIGURATIONADVISED) | lanes_with_value(mitigated, MITIGATED)
+            # Identification of AccessPoint that has to be reconfigured is possible by Component SL-Status
+            component_status = stack_vectors([component.sl_status])
+            component_status = (component_status & ~lanes_with_value(reconfiguration_advised, 0xFF)) | lanes_with_value(reconfiguration_advised, RECONFIGURATIONADVISED)
+            unstack_vectors(component_status, [component.sl_status])
+            count_unmitigated += count_lanes(unmitigated)
+            count_reconfiguration_advised += count_lanes(reconfiguration_advised)
+            count_mitigated += count_lanes(mitigated)
+            to_be_checked = 0
+    unstack_vectors(zone_status, [zone.sl_status])
+    # The risk assessment checks the Techniques of the CVEs against the unmitigated SRs with one AND per Technique
+    zone.unmitigated_mask = get_lane_bits(lanes_equal(zone_status, UNMITIGATED))
+    return (count_mitigated, count_reconfiguration_advised, count_unmitigated)
@@ -1,398 +1,454 @@
 from domain_model.asset_classes import Component, Machine
-from domain_model.network_segmentation_classes import Zone
-from domain_model.requirements_guarantees_classes import Mitre_Technique, Mitre_Technique_Level_Enum, SL_Status_Enum
-from domain_model.risk_assessment_classes import CVE, Complexity_Enum, Impact_Enum, Risk_Enum
-import copy
+from domain_model.network_segmentation_classes import AttackPathDag, BestAttackPaths, TopologyGraph, Zone
+from domain_model.requirements_guarantees_classes import Mitre_Technique, Mitre_Technique_Level_Enum, TechniqueCrSrIndex
+from domain_model.risk_assessment_classes import Complexity_Enum, CvssStore, Impact_Enum, Risk_Enum, get_cvss_store
+from event_log import DEBUG, get_logger
+from run_context import measured
 import setup
 
+log = get_logger(__name__)
+
+@measured
 def collect_all_access_points(machine:Machine) -> Machine:
-    print("Collect all Access Points")
-    if setup.PRINT_RESULTS:
+    log.info("Collect all Access Points")
+    if log.is_enabled(DEBUG):
         for module in machine.hierarchy:
             for zone in module.zones:
                 for component in zone.components:
                     if component.is_access_point:
-                        print("|-- {:<22}".format(component.id_short), "in", zone.id)
+                        log.debug("|-- {:<22}".format(component.id_short), "in", zone.id)
     return machine
 
+@measured
 def collect_all_targets(machine:Machine) -> Machine:
-    print("Collect all Assets which are SuitableForSafetyFunctions as Targets for possible impacts")
+    log.info("Collect all Assets which are SuitableForSafetyFunctions as Targets for possible impacts")
     for module in machine.hierarchy:
         for zone in module.zones:
             for component in zone.components:
                 if component.is_suitable_for_safety_functions:    # Can easily be exteded with other attributes
                     component.is_target = True
-    if setup.PRINT_RESULTS:
+    if log.is_enabled(DEBUG):
         for module in machine.hierarchy:
             for zone in module.zones:
                 for component in zone.components:
                     if component.is_target:
-                        print("|-- {:<22}".format(component.id_short), "in", zone.id)
+                        log.debug("|-- {:<22}".format(component.id_short), "in", zone.id)
     return machine
 
 
+@measured
 def collect_all_path_assets(machine:Machine):
-    print("Collect all Path Assets with a direct network connection (Assets between an Access Point and Target)")
+    log.info("Collect all Path Assets with a direct network connection (Assets between an Access Point and Target)")
     for module in machine.hierarchy:
         for zone in module.zones:
-            for component in zone.components:
-                # Start with Access Point
-                if component.is_access_point:
-                    zone = follow_path(component, zone)
-    if setup.PRINT_RESULTS:
+            collect_path_assets_of_zone(machine.topology, zone)
+    if log.is_enabled(DEBUG):
         for module in machine.hierarchy:
             for zone in module.zones:
                 for component in zone.components:
                     if component.is_path_asset:
-                        print("|-- {:<22}".format(component.id_short), "in", zone.id)
+                        log.debug("|-- {:<22}".format(component.id_short), "in", zone.id)
     return machine
 
 
-def follow_path(current_component:Component, zone:Zone) -> Zone:
-    # Find the current component in the zone object to edit this
-    for component in zone.components:
-        if component.id == current_component.id:
-            current_component.is_integrated_in_path = True
-            # Check all Ports of the current component
-            for port in component.physical_port_endpoint_ids:
-                # Check all components in the Zone whether these are connected to the port
-                for component_compare in zone.components:
-                    if port.port_endpoint_id == component_compare.id:
-                        # If the next hop is a target and not already part of a path is it a Path Asset
-                        if component_compare.is_target and not component_compare.is_integrated_in_path:
-                            # If the next hop is already assessed the algorithm would follow the path back again
-                            # If the next hop is not a target, the current one remains as "not path" and the next is noted checked
-                            component.is_path_asset = True
-                            component.next_hops_ids_to_target.append(component_compare.id)
-                            # So check the ports of the current path asset
-                            zone = follow_path(component_compare, zone)
+def collect_path_assets_of_zone(topology:TopologyGraph, zone:Zone) -> Zone:
+    # Start with the Access Points and follow all paths to Targets in the zone
+    zone.attack_paths = AttackPathDag(topology, zone)
+    for node in zone.attack_paths.access_points + zone.attack_paths.nodes:
+        component = topology.components[node]
+        component.is_integrated_in_path = True
+        for node_next in zone.attack_paths.successors[node]:
+            # If the next hop is a target it is the current component a Path Asset
+            component.is_path_asset = True
+            component.next_hops_ids_to_target.append(topology.components[node_next].id)
     return zone
 
 
-def check_access_point_vulnerabilities(machine:Machine, techniques_for_cves:dict) -> Machine:
-    print("(1) Get CVE information for all Access Points")
-    print("Get relevant CVEs based on CVSS Attack Vector and CVSS Scope")
-    print("Get MITRE Techniques which are mapped to the CVEs and collect all unmitigated CRs and SRs of the Access Point")
-    print("Derive a list of possible MITRE Techniques based on the collected CRs and SRs")
-    print("Compare MITRE Techniques for exploitation from the CVE mapping with the MITRE Techniques from the CRs and SRs")
+@measured
+def check_access_point_vulnerabilities(machine:Machine, techniques_for_cves:dict, technique_index:TechniqueCrSrIndex, cvss_store:CvssStore = None, error_list:list[str] = None) -> Machine:
+    print_access_point_check_steps()
     for module in machine.hierarchy:
         for zone in module.zones:
-            if setup.PRINT_RESULTS:
-                print("|--", zone.id)
-            zone.access_points_secure = True
-            for component in zone.components:
-                if component.is_access_point:
-                    relevant_cve_identified = False
-                    cve_information_missing = False
-                    if setup.PRINT_RESULTS:
-                        print("    |-- Access Point:", component.id_short)
-                        all_techniques:list[Mitre_Technique] = []
-                    if len(component.cve_ids) == 0:
-                        if setup.PRINT_RESULTS:
-                            print("        |---> No CVE")
+            check_access_point_vulnerabilities_of_zone(zone, techniques_for_cves, technique_index, cvss_store, error_list)
+    print_zones_not_secured(machine)
+    return machine
+
+
+def print_access_point_check_steps():
+    log.info("(1) Get CVE information for all Access Points")
+    log.info("Get relevant CVEs based on CVSS Attack Vector and CVSS Scope")
+    log.info("Get MITRE Techniques which are mapped to the CVEs and collect all unmitigated CRs and SRs of the Access Point")
+    log.info("Derive a list of possible MITRE Techniques based on the collected CRs and SRs")
+    log.info("Compare MITRE Techniques for exploitation from the CVE mapping with the MITRE Techniques from the CRs and SRs")
+
+
+def check_access_point_vulnerabilities_of_zone(zone:Zone, techniques_for_cves:dict, technique_index:TechniqueCrSrIndex, cvss_store:CvssStore = None, error_list:list[str] = None) -> Zone:
+    # Without a run, the CVSS store and the error list of the settings in setup.py are used
+    if cvss_store is None:
+        cvss_store = get_cvss_store()
+    if error_list is None:
+        error_list = setup.error_list
+    log_details = log.is_enabled(DEBUG)
+    if log_details:
+        log.debug("|--", zone.id)
+    zone.access_points_secure = True
+    for component in zone.components:
+        if component.is_access_point:
+            relevant_cve_identified = False
+            cve_information_missing = False
+            if log_details:
+                log.debug("    |-- Access Point:", component.id_short)
+                all_techniques:list[Mitre_Technique] = []
+            if len(component.cve_ids) == 0:
+                if log_details:
+                    log.debug("        |---> No CVE")
+            else:
+                for cve_id in component.cve_ids:
+                    if cve_id in techniques_for_cves.keys():
+                        cve = cvss_store.get_cve(cve_id, techniques_for_cves[cve_id])
+                        if cve.attack_vector.upper() == "Network".upper() and cve.scope.upper() == "Changed".upper() and Mitre_Technique_Level_Enum.EXPLOITATION in cve.techniques.keys():
+                            unmitig_techniques_before = len(component.techniques_unmitigated)
+                            component = add_unmitigated_techniques_to_component(component, zone, cve.techniques[Mitre_Technique_Level_Enum.EXPLOITATION], technique_index)
+                            unmitig_techniques_after = len(component.techniques_unmitigated)
+                            relevant_cve_identified = True
+                            if log_details:
+                                all_techniques.extend(list(cve.techniques.values()))
+                                log.debug("        |-- {:<14}".format(cve_id), "--> RELEVANT due to AttackVector = 'Network', Scope = 'Changed', and Technique for 'Exploitation' =", cve.techniques[Mitre_Technique_Level_Enum.EXPLOITATION].name, "- Adds", unmitig_techniques_after-unmitig_techniques_before, "new unmitigated Technique(s)")
+                        else:
+                            if log_details:
+                                log.debug("        |-- {:<14}".format(cve_id), "is NOT relevant - AttackVector: {:<16}".format(cve.attack_vector), "- Scope: {:<9}".format(cve.scope), "- Exploitation Technique exists:", (Mitre_Technique_Level_Enum.EXPLOITATION in cve.techniques.keys()))
                     else:
-                        for cve_id in component.cve_ids:
-                            if cve_id in techniques_for_cves.keys():
-                                cve = CVE(cve_id, techniques_for_cves[cve_id])
-                                if cve.attack_vector.upper() == "Network".upper() and cve.scope.upper() == "Changed".upper() and Mitre_Technique_Level_Enum.EXPLOITATION in cve.techniques.keys():
-                                    unmitig_techniques_before = len(component.techniques_unmitigated)
-                                    component = add_unmitigated_techniques_to_component(component, zone, cve.techniques[Mitre_Technique_Level_Enum.EXPLOITATION])
-                                    unmitig_techniques_after = len(component.techniques_unmitigated)
-                                    relevant_cve_identified = True
-                                    if setup.PRINT_RESULTS:
-                                        all_techniques.extend(list(cve.techniques.values()))
-                                        print("        |-- {:<14}".format(cve_id), "--> RELEVANT due to AttackVector = 'Network', Scope = 'Changed', and Technique for 'Exploitation' =", cve.techniques[Mitre_Technique_Level_Enum.EXPLOITATION].name, "- Adds", unmitig_techniques_after-unmitig_techniques_before, "new unmitigated Technique(s)")
-                                else:
-                                    if setup.PRINT_RESULTS:
-                                        print("        |-- {:<14}".format(cve_id), "is NOT relevant - AttackVector: {:<16}".format(cve.attack_vector), "- Scope: {:<9}".format(cve.scope), "- Exploitation Technique exists:", (Mitre_Technique_Level_Enum.EXPLOITATION in cve.techniques.keys()))
-                            else:
-                                cve_information_missing = True
-                                setup.error_list.append(cve_id + " is not assessed, because no Techniques assigned in AutoS² Information Base.")
-                                if setup.PRINT_RESULTS:
-                                    print(" ! ", setup.error_list[-1])
-                        if relevant_cve_identified:
-                            zone.access_points_secure = False
-                            if setup.PRINT_RESULTS:
-                                all_techniques = list(dict.fromkeys(all_techniques)) # Removes duplicates
-                                print("        |---> Total", len(component.techniques_unmitigated), "relevant Technique(s) unmitigated:", [technique.name for technique in component.techniques_unmitigated])
-                        if cve_information_missing == True:
-                            if setup.PRINT_RESULTS:
-                                print("        |---> CVE Information Missing. Check Errors!")
-            # After checking all Access Points, and assessing them as secure, all component risks can be set to "No Risk"
-            if zone.access_points_secure:
-                for component in zone.components:
-                    component.risk.set_no_risk()
-    if setup.PRINT_RESULTS:
-        print("Zones that are NOT secured by Access Points and are therefore further assessed:")
+                        cve_information_missing = True
+                        error_list.append(cve_id + " is not assessed, because no Techniques assigned in AutoS² Information Base.")
+                        if log_details:
+                            log.debug(" ! ", error_list[-1])
+                if relevant_cve_identified:
+                    zone.access_points_secure = False
+                    if log_details:
+                        all_techniques = list(dict.fromkeys(all_techniques)) # Removes duplicates
+                        log.debug("        |---> Total", len(component.techniques_unmitigated), "relevant Technique(s) unmitigated:", [technique.name for technique in component.techniques_unmitigated])
+                if cve_information_missing == True:
+                    if log_details:
+                        log.debug("        |---> CVE Information Missing. Check Errors!")
+    # After checking all Access Points, and assessing them as secure, all component risks can be set to "No Risk"
+    if zone.access_points_secure:
+        for component in zone.components:
+            component.risk.set_no_risk()
+    return zone
+
+
+def print_zones_not_secured(machine:Machine):
+    if log.is_enabled(DEBUG):
+        log.debug("Zones that are NOT secured by Access Points and are therefore further assessed:")
         for module in machine.hierarchy:
             for zone in module.zones:
                 if not zone.access_points_secure:
-                    print("|--", zone.id)
-    return machine
+                    log.debug("|--", zone.id)
 
 
-def check_path_asset_vulnerabilities(machine:Machine, techniques_for_cves:dict) -> Machine:
-    print("(2) Get CVE information for all Path Assets")
-    print("ATTENTION: Only works for Line Network Topologies")
-    print("Get relevant CVEs based on CVSS Attack Vector and CVSS Scope")
-    print("Get MITRE Techniques which are mapped to the CVEs and collect all unmitigated CRs and SRs of the Path Asset")
-    print("Derive a list of possible MITRE Techniques based on the collected CRs and SRs")
-    print("Compare MITRE Techniques for exploitation from the CVE mapping with the MITRE Techniques from the CRs and SRs")
+@measured
+def check_path_asset_vulnerabilities(machine:Machine, techniques_for_cves:dict, technique_index:TechniqueCrSrIndex, cvss_store:CvssStore = None, error_list:list[str] = None) -> Machine:
+    print_path_asset_check_steps()
     for module in machine.hierarchy:
         for zone in module.zones:
-            if setup.PRINT_RESULTS:
-                print("|--", zone.id)
-            # Only check zones that are not secured by the access points
-            if not zone.access_points_secure:
-                for component in zone.components:
-                    # Start with the access point as the starting point
-                    if component.is_access_point:
-                        # Follow the next components as long as there is a next hop
-                        while len(component.next_hops_ids_to_target) > 0:
-                            for component_next in zone.components:
-                                # If next component is not in the list of the next hop assets, is has not be checked
-                                if component_next.id in component.next_hops_ids_to_target:
-                                    # Find the next hop components
-                                    for component_next_hop_id in component.next_hops_ids_to_target:
-                                        # Next hop found
-                                        if component_next.id == component_next_hop_id:
-                                            if len(component.techniques_unmitigated) == 0 or component.is_protected_by_path and component_next.is_path_asset:
-                                                # If the previous component has NO unmitigated techniques or is already protected, the following do not have to be checked.
-                                                # If the current component ("componentNext") is not a path asset, the current one is assesed later on in the "TargetAssessment" function
-                                                component_next.is_protected_by_path = True
-                                                if setup.PRINT_RESULTS:
-                                                    print("    |-- Path Asset:", component_next.id_short)
-                                                    print("        |-- Protected by", component.id_short, "or previous component in path")
-                                            elif len(component.techniques_unmitigated) > 0 and not component.is_protected_by_path and component_next.is_path_asset:
-                                                # If the previous component has unmitigated techniques and not protected by path it is assessed as a path asset
-                                                # If the current component ("componentNext") is not a path asset, the current one is assesed later on in the "TargetAssessment" function
-                                                if setup.PRINT_RESULTS:
-                                                    print("    |-- Path Asset:", component_next.id_short)
-                                                    all_techniques:list[Mitre_Technique] = []  
-                                                relevant_cve_identified = False
-                                                cve_information_missing = False
-                                                for cve_id in component_next.cve_ids:
-                                                    if cve_id in techniques_for_cves.keys():
-                                                        cve = CVE(cve_id, techniques_for_cves[cve_id])
-                                                        if cve.attack_vector.upper() != "Physical".upper() and cve.scope.upper() == "Changed".upper() and cve.attack_vector.upper() != "Unknown".upper() and Mitre_Technique_Level_Enum.EXPLOITATION in cve.techniques.keys():
-                                                            unmitig_techniques_before = len(component_next.techniques_unmitigated)
-                                                            component_next = add_unmitigated_techniques_to_component(component_next, zone, cve.techniques[Mitre_Technique_Level_Enum.EXPLOITATION])
-                                                            unmitig_techniques_after = len(component_next.techniques_unmitigated)
-                                                            relevant_cve_identified = True
-                                                            if setup.PRINT_RESULTS:
-                                                                all_techniques.extend(list(cve.techniques.values()))
-                                                                print("        |-- {:<14}".format(cve_id), "--> RELEVANT due to AttackVector not 'Physical', Scope = 'Changed', and Technique for 'Exploitation' =", cve.techniques[Mitre_Technique_Level_Enum.EXPLOITATION].name, "- Adds", unmitig_techniques_after-unmitig_techniques_before, "new unmitigated Technique(s)")
-                                                        else:
-                                                            if setup.PRINT_RESULTS:
-                                                                print("        |-- {:<14}".format(cve_id), "is NOT relevant - AttackVector: {:<16}".format(cve.attack_vector), "- Scope: {:<9}".format(cve.scope), "- Exploitation Technique exists:", (Mitre_Technique_Level_Enum.EXPLOITATION in cve.techniques.keys()))
-                                                    else:
-                                                        cve_information_missing = True
-                                                        setup.error_list.append(cve_id + " is not assessed, because no Techniques assigned in AutoS² Information Base.")
-                                                        if setup.PRINT_RESULTS:
-                                                            print(" ! ", setup.error_list[-1])
-                                                if relevant_cve_identified == True:
-                                                    if setup.PRINT_RESULTS:
-                                                        all_techniques = list(dict.fromkeys(all_techniques)) # Removes duplicates
-                                                        print("        |---> Total", len(component.techniques_unmitigated), "relevant Technique(s) unmitigated:", [technique.name for technique in component.techniques_unmitigated])
-                                                if cve_information_missing == True:
-                                                    if setup.PRINT_RESULTS:
-                                                        print("        |---> CVE Information missing. Check Errors!")
-                                            else:
-                                                if setup.PRINT_RESULTS:
-                                                    print("    |-- Asset:", component_next.id_short, "is not a Path Asset and is not protected by the path")
-                                                    print("        |-- Will be assessed as a Target in the next step")
-                                        # If next hop was found and assessed, do not continue searching and go to the next component
-                                        break
-                                # To avoid changes on componentNext, it is copied. Component is not changed
-                                component = copy.copy(component_next)
-            else:
-                if setup.PRINT_RESULTS:
-                    print("    |-- Protected by Access Points and not further assessed")
+            check_path_asset_vulnerabilities_of_zone(zone, techniques_for_cves, technique_index, cvss_store, error_list)
     return machine
 
 
-def check_target_assets_vulnerabilities(machine:Machine, techniques_for_cves:dict) -> Machine:
-    print("(3) Get CVE information for all Targets")
-    print("ATTENTION: Only works for Line Network Topologies")
-    print("Get relevant CVEs based on CVSS Attack Vector")
-    print("Get MITRE Techniques which are mapped to the CVEs and collect all unmitigated CRs and SRs of the Targets")
-    print("Derive a list of possible MITRE Techniques based on the collected CRs and SRs")
-    print("Compare MITRE Techniques for exploitation from the CVE mapping with the MITRE Techniques from the CRs and SRs")
+def print_path_asset_check_steps():
+    log.info("(2) Get CVE information for all Path Assets")
+    log.info("Get relevant CVEs based on CVSS Attack Vector and CVSS Scope")
+    log.info("Get MITRE Techniques which are mapped to the CVEs and collect all unmitigated CRs and SRs of the Path Asset")
+    log.info("Derive a list of possible MITRE Techniques based on the collected CRs and SRs")
+    log.info("Compare MITRE Techniques for exploitation from the CVE mapping with the MITRE Techniques from the CRs and SRs")
+
+
+def check_path_asset_vulnerabilities_of_zone(zone:Zone, techniques_for_cves:dict, technique_index:TechniqueCrSrIndex, cvss_store:CvssStore = None, error_list:list[str] = None) -> Zone:
+    if cvss_store is None:
+        cvss_store = get_cvss_store()
+    if error_list is None:
+        error_list = setup.error_list
+    log_details = log.is_enabled(DEBUG)
+    if log_details:
+        log.debug("|--", zone.id)
+    # Only check zones that are not secured by the access points
+    if not zone.access_points_secure:
+        topology = zone.attack_paths.topology
+        # The Path Assets are checked in the order of the paths, so that all previous components are checked before
+        for node_next in zone.attack_paths.nodes:
+            component_next = topology.components[node_next]
+            previous_components = [topology.components[node] for node in zone.attack_paths.predecessors[node_next]]
+            # The next component is only protected by the path if it is protected by all previous components
+            unprotected_components = [component_previous for component_previous in previous_components if len(component_previous.techniques_unmitigated) > 0 and not (component_previous.is_protected_by_path and component_next.is_path_asset)]
+            if not unprotected_components:
+                # If the previous component has NO unmitigated techniques or is already protected, the following do not have to be checked.
+                # If the current component ("componentNext") is not a path asset, the current one is assesed later on in the "TargetAssessment" function
+                component_next.is_protected_by_path = True
+                if log_details:
+                    log.debug("    |-- Path Asset:", component_next.id_short)
+                    log.debug("        |-- Protected by", ", ".join([component_previous.id_short for component_previous in previous_components]), "or previous component in path")
+            elif component_next.is_path_asset:
+                # If the previous component has unmitigated techniques and not protected by path it is assessed as a path asset
+                # If the current component ("componentNext") is not a path asset, the current one is assesed later on in the "TargetAssessment" function
+                component = unprotected_components[0]
+                if log_details:
+                    log.debug("    |-- Path Asset:", component_next.id_short)
+                    all_techniques:list[Mitre_Technique] = []  
+                relevant_cve_identified = False
+                cve_information_missing = False
+                for cve_id in component_next.cve_ids:
+                    if cve_id in techniques_for_cves.keys():
+                        cve = cvss_store.get_cve(cve_id, techniques_for_cves[cve_id])
+                        if cve.attack_vector.upper() != "Physical".upper() and cve.scope.upper() == "Changed".upper() and cve.attack_vector.upper() != "Unknown".upper() and Mitre_Technique_Level_Enum.EXPLOITATION in cve.techniques.keys():
+                            unmitig_techniques_before = len(component_next.techniques_unmitigated)
+                            component_next = add_unmitigated_techniques_to_component(component_next, zone, cve.techniques[Mitre_Technique_Level_Enum.EXPLOITATION], technique_index)
+                            unmitig_techniques_after = len(component_next.techniques_unmitigated)
+                            relevant_cve_identified = True
+                            if log_details:
+                                all_techniques.extend(list(cve.techniques.values()))
+                                log.debug("        |-- {:<14}".format(cve_id), "--> RELEVANT due to AttackVector not 'Physical', Scope = 'Changed', and Technique for 'Exploitation' =", cve.techniques[Mitre_Technique_Level_Enum.EXPLOITATION].name, "- Adds", unmitig_techniques_after-unmitig_techniques_before, "new unmitigated Technique(s)")
+                        else:
+                            if log_details:
+                                log.debug("        |-- {:<14}".format(cve_id), "is NOT relevant - AttackVector: {:<16}".format(cve.attack_vector), "- Scope: {:<9}".format(cve.scope), "- Exploitation Technique exists:", (Mitre_Technique_Level_Enum.EXPLOITATION in cve.techniques.keys()))
+                    else:
+                        cve_information_missing = True
+                        error_list.append(cve_id + " is not assessed, because no Techniques assigned in AutoS² Information Base.")
+                        if log_details:
+                            log.debug(" ! ", error_list[-1])
+                if relevant_cve_identified == True:
+                    if log_details:
+                        all_techniques = list(dict.fromkeys(all_techniques)) # Removes duplicates
+                        log.debug("        |---> Total", len(component.techniques_unmitigated), "relevant Technique(s) unmitigated:", [technique.name for technique in component.techniques_unmitigated])
+                if cve_information_missing == True:
+                    if log_details:
+                        log.debug("        |---> CVE Information missing. Check Errors!")
+            else:
+                if log_details:
+                    log.debug("    |-- Asset:", component_next.id_short, "is not a Path Asset and is not protected by the path")
+                    log.debug("        |-- Will be assessed as a Target in the next step")
+    else:
+        if log_details:
+            log.debug("    |-- Protected by Access Points and not further assessed")
+    return zone
+
+
+@measured
+def check_target_assets_vulnerabilities(machine:Machine, techniques_for_cves:dict, technique_index:TechniqueCrSrIndex, cvss_store:CvssStore = None, error_list:list[str] = None) -> Machine:
+    print_target_check_steps()
     for module in machine.hierarchy:
         for zone in module.zones:
-            if setup.PRINT_RESULTS:
-                print("|--", zone.id)
-            if not zone.access_points_secure:
-                for component in zone.components:
-                    if component.is_target and not component.is_protected_by_path:
-                        relevant_cve_identified = False
-                        cve_information_missing = False
-                        if setup.PRINT_RESULTS:
-                            print("    |-- Target:", component.id_short)
-                            all_techniques:list[Mitre_Technique] = []
-                        for cve_id in component.cve_ids:
-                            if cve_id in techniques_for_cves.keys():
-                                cve = CVE(cve_id, techniques_for_cves[cve_id])
-                                component.cves.append(cve)
-                                if cve.attack_vector.upper() != "Physical".upper() and cve.attack_vector.upper() != "Unknown".upper() and Mitre_Technique_Level_Enum.EXPLOITATION in cve.techniques.keys():
-                                    unmitig_techniques_before = len(component.techniques_unmitigated)
-                                    component = add_unmitigated_techniques_to_component(component, zone, cve.techniques[Mitre_Technique_Level_Enum.EXPLOITATION])
-                                    unmitig_techniques_after = len(component.techniques_unmitigated)
-                                    relevant_cve_identified = True
-                                    if setup.PRINT_RESULTS:
-                                        all_techniques.extend(list(cve.techniques.values()))
-                                        print("        |-- {:<14}".format(cve_id), "--> RELEVANT due to Attack Vector not 'Physical' and Technique for 'Exploitation' =", cve.techniques[Mitre_Technique_Level_Enum.EXPLOITATION].name, "- Adds", unmitig_techniques_after-unmitig_techniques_before, "new unmitigated Technique(s)")
-                                else:
-                                    if setup.PRINT_RESULTS:
-                                        print("        |-- {:<14}".format(cve_id), "is NOT relevant - AttackVector: {:<16}".format(cve.attack_vector), "- Scope: {:<9}".format(cve.scope), "- Exploitation Technique exists:", (Mitre_Technique_Level_Enum.EXPLOITATION in cve.techniques.keys()))
-                            else:
-                                cve_information_missing = True
-                                setup.error_list.append(cve_id + " is not assessed, because no Techniques assigned in AutoS² Information Base.")
-                                if setup.PRINT_RESULTS:
-                                    print(" ! ", setup.error_list[-1])
-                        if relevant_cve_identified:
-                            if setup.PRINT_RESULTS:
-                                all_techniques = list(dict.fromkeys(all_techniques)) # Removes duplicates
-                                print("        |---> Total", len(component.techniques_unmitigated), "relevant Technique(s) unmitigated:", [technique.name for technique in component.techniques_unmitigated])
+            check_target_assets_vulnerabilities_of_zone(zone, techniques_for_cves, technique_index, cvss_store, error_list)
+    return machine
+
+
+def print_target_check_steps():
+    log.info("(3) Get CVE information for all Targets")
+    log.info("Get relevant CVEs based on CVSS Attack Vector")
+    log.info("Get MITRE Techniques which are mapped to the CVEs and collect all unmitigated CRs and SRs of the Targets")
+    log.info("Derive a list of possible MITRE Techniques based on the collected CRs and SRs")
+    log.info("Compare MITRE Techniques for exploitation from the CVE mapping with the MITRE Techniques from the CRs and SRs")
+
+
+def check_target_assets_vulnerabilities_of_zone(zone:Zone, techniques_for_cves:dict, technique_index:TechniqueCrSrIndex, cvss_store:CvssStore = None, error_list:list[str] = None) -> Zone:
+    if cvss_store is None:
+        cvss_store = get_cvss_store()
+    if error_list is None:
+        error_list = setup.error_list
+    log_details = log.is_enabled(DEBUG)
+    if log_details:
+        log.debug("|--", zone.id)
+    if not zone.access_points_secure:
+        for component in zone.components:
+            if component.is_target and not component.is_protected_by_path:
+                relevant_cve_identified = False
+                cve_information_missing = False
+                if log_details:
+                    log.debug("    |-- Target:", component.id_short)
+                    all_techniques:list[Mitre_Technique] = []
+                for cve_id in component.cve_ids:
+                    if cve_id in techniques_for_cves.keys():
+                        cve = cvss_store.get_cve(cve_id, techniques_for_cves[cve_id])
+                        component.cves.append(cve)
+                        if cve.attack_vector.upper() != "Physical".upper() and cve.attack_vector.upper() != "Unknown".upper() and Mitre_Technique_Level_Enum.EXPLOITATION in cve.techniques.keys():
+                            unmitig_techniques_before = len(component.techniques_unmitigated)
+                            component = add_unmitigated_techniques_to_component(component, zone, cve.techniques[Mitre_Technique_Level_Enum.EXPLOITATION], technique_index)
+                            unmitig_techniques_after = len(component.techniques_unmitigated)
+                            relevant_cve_identified = True
+                            if log_details:
+                                all_techniques.extend(list(cve.techniques.values()))
+                                log.debug("        |-- {:<14}".format(cve_id), "--> RELEVANT due to Attack Vector not 'Physical' and Technique for 'Exploitation' =", cve.techniques[Mitre_Technique_Level_Enum.EXPLOITATION].name, "- Adds", unmitig_techniques_after-unmitig_techniques_before, "new unmitigated Technique(s)")
                         else:
-                            if setup.PRINT_RESULTS:
-                                print("        |---> Target not relevant (no relevant CVEs identified)")
-                        if cve_information_missing == True:
-                            if setup.PRINT_RESULTS:
-                                print("        |---> CVE Information missing. Check Errors!")
-                        component.cves = list(dict.fromkeys(component.cves)) # Removes duplicates
+                            if log_details:
+                                log.debug("        |-- {:<14}".format(cve_id), "is NOT relevant - AttackVector: {:<16}".format(cve.attack_vector), "- Scope: {:<9}".format(cve.scope), "- Exploitation Technique exists:", (Mitre_Technique_Level_Enum.EXPLOITATION in cve.techniques.keys()))
                     else:
-                        if setup.PRINT_RESULTS:
-                            print("    |-- Asset:", component.id_short, "not a Target or protected by path")
+                        cve_information_missing = True
+                        error_list.append(cve_id + " is not assessed, because no Techniques assigned in AutoS² Information Base.")
+                        if log_details:
+                            log.debug(" ! ", error_list[-1])
+                if relevant_cve_identified:
+                    if log_details:
+                        all_techniques = list(dict.fromkeys(all_techniques)) # Removes duplicates
+                        log.debug("        |---> Total", len(component.techniques_unmitigated), "relevant Technique(s) unmitigated:", [technique.name for technique in component.techniques_unmitigated])
+                else:
+                    if log_details:
+                        log.debug("        |---> Target not relevant (no relevant CVEs identified)")
+                if cve_information_missing == True:
+                    if log_details:
+                        log.debug("        |---> CVE Information missing. Check Errors!")
+                component.cves = list(dict.fromkeys(component.cves)) # Removes duplicates
             else:
-                if setup.PRINT_RESULTS:
-                    print("    |-- Protected by Access Points and not further assessed")
-    return machine
+                if log_details:
+                    log.debug("    |-- Asset:", component.id_short, "not a Target or protected by path")
+    else:
+        if log_details:
+            log.debug("    |-- Protected by Access Points and not further assessed")
+    return zone
 
-def add_unmitigated_techniques_to_component(component:Component, zone:Zone, technique:Mitre_Technique):
-    for mitigation in technique.mitigations:
-        if zone.sl_status.cr_sr[mitigation.cr_sr] is SL_Status_Enum.UNMITIGATED:
+def add_unmitigated_techniques_to_component(component:Component, zone:Zone, technique:Mitre_Technique, technique_index:TechniqueCrSrIndex):
+    # The technique is unmitigated if any CR/SR of its mitigations is unmitigated in the zone
+    if technique_index.is_unmitigated(technique, zone.unmitigated_mask):
+        if technique not in component.techniques_unmitigated:
             component.techniques_unmitigated.append(technique)
-    component.techniques_unmitigated = list(dict.fromkeys(component.techniques_unmitigated)) # Removes duplicates
     return component
 
 
+def get_component_complexity(component:Component) -> Complexity_Enum:
+    # The attacker uses the CVE with the lowest complexity
+    min_component_complexity = Complexity_Enum.HIGH # Initialize with high and lower later
+    for cve in component.cves:
+        min_component_complexity = Complexity_Enum.get_min(cve.complexity, min_component_complexity)
+    return min_component_complexity
+
+
+def get_component_complexities(zone:Zone) -> dict[int, Complexity_Enum]:
+    # Complexity of each component that is assessed (easiest CVE for the attacker)
+    topology = zone.attack_paths.topology
+    component_complexities:dict[int, Complexity_Enum] = {}
+    for node in zone.attack_paths.access_points:
+        component = topology.components[node]
+        if len(component.cves) > 0 and len(component.techniques_unmitigated) > 0:
+            component_complexities[node] = get_component_complexity(component)
+    for node in zone.attack_paths.nodes:
+        component = topology.components[node]
+        if component.is_target and not component.is_protected_by_path and len(component.techniques_unmitigated) > 0 and len(component.cves) != 0:
+            component_complexities[node] = get_component_complexity(component)
+    return component_complexities
+
+
+@measured
 def determine_risks(machine:Machine):
-    print("Collect all relevant Path Assets and the corresponding AccesPoints with unmitigated MITRE Techniques to define an attack path")   
-    print("ATTENTION: Only works for Line Network Topologies")
-    print("Determine the Impact for the Target based on the highest CVSS Impact (A, I, or C) of all CVEs for the Risk Assessment")
-    print("Determine the Complexity for the Target based on the highest CVSS Attack Complexity (AC) from the whole attack path of Assets for the Risk Assessment")
-    print("Determine the Resulting Risk and store the final Resulting Risk")
+    print_risk_determination_steps()
     risk_id:int = 1
     for module in machine.hierarchy:
         for zone in module.zones:
-            if setup.PRINT_RESULTS:
-                print("|--", zone.id)
-            attack_path_possible = False
-            # Only check zones that are not secured by the access points
-            if not zone.access_points_secure:
-                for component in zone.components:
-                    # Start with the access point as the starting point
-                    if component.is_access_point:
-                        # Follow the next components as long as there is a next hop
-                        previous_asset_complexity = Complexity_Enum.LOW # Initialize with low and raise later
-                        # Get Complexity for Access Point
-                        min_component_complexity = Complexity_Enum.HIGH # Initialize with high and lower later
-                        max_impact:Impact_Enum = Impact_Enum.NONE
-                        if setup.PRINT_RESULTS:
-                            print("    |-- Target:", component.id_short, "with", len(component.techniques_unmitigated), "unmitigated Technique(s)")
-                        if len(component.cves) > 0 and len(component.techniques_unmitigated) > 0:
-                            for cve in component.cves:
-                                if setup.PRINT_RESULTS:
-                                    print("        |-- {:<14}".format(cve.cve_id), "- Impact:", cve.impact.name, "- Complexity:", cve.complexity.name)
-                                # Find minimum complexity of all CVEs for the component
-                                component.risk.complexity = Complexity_Enum.get_min(cve.complexity, min_component_complexity)
-                                min_component_complexity = component.risk.complexity
-                                # Get the maximum complexity of the path
-                                component.risk.complexity = Complexity_Enum.get_max(previous_asset_complexity, min_component_complexity)
-                                previous_asset_complexity = component.risk.complexity
-                                # Assign the maximum impact to the component
-                                component.risk.impact = Impact_Enum.get_max(cve.impact, max_impact)
-                                max_impact = component.risk.impact
-                            component.risk.update_risk(id=risk_id)
-                            risk_id += 1
-                            if setup.PRINT_RESULTS:
-                                print("        |---> Component Impact:    ", max_impact.name)
-                                print("        |---> Component Complexity:", min_component_complexity.name)
-                                print("        |---> Path Complexity:     ", previous_asset_complexity.name)
-                                print("        |-----> Resulting Risk:    ", component.risk.risk.name)
-                        else:
-                            component.risk.set_no_risk()
-                            if setup.PRINT_RESULTS:
-                                print("        |---> No CVE or no unmitigated Technique(s) for", component.id_short)
-                        # Get complexity for all following Assets in a loop
-                        while len(component.next_hops_ids_to_target) > 0:
-                            for component_next in zone.components:
-                                # If next component is not in the list of the next hop assets, is has not be checked
-                                if component_next.id in component.next_hops_ids_to_target:
-                                    # Find the next hop components
-                                    for component_next_hop_id in component.next_hops_ids_to_target:
-                                        # Next hop found
-                                        if component_next.id == component_next_hop_id:
-                                            # If the next hop is protected by the path, it does not have to be checked
-                                            if setup.PRINT_RESULTS:
-                                                    print("    |-- Target:", component_next.id_short, "with", len(component_next.techniques_unmitigated), "unmitigated Technique(s)")
-                                            if component_next.is_target and not component_next.is_protected_by_path and len(component_next.techniques_unmitigated) > 0:
-                                                attack_path_possible = True
-                                                max_impact:Impact_Enum = Impact_Enum.NONE
-                                                min_component_complexity = Complexity_Enum.HIGH # Initialize with high and lower later
-                                                if len(component_next.cves) != 0:
-                                                    for cve in component_next.cves:
-                                                        if setup.PRINT_RESULTS:
-                                                            print("        |-- {:<14}".format(cve.cve_id), "- Impact:", cve.impact.name, "- Complexity:", cve.complexity.name)
-                                                        # Find minimum complexity of all CVEs for the component
-                                                        component_next.risk.complexity = Complexity_Enum.get_min(cve.complexity, min_component_complexity)
-                                                        min_component_complexity = component_next.risk.complexity
-                                                        # Get the maximum complexity of the path
-                                                        component_next.risk.complexity = Complexity_Enum.get_max(previous_asset_complexity, min_component_complexity)
-                                                        previous_asset_complexity = component_next.risk.complexity
-                                                        # Assign the maximum impact to the component
-                                                        component_next.risk.impact = Impact_Enum.get_max(cve.impact, max_impact)
-                                                        max_impact = component_next.risk.impact
-                                                    component_next.risk.update_risk(risk_id)
-                                                    risk_id += 1
-                                                    if setup.PRINT_RESULTS:
-                                                        print("        |---> Component Impact:    ", max_impact.name)
-                                                        print("        |---> Component Complexity:", min_component_complexity.name)
-                                                        print("        |---> Path Complexity:     ", previous_asset_complexity.name)
-                                                        print("        |-----> Resulting Risk:    ", component.risk.risk.name)
-                                                else:
-                                                    component_next.risk.risk = Risk_Enum.NORISK
-                                                    if setup.PRINT_RESULTS:
-                                                        print("        |---> No CVE for", component.id_short)
-                                            elif component_next.is_target and component_next.is_protected_by_path:
-                                                component_next.risk.set_no_risk()
-                                                if setup.PRINT_RESULTS:
-                                                    print("        |---> Protected by Path Assets and not further assessed")
-                                            elif component_next.is_target and len(component_next.techniques_unmitigated) == 0:
-                                                component_next.risk.set_no_risk()
-                                                if setup.PRINT_RESULTS:
-                                                    print("        |---> Has no unmitigated Techniques and not further assessed")
-                                            else:
-                                                if setup.PRINT_RESULTS:
-                                                    print("        |---> Unknown State. Target:", component_next.is_target, "| Protected by path:", component_next.is_protected_by_path, "| Unmitigated Technique(s):", len(component.techniques_unmitigated))
-                                        # If next hop was found, do not continue searching and go to the next component
-                                        break
-                                # To avoid changes on componentNext, it is copied. Component is not changed
-                                component = copy.copy(component_next)
+            risk_id = determine_risks_of_zone(zone, risk_id)
+    print_target_risks(machine)
+    return machine
+
+
+def print_risk_determination_steps():
+    log.info("Collect all relevant Path Assets and the corresponding AccesPoints with unmitigated MITRE Techniques to define an attack path")   
+    log.info("Determine the Impact for the Target based on the highest CVSS Impact (A, I, or C) of all CVEs for the Risk Assessment")
+    log.info("Determine the Complexity for the Target based on the highest CVSS Attack Complexity (AC) from the whole attack path of Assets for the Risk Assessment")
+    log.info("Determine the Resulting Risk and store the final Resulting Risk")
+
+
+def determine_risks_of_zone(zone:Zone, risk_id:int) -> int:
+    # Risk IDs are numbered from risk_id on. Returns the next free risk ID
+    log_details = log.is_enabled(DEBUG)
+    if log_details:
+        log.debug("|--", zone.id)
+    attack_path_possible = False
+    # Only check zones that are not secured by the access points
+    if not zone.access_points_secure:
+        topology = zone.attack_paths.topology
+        component_complexities = get_component_complexities(zone)
+        # Get the path with the lowest complexity from any access point to each component
+        zone.best_attack_paths = BestAttackPaths(zone.attack_paths, component_complexities)
+        for node in zone.attack_paths.access_points:
+            # Start with the access point as the starting point
+            component = topology.components[node]
+            max_impact:Impact_Enum = Impact_Enum.NONE
+            if log_details:
+                log.debug("    |-- Target:", component.id_short, "with", len(component.techniques_unmitigated), "unmitigated Technique(s)")
+            if len(component.cves) > 0 and len(component.techniques_unmitigated) > 0:
+                for cve in component.cves:
+                    if log_details:
+                        log.debug("        |-- {:<14}".format(cve.cve_id), "- Impact:", cve.impact.name, "- Complexity:", cve.complexity.name)
+                    # Assign the maximum impact to the component
+                    component.risk.impact = Impact_Enum.get_max(cve.impact, max_impact)
+                    max_impact = component.risk.impact
+                component.risk.complexity = zone.best_attack_paths.get_path_complexity(node)
+                component.risk.update_risk(id=risk_id)
+                risk_id += 1
+                if log_details:
+                    log.debug("        |---> Component Impact:    ", max_impact.name)
+                    log.debug("        |---> Component Complexity:", component_complexities[node].name)
+                    log.debug("        |---> Path Complexity:     ", component.risk.complexity.name)
+                    log.debug("        |-----> Resulting Risk:    ", component.risk.risk.name)
+            else:
+                component.risk.set_no_risk()
+                if log_details:
+                    log.debug("        |---> No CVE or no unmitigated Technique(s) for", component.id_short)
+        # Get complexity for all following Assets in the order of the paths
+        for node_next in zone.attack_paths.nodes:
+            component_next = topology.components[node_next]
+            # Previous component on the best path of the attacker
+            component = topology.components[zone.best_attack_paths.best_predecessor[node_next]]
+            # If the next hop is protected by the path, it does not have to be checked
+            if log_details:
+                    log.debug("    |-- Target:", component_next.id_short, "with", len(component_next.techniques_unmitigated), "unmitigated Technique(s)")
+            if component_next.is_target and not component_next.is_protected_by_path and len(component_next.techniques_unmitigated) > 0:
+                attack_path_possible = True
+                max_impact:Impact_Enum = Impact_Enum.NONE
+                if len(component_next.cves) != 0:
+                    for cve in component_next.cves:
+                        if log_details:
+                            log.debug("        |-- {:<14}".format(cve.cve_id), "- Impact:", cve.impact.name, "- Complexity:", cve.complexity.name)
+                        # Assign the maximum impact to the component
+                        component_next.risk.impact = Impact_Enum.get_max(cve.impact, max_impact)
+                        max_impact = component_next.risk.impact
+                    # The complexity of the whole path is the highest complexity of its components
+                    component_next.risk.complexity = zone.best_attack_paths.get_path_complexity(node_next)
+                    component_next.risk.update_risk(risk_id)
+                    risk_id += 1
+                    if log_details:
+                        log.debug("        |---> Component Impact:    ", max_impact.name)
+                        log.debug("        |---> Component Complexity:", component_complexities[node_next].name)
+                        log.debug("        |---> Path Complexity:     ", component_next.risk.complexity.name)
+                        log.debug("        |-----> Resulting Risk:    ", component.risk.risk.name)
+                else:
+                    component_next.risk.risk = Risk_Enum.NORISK
+                    if log_details:
+                        log.debug("        |---> No CVE for", component.id_short)
+            elif component_next.is_target and component_next.is_protected_by_path:
+                component_next.risk.set_no_risk()
+                if log_details:
+                    log.debug("        |---> Protected by Path Assets and not further assessed")
+            elif component_next.is_target and len(component_next.techniques_unmitigated) == 0:
+                component_next.risk.set_no_risk()
+                if log_details:
+                    log.debug("        |---> Has no unmitigated Techniques and not further assessed")
             else:
-                if setup.PRINT_RESULTS:
-                    print("    |-- Protected by Access Points and not further assessed")
-            if not attack_path_possible:
-                if setup.PRINT_RESULTS:
-                    print("    |---> No unprotected Target found in", zone.id)
-    if setup.PRINT_RESULTS:
-        print()
-        print()
+                if log_details:
+                    log.debug("        |---> Unknown State. Target:", component_next.is_target, "| Protected by path:", component_next.is_protected_by_path, "| Unmitigated Technique(s):", len(component.techniques_unmitigated))
+    else:
+        if log_details:
+            log.debug("    |-- Protected by Access Points and not further assessed")
+    if not attack_path_possible:
+        if log_details:
+            log.debug("    |---> No unprotected Target found in", zone.id)
+    return risk_id
+
+
+def print_target_risks(machine:Machine):
+    if log.is_enabled(DEBUG):
+        log.debug()
+        log.debug()
         for module in machine.hierarchy:
             for zone in module.zones:
                 for component in zone.components:
                     if component.is_target:
-                        if setup.PRINT_RESULTS:
-                            print("|-- Component: {:<14}  Impact: {:<8}  Complexity: {:<8} -> {:<8}: {:<8}".format(component.id_short, component.risk.impact.name, component.risk.complexity.name, component.risk.id, component.risk.risk.name))
-    return machine
+                        if log.is_enabled(DEBUG):
+                            log.debug("|-- Component: {:<14}  Impact: {:<8}  Complexity: {:<8} -> {:<8}: {:<8}".format(component.id_short, component.risk.impact.name, component.risk.complexity.name, component.risk.id, component.risk.risk.name),
+                                      component=component.id_short, risk=component.risk.risk.name)
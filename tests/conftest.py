@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The modules of the assessment are imported from src, as by the scripts in src
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import setup
+
+setup.initialize()
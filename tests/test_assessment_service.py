@@ -0,0 +1,179 @@
+from run_context import RunContext
+from swimlanes.assessment_pipeline import AssessmentPipeline
+from swimlanes.assessment_service import AssessmentServer, AssessmentService
+from unittest import mock
+import base64
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+import setup
+
+EXAMPLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "aas_examples")
+EXAMPLE_PATHS = [os.path.join(EXAMPLES_PATH, file_name) for file_name in ("CPS_Example_1.json", "CPS_Example_2.json", "CPS_Example_3.json")]
+
+
+def get_risks(components:list[dict]) -> list[tuple]:
+    return [(component["component"], component["risk_id"], component["risk"]) for component in components]
+
+
+class BlockingPipeline():
+    # Keeps the worker busy until the test releases it, so that the queue of the service can be filled
+
+    def __init__(self, cvss_store):
+        self.cvss_store = cvss_store
+        self.started = threading.Event()
+        self.released = threading.Event()
+
+    def run(self, path:str, run_context:RunContext = None, file = None):
+        self.started.set()
+        self.released.wait(30)
+        raise RuntimeError("Released")
+
+
+class AssessmentServiceTest(unittest.TestCase):
+    # The CVSS data is only read from the local files, so that the tests do not request the NIST NVD
+
+    @classmethod
+    def setUpClass(cls):
+        cls.nvd_offline = setup.NVD_OFFLINE
+        setup.NVD_OFFLINE = True
+        cls.pipeline = AssessmentPipeline()
+        cls.pipeline.warm_up(RunContext({"LOG_BACKEND": "none"}))
+        # Results of the same pipeline without the service
+        cls.expected_risks:dict[str, list[tuple]] = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for path in EXAMPLE_PATHS:
+                run_context = RunContext({"RISK_ASSESSMENT_WORKERS": 1, "ATTEST_FILE_NAME": os.path.join(directory, "Attest.pdf")}, io.StringIO())
+                machine = cls.pipeline.run(path, run_context)
+                cls.expected_risks[path] = [(component.id_short, component.risk.id, component.risk.risk.value) for module in machine.hierarchy for component in module.hierarchy]
+
+    @classmethod
+    def tearDownClass(cls):
+        setup.NVD_OFFLINE = cls.nvd_offline
+
+    def start_server(self, service:AssessmentService) -> str:
+        server = AssessmentServer(("127.0.0.1", 0), service)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(service.shutdown)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return "http://127.0.0.1:" + str(server.server_address[1])
+
+    def request(self, url:str, method:str = "POST", data:bytes = None) -> tuple[int, dict, dict]:
+        # Returns the status, the headers, and the JSON of the response
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, data=data, method=method), timeout=300) as response:
+                return response.status, dict(response.headers), json.loads(response.read())
+        except urllib.error.HTTPError as error:
+            return error.code, dict(error.headers), json.loads(error.read())
+
+    def test_upload(self):
+        url = self.start_server(AssessmentService(self.pipeline, 1, 1))
+        with open(EXAMPLE_PATHS[0], "rb") as file:
+            status, headers, result = self.request(url + "/assess?PRINT_RESULTS=false", data=file.read())
+        self.assertEqual(status, 200)
+        self.assertEqual(result["status"], "OK")
+        self.assertEqual(get_risks(result["components"]), self.expected_risks[EXAMPLE_PATHS[0]])
+        self.assertTrue(base64.b64decode(result["attestation"]).startswith(b"%PDF"))
+
+    def test_path(self):
+        url = self.start_server(AssessmentService(self.pipeline, 1, 1))
+        status, headers, result = self.request(url + "/assess?path=" + EXAMPLE_PATHS[1])
+        self.assertEqual(status, 200)
+        self.assertEqual(get_risks(result["components"]), self.expected_risks[EXAMPLE_PATHS[1]])
+
+    def test_attacker_profiles_and_sensitivity(self):
+        url = self.start_server(AssessmentService(self.pipeline, 1, 1))
+        status, headers, result = self.request(url + "/assess?PRINT_RESULTS=false&ATTACKER_PROFILE_SWEEP=true&MONTE_CARLO_SAMPLES=20&MONTE_CARLO_ALL_COMPONENTS=true&path=" + EXAMPLE_PATHS[0])
+        self.assertEqual(status, 200)
+        # The same results as the run of the pipeline without the service
+        with tempfile.TemporaryDirectory() as directory:
+            run_context = RunContext({"PRINT_RESULTS": False, "ATTACKER_PROFILE_SWEEP": True, "MONTE_CARLO_SAMPLES": 20, "MONTE_CARLO_ALL_COMPONENTS": True,
+                                      "RISK_ASSESSMENT_WORKERS": 1, "ATTEST_FILE_NAME": os.path.join(directory, "Attest.pdf")}, io.StringIO())
+            machine = self.pipeline.run(EXAMPLE_PATHS[0], run_context)
+        targets = [component["component"] for component in result["components"] if component["target"]]
+        self.assertEqual(len(result["attacker_profiles"]), 24)
+        self.assertEqual(result["attacker_profiles"], machine.attacker_profile_sweep.get_risk_matrix())
+        self.assertEqual(list(result["attacker_profiles"]["Adept / Government"]), targets)
+        sensitivity = result["sensitivity"]
+        self.assertEqual(sensitivity, machine.sl_sensitivity.get_report())
+        self.assertEqual(sensitivity["samples"], 20)
+        self.assertEqual(list(sensitivity["histograms"]), targets)
+        for histogram in sensitivity["histograms"].values():
+            self.assertEqual(sum(histogram.values()), 20)
+        self.assertTrue(sensitivity["correlations"])
+
+    def test_without_attacker_profiles_and_sensitivity(self):
+        url = self.start_server(AssessmentService(self.pipeline, 1, 1))
+        status, headers, result = self.request(url + "/assess?PRINT_RESULTS=false&path=" + EXAMPLE_PATHS[0])
+        self.assertEqual(status, 200)
+        self.assertIsNone(result["attacker_profiles"])
+        self.assertIsNone(result["sensitivity"])
+
+    def test_invalid_requests(self):
+        url = self.start_server(AssessmentService(self.pipeline, 1, 1))
+        self.assertEqual(self.request(url + "/assess?UNKNOWN=1")[0], 400)
+        self.assertEqual(self.request(url + "/assess?PRINT_RESULTS=maybe")[0], 400)
+        self.assertEqual(self.request(url + "/assess?MONTE_CARLO_SAMPLES=many")[0], 400)
+        self.assertEqual(self.request(url + "/assess")[0], 400)
+        self.assertEqual(self.request(url + "/assess?path=" + os.path.join(EXAMPLES_PATH, "Unknown.json"))[0], 404)
+        self.assertEqual(self.request(url + "/unknown")[0], 404)
+        self.assertEqual(self.request(url + "/unknown", "GET")[0], 404)
+        with mock.patch.object(setup, "SERVICE_MAX_UPLOAD_SIZE", 10):
+            self.assertEqual(self.request(url + "/assess", data=b'{"assetAdministrationShells": []}')[0], 413)
+
+    def test_failed_assessment(self):
+        url = self.start_server(AssessmentService(self.pipeline, 1, 1))
+        with open(EXAMPLE_PATHS[0], "rb") as file:
+            status, headers, result = self.request(url + "/assess?MACHINE_ID_SHORT=Unknown", data=file.read())
+        self.assertEqual(status, 422)
+        self.assertTrue(result["status"].startswith("Failed: ValueError"))
+        self.assertEqual(self.request(url + "/statistics", "GET")[2]["failed"], 1)
+
+    def test_queue_full(self):
+        pipeline = BlockingPipeline(self.pipeline.cvss_store)
+        service = AssessmentService(pipeline, 1, 0)
+        url = self.start_server(service)
+        responses = []
+        thread = threading.Thread(target=lambda: responses.append(self.request(url + "/assess?path=" + EXAMPLE_PATHS[0])))
+        thread.start()
+        self.assertTrue(pipeline.started.wait(30))
+        status, headers, result = self.request(url + "/assess?path=" + EXAMPLE_PATHS[0])
+        self.assertEqual(status, 503)
+        self.assertEqual(headers["Retry-After"], "1")
+        pipeline.released.set()
+        thread.join()
+        self.assertEqual(responses[0][0], 422)
+        statistics = self.request(url + "/statistics", "GET")[2]
+        self.assertEqual((statistics["rejected"], statistics["failed"]), (1, 1))
+
+    def test_concurrent_requests(self):
+        # The runs of the worker threads share the pipeline and have the same results as the runs without the service
+        url = self.start_server(AssessmentService(self.pipeline, 2, 8))
+        paths = EXAMPLE_PATHS * 2
+        responses:dict[int, tuple] = {}
+
+        def send(number:int):
+            with open(paths[number], "rb") as file:
+                responses[number] = self.request(url + "/assess?PRINT_RESULTS=false", data=file.read())
+
+        threads = [threading.Thread(target=send, args=(number,)) for number in range(len(paths))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for number, path in enumerate(paths):
+            status, headers, result = responses[number]
+            self.assertEqual(status, 200)
+            self.assertEqual(get_risks(result["components"]), self.expected_risks[path], path)
+        self.assertEqual(self.request(url + "/statistics", "GET")[2]["completed"], len(paths))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+from run_context import RunContext
+from swimlanes.assessment_pipeline import AssessmentPipeline
+from swimlanes.incremental_risk_assessment import AssessmentState
+import os
+import tempfile
+import unittest
+import setup
+
+EXAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "aas_examples", "CPS_Example_1.json")
+# CVE without Techniques in the AutoS² Information Base, which is reported as error by the risk assessment
+UNMAPPED_CVE_ID = "CVE-0000-0001"
+
+
+class AssessmentStateTest(unittest.TestCase):
+    # The CVSS data is only read from the local files, so that the tests do not request the NIST NVD
+
+    def setUp(self):
+        self.nvd_offline = setup.NVD_OFFLINE
+        setup.NVD_OFFLINE = True
+        self.addCleanup(setattr, setup, "NVD_OFFLINE", self.nvd_offline)
+        self.pipeline = AssessmentPipeline()
+        self.run_context = RunContext({"LOG_BACKEND": "none"})
+
+    def create_state(self, error_list:list[str] = None) -> AssessmentState:
+        with tempfile.TemporaryDirectory() as directory:
+            run_context = RunContext({"LOG_BACKEND": "none", "RISK_ASSESSMENT_WORKERS": 1, "ATTEST_FILE_NAME": os.path.join(directory, "Attest.pdf")})
+            machine = self.pipeline.run(EXAMPLE_PATH, run_context)
+        knowledge = self.pipeline.get_knowledge(self.run_context)
+        return AssessmentState(machine, self.pipeline.get_techniques_for_cves(knowledge, self.run_context), knowledge.technique_index, self.pipeline.cvss_store, error_list)
+
+    def add_unmapped_cve(self, state:AssessmentState):
+        access_point = [component for component in state.machine.topology.components if component.is_access_point][0]
+        state.add_cve(access_point.id, UNMAPPED_CVE_ID)
+        with self.run_context.activate():
+            state.reassess()
+
+    def test_errors_of_the_state(self):
+        global_errors = list(setup.error_list)
+        states = [self.create_state(), self.create_state()]
+        self.add_unmapped_cve(states[0])
+        self.assertIn(UNMAPPED_CVE_ID + " is not assessed, because no Techniques assigned in AutoS² Information Base.", states[0].error_list)
+        # Neither other states nor the errors of setup.py get the errors of the re-assessment
+        self.assertEqual(states[1].error_list, [])
+        self.assertEqual(setup.error_list, global_errors)
+
+    def test_given_error_list(self):
+        error_list:list[str] = []
+        state = self.create_state(error_list)
+        self.add_unmapped_cve(state)
+        self.assertIs(state.error_list, error_list)
+        self.assertTrue(any(error.startswith(UNMAPPED_CVE_ID) for error in error_list))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+from swimlanes.json_stream_reader import JsonStreamReader
+import io
+import json
+import unittest
+
+
+class JsonStreamReaderTest(unittest.TestCase):
+
+    def test_numbers_cut_at_every_chunk_size(self):
+        # Each number is cut at every possible position by the chunk boundaries
+        content = json.dumps({"values": [1.5, -12.25e3, 1.5e-7, 123456789, 0.0, 7E+2, 3]})
+        expected = json.loads(content)["values"]
+        for chunk_size in range(1, len(content) + 1):
+            reader = JsonStreamReader(io.StringIO(content), chunk_size)
+            for key in reader.iterate_object():
+                self.assertEqual(key, "values")
+                self.assertEqual(list(reader.iterate_array()), expected, "chunk size " + str(chunk_size))
+
+    def test_number_at_end_of_file(self):
+        for chunk_size in range(1, 6):
+            self.assertEqual(JsonStreamReader(io.StringIO("1.5e3"), chunk_size).read_value(), 1500.0)
+
+    def test_skip_value(self):
+        content = json.dumps({"skipped": [[1, 2.5], {"a": "b"}], "kept": {"id": 4.25}})
+        for chunk_size in range(1, len(content) + 1):
+            reader = JsonStreamReader(io.StringIO(content), chunk_size)
+            values = {}
+            for key in reader.iterate_object():
+                if key == "kept":
+                    values[key] = reader.read_value()
+                else:
+                    reader.skip_value()
+            self.assertEqual(values, {"kept": {"id": 4.25}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from swimlanes.nvd_reader import NvdFetcher, TokenBucket, get_cvss_data_from_metrics
+from urllib.parse import parse_qs, urlparse
+import json
+import threading
+import time
+import unittest
+
+CVSS_DATA_V31 = {"attackVector": "NETWORK", "scope": "CHANGED", "attackComplexity": "LOW", "confidentialityImpact": "HIGH", "integrityImpact": "NONE", "availabilityImpact": "NONE"}
+CVSS_DATA_V30 = {"attackVector": "ADJACENT_NETWORK", "scope": "UNCHANGED", "attackComplexity": "HIGH", "confidentialityImpact": "LOW", "integrityImpact": "LOW", "availabilityImpact": "HIGH"}
+CVSS_DATA_V2 = {"accessVector": "NETWORK", "accessComplexity": "MEDIUM", "confidentialityImpact": "PARTIAL", "integrityImpact": "NONE", "availabilityImpact": "COMPLETE"}
+
+
+class NvdRequestHandler(BaseHTTPRequestHandler):
+    # Stub of the NIST NVD API. The status codes of the first requests of a CVE are given by server.failures[cve_id],
+    # all further requests are answered with the CVSS data of CVSS_DATA_V31
+
+    def do_GET(self):
+        cve_id = parse_qs(urlparse(self.path).query)["cveId"][0]
+        with self.server.lock:
+            self.server.requests.append((time.monotonic(), cve_id, self.headers.get("apiKey")))
+            failures = self.server.failures.get(cve_id, [])
+            status_code = failures.pop(0) if failures else 200
+        if status_code != 200:
+            self.send_response(status_code)
+            self.end_headers()
+            return
+        body = json.dumps({"vulnerabilities": [{"cve": {"id": cve_id, "metrics": {"cvssMetricV31": [{"cvssData": CVSS_DATA_V31}]}}}]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_rolling_window(self):
+        bucket = TokenBucket(3, 1)
+        self.assertEqual(bucket.try_acquire(), 0)
+        time.sleep(0.5)
+        self.assertEqual([bucket.try_acquire() for _ in range(2)], [0, 0])
+        wait = bucket.try_acquire()
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 0.5)
+        # Only the token of the first request is returned when its window has passed, the others half a second later
+        time.sleep(wait)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertGreater(bucket.try_acquire(), 0.4)
+
+
+class NvdFetcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), NvdRequestHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.failures = {}
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.api_url = "http://127.0.0.1:" + str(self.server.server_port) + "/rest/json/cves/2.0?cveId="
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def create_fetcher(self, api_key:str = None, retries:int = 3, retry_backoff:float = 0.1) -> NvdFetcher:
+        fetcher = NvdFetcher(self.api_url, api_key, max_connections=4, retries=retries, retry_backoff=retry_backoff, timeout=5)
+        self.addCleanup(fetcher.executor.shutdown)
+        self.addCleanup(fetcher.session.close)
+        return fetcher
+
+    def get_request_times(self, cve_id:str) -> list[float]:
+        return [request_time for request_time, requested_cve_id, api_key in self.server.requests if requested_cve_id == cve_id]
+
+    def test_cvss_data(self):
+        fetcher = self.create_fetcher()
+        self.assertEqual(fetcher.request_cvss_data("CVE-2020-0001"), CVSS_DATA_V31)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_rate_limit(self):
+        fetcher = self.create_fetcher()
+        fetcher.rate_limiter = TokenBucket(2, 0.5)
+        cve_ids = ["CVE-2020-000" + str(number) for number in range(5)]
+        cvss_data = fetcher.request_all_cvss_data(cve_ids)
+        self.assertEqual(cvss_data, {cve_id: CVSS_DATA_V31 for cve_id in cve_ids})
+        # At most 2 requests are sent in any rolling window of 0.5 seconds
+        request_times = sorted([request_time for request_time, cve_id, api_key in self.server.requests])
+        self.assertEqual(len(request_times), 5)
+        for first, third in zip(request_times, request_times[2:]):
+            self.assertGreaterEqual(third - first, 0.45)
+
+    def test_retry_with_backoff_on_server_error(self):
+        fetcher = self.create_fetcher(retries=3, retry_backoff=0.1)
+        self.server.failures["CVE-2020-0001"] = [503, 500]
+        self.assertEqual(fetcher.request_cvss_data("CVE-2020-0001"), CVSS_DATA_V31)
+        request_times = self.get_request_times("CVE-2020-0001")
+        self.assertEqual(len(request_times), 3)
+        # The backoff doubles with each attempt
+        self.assertGreaterEqual(request_times[1] - request_times[0], 0.1)
+        self.assertGreaterEqual(request_times[2] - request_times[1], 0.2)
+
+    def test_retry_on_too_many_requests(self):
+        for status_code in (403, 429):
+            with self.subTest(status_code=status_code):
+                cve_id = "CVE-2020-" + str(status_code)
+                fetcher = self.create_fetcher(retries=2, retry_backoff=0.05)
+                self.server.failures[cve_id] = [status_code]
+                self.assertEqual(fetcher.request_cvss_data(cve_id), CVSS_DATA_V31)
+                self.assertEqual(len(self.get_request_times(cve_id)), 2)
+
+    def test_no_more_attempts_than_retries(self):
+        fetcher = self.create_fetcher(retries=2, retry_backoff=0.05)
+        self.server.failures["CVE-2020-0001"] = [503, 503, 503]
+        self.assertIs(fetcher.request_cvss_data("CVE-2020-0001"), False)
+        self.assertEqual(len(self.get_request_times("CVE-2020-0001")), 2)
+
+    def test_no_retry_on_client_error(self):
+        fetcher = self.create_fetcher(retries=3, retry_backoff=0.05)
+        self.server.failures["CVE-2020-0001"] = [404]
+        self.assertIs(fetcher.request_cvss_data("CVE-2020-0001"), False)
+        self.assertEqual(len(self.get_request_times("CVE-2020-0001")), 1)
+
+    def test_api_key_header(self):
+        self.create_fetcher().request_cvss_data("CVE-2020-0001")
+        self.create_fetcher(api_key="secret").request_cvss_data("CVE-2020-0002")
+        self.assertEqual([api_key for request_time, cve_id, api_key in self.server.requests], [None, "secret"])
+
+
+class CvssDataFromMetricsTest(unittest.TestCase):
+
+    def test_newest_version_first(self):
+        metrics = {"cvssMetricV2": [{"cvssData": CVSS_DATA_V2}], "cvssMetricV30": [{"cvssData": CVSS_DATA_V30}], "cvssMetricV31": [{"cvssData": CVSS_DATA_V31}]}
+        self.assertEqual(get_cvss_data_from_metrics(metrics), CVSS_DATA_V31)
+
+    def test_version_30(self):
+        metrics = {"cvssMetricV2": [{"cvssData": CVSS_DATA_V2}], "cvssMetricV30": [{"cvssData": CVSS_DATA_V30}]}
+        self.assertEqual(get_cvss_data_from_metrics(metrics), CVSS_DATA_V30)
+
+    def test_version_2(self):
+        # CVSS V2 has no scope, and the access complexity MEDIUM is assessed as HIGH
+        self.assertEqual(get_cvss_data_from_metrics({"cvssMetricV2": [{"cvssData": CVSS_DATA_V2}]}),
+                         {"attackVector": "NETWORK", "scope": "Unknown", "attackComplexity": "HIGH", "confidentialityImpact": "PARTIAL", "integrityImpact": "NONE", "availabilityImpact": "COMPLETE"})
+
+    def test_unknown_version(self):
+        self.assertIsNone(get_cvss_data_from_metrics({"cvssMetricV40": [{"cvssData": CVSS_DATA_V31}]}))
+        self.assertIsNone(get_cvss_data_from_metrics({}))
+
+
+if __name__ == "__main__":
+    unittest.main()